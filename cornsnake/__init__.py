@@ -17,6 +17,7 @@ from . import util_date
 from . import util_dependencies
 from . import util_dict
 from . import util_dir
+from . import util_dir_index
 from . import util_env
 from . import util_file
 from . import util_git
@@ -27,3 +27,6 @@ LOG_FILENAME = "my-log.log"
 MINIMIZE_PROGRESS_BAR_OUTPUT = (
     False  # Normally False. Set to True for CI/CD build or other log-first environment.
 )
+PROCESS_TIMEOUT_SECONDS: float | None = (
+    None  # Default timeout for processes run via util_proc (and so util_git). None means no timeout.
+)
@@ -4,29 +4,645 @@ Working with directories, files, and file paths.
 [Documentation](http://docs.mrseanryan.cornsnake.s3-website-eu-west-1.amazonaws.com/cornsnake/util_dir.html)
 """
 
+import concurrent.futures
+import errno
+import fnmatch
+import hashlib
 import os
-from glob import glob
 import re
 import shutil
+import stat
+import threading
+import typing
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from . import util_file
 from . import util_os
+from . import util_progress
 from . import util_robust_delete
+from . import util_time
 
 TOTAL_BYTES_IN_GIGABYTE = 1000000000
 
+DEFAULT_MAX_WALK_WORKERS = 4
+# A walk only starts a thread pool once this many directories are waiting to be listed - small trees are walked serially
+_MIN_DIRS_FOR_PARALLEL_WALK = 8
+# Directory names that are usually not wanted when searching a source tree
+COMMON_EXCLUDED_DIR_NAMES = [".git", "node_modules", "__pycache__", ".venv", ".tox"]
+
+R = typing.TypeVar("R")
+
 delete_dirs = util_robust_delete.delete_dirs  # allow access via this file
+is_empty_tree = util_file.is_empty_tree  # allow access via this file
+
+
+DEFAULT_MAX_COPY_WORKERS = min(16, (os.cpu_count() or 1) + 4)
+
+# ioctl request to clone (reflink) a whole file - Linux, on filesystems like Btrfs and XFS
+_FICLONE = 0x40049409
+# errno values meaning 'this copy method is not supported here' - so fall back to the next method
+_UNSUPPORTED_COPY_ERRNOS = {
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+    errno.ETXTBSY,
+}
+# The most bytes to ask the kernel to copy per call - each call copies what is left, up to this, so the loop runs until end of file
+_KERNEL_COPY_BYTES_PER_CALL = 1 << 30
+
+
+@dataclass
+class CopyReport:
+    """
+    What copy_directory() did: the files and bytes copied, how long it took, and which copy methods were used.
+
+    - methods: the number of files copied per method - 'reflink' (clone, no data copied), 'copy_file_range' or 'sendfile' (copied in the kernel), or 'copyfile' (shutil, which uses the platform's fast copy where it has one).
+    """
+
+    file_count: int = 0
+    total_bytes: int = 0
+    elapsed_seconds: float = 0.0
+    methods: dict[str, int] = field(default_factory=dict)
+
+    def get_bytes_per_second(self) -> float:
+        return self.total_bytes / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def describe(self) -> str:
+        return f"Copied {self.file_count} files, {self.total_bytes / (1024 * 1024):.1f} MB [time taken: {util_time.describe_elapsed_seconds(self.elapsed_seconds)} - {self.get_bytes_per_second() / (1024 * 1024):.1f} MB/s] {self.methods}"
+
+
+class _FileCopier:
+    """
+    Copies files via the fastest method that works: reflink (FICLONE), then os.copy_file_range, then os.sendfile, then shutil.copyfile.
+
+    - once a method fails as unsupported, it is not tried again by this copier (the files of one copy are usually on the same filesystems).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        is_linux = util_os.is_unix() and not util_os.is_mac()
+        self._is_reflink_possible = is_linux
+        self._is_copy_file_range_possible = is_linux and hasattr(os, "copy_file_range")
+        self._is_sendfile_possible = is_linux and hasattr(os, "sendfile")
+        self.methods: dict[str, int] = {}
+
+    def _count(self, method: str) -> None:
+        with self._lock:
+            self.methods[method] = self.methods.get(method, 0) + 1
+
+    def _try_kernel_copy(self, from_path: str, to_path: str) -> str | None:
+        """
+        Try to copy within the kernel (no copying through Python buffers). Returns the method used, or None if none is supported here.
 
+        - copies until end of file (not just the size from the listing), in case the file grew since.
+        """
+        with open(from_path, "rb") as src, open(to_path, "wb") as dst:
+            if self._is_reflink_possible:
+                try:
+                    import fcntl
 
-def copy_directory(from_path: str, to_path: str) -> None:
+                    fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+                    return "reflink"
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_COPY_ERRNOS:
+                        raise
+                    self._is_reflink_possible = False
+            if self._is_copy_file_range_possible:
+                try:
+                    copied = 0
+                    while True:
+                        count = os.copy_file_range(
+                            src.fileno(), dst.fileno(), _KERNEL_COPY_BYTES_PER_CALL
+                        )
+                        if count == 0:
+                            break
+                        copied += count
+                    return "copy_file_range"
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_COPY_ERRNOS or copied > 0:
+                        raise
+                    self._is_copy_file_range_possible = False
+            if self._is_sendfile_possible:
+                try:
+                    copied = 0
+                    while True:
+                        count = os.sendfile(
+                            dst.fileno(),
+                            src.fileno(),
+                            copied,
+                            _KERNEL_COPY_BYTES_PER_CALL,
+                        )
+                        if count == 0:
+                            break
+                        copied += count
+                    return "sendfile"
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_COPY_ERRNOS or copied > 0:
+                        raise
+                    self._is_sendfile_possible = False
+        return None
+
+    def copy(self, from_path: str, to_path: str) -> None:
+        """
+        Copy the file contents and metadata (like shutil.copy2).
+        """
+        method = None
+        if (
+            self._is_reflink_possible
+            or self._is_copy_file_range_possible
+            or self._is_sendfile_possible
+        ):
+            method = self._try_kernel_copy(from_path, to_path)
+        if method is None:
+            shutil.copyfile(from_path, to_path)
+            method = "copyfile"
+        shutil.copystat(from_path, to_path)
+        self._count(method)
+
+
+def _copy_files_in_parallel(
+    files_to_copy: list[tuple[str, str, int]],
+    copier: _FileCopier,
+    max_workers: int,
+    show_progress: bool,
+) -> tuple[int, list[tuple[str, str, str]]]:
+    """
+    Copy the files (from_path, to_path, size) on a thread pool, showing progress by bytes copied.
+
+    Returns:
+    tuple: The number of bytes copied, and the errors as (from_path, to_path, message) - like shutil.Error.
     """
-    Copy a directory from one location to another.
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1 - but was {max_workers}")
+    total_bytes = sum(size for _from, _to, size in files_to_copy)
+    copied_bytes = 0
+    errors: list[tuple[str, str, str]] = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(copier.copy, from_path, to_path): (
+                from_path,
+                to_path,
+                size,
+            )
+            for from_path, to_path, size in files_to_copy
+        }
+        for future in concurrent.futures.as_completed(futures):
+            from_path, to_path, size = futures[future]
+            try:
+                future.result()
+                copied_bytes += size
+            except OSError as e:
+                errors.append((from_path, to_path, str(e)))
+            if show_progress and total_bytes:
+                util_progress.progress(copied_bytes, total_bytes)
+    if show_progress:
+        util_progress.complete()
+    return copied_bytes, errors
+
+
+def _describe_special_file(path: str, mode: int) -> str:
+    """
+    Describe why a special file (like a named pipe) is not copied - like shutil.SpecialFileError.
+    """
+    if stat.S_ISFIFO(mode):
+        return f"`{path}` is a named pipe"
+    return f"`{path}` is not a regular file"
+
+
+def copy_directory(
+    from_path: str,
+    to_path: str,
+    max_workers: int = DEFAULT_MAX_COPY_WORKERS,
+    show_progress: bool = False,
+    dirs_exist_ok: bool = False,
+    symlinks: bool = False,
+) -> CopyReport:
+    """
+    Copy a directory from one location to another - copying many files at the same time, and copying each file in the kernel (or by reflink) where the platform supports it.
+
+    - like shutil.copytree: file metadata is copied (like shutil.copy2), and by default symbolic links are followed.
+    - on Linux, each file is cloned (reflink) on filesystems that support it, else copied via os.copy_file_range or os.sendfile.
+    - failed files do not stop the others - shutil.Error is raised at the end, listing them.
+    - special files (like named pipes or devices) are not copied - they are listed in the shutil.Error, like shutil.copytree does.
 
     Args:
     from_path (str): The path of the directory to copy from.
     to_path (str): The path of the directory to copy to.
+    max_workers (int): The number of files to copy at the same time. Default is the number of CPUs + 4 (up to 16).
+    show_progress (bool): Flag to show a progress bar (by bytes copied) and print a summary with the bytes per second. Default is False.
+    dirs_exist_ok (bool): Flag to allow copying into an existing directory. Default is False (raise FileExistsError).
+    symlinks (bool): Flag to copy symbolic links as links, instead of copying what they point to. Default is False.
+
+    Returns:
+    CopyReport: The files and bytes copied, the time taken and the copy methods used.
     """
-    shutil.copytree(from_path, to_path)
+    start = util_time.start_timer()
+    os.makedirs(to_path, exist_ok=dirs_exist_ok)
+
+    dirs_to_copy_stat: list[tuple[str, str]] = [(from_path, to_path)]
+    files_to_copy: list[tuple[str, str, int]] = []
+    errors: list[tuple[str, str, str]] = []
+    stack = [(from_path, to_path)]
+    while stack:
+        from_dir, to_dir = stack.pop()
+        try:
+            with os.scandir(from_dir) as entries:
+                for entry in entries:
+                    to_entry = os.path.join(to_dir, entry.name)
+                    try:
+                        if symlinks and entry.is_symlink():
+                            os.symlink(os.readlink(entry.path), to_entry)
+                        elif entry.is_dir():
+                            os.makedirs(to_entry, exist_ok=dirs_exist_ok)
+                            dirs_to_copy_stat.append((entry.path, to_entry))
+                            stack.append((entry.path, to_entry))
+                        else:
+                            entry_st = entry.stat()
+                            if stat.S_ISREG(entry_st.st_mode):
+                                files_to_copy.append(
+                                    (entry.path, to_entry, entry_st.st_size)
+                                )
+                            else:
+                                # Reading a named pipe (or a device) could block, or never end
+                                errors.append(
+                                    (
+                                        entry.path,
+                                        to_entry,
+                                        _describe_special_file(
+                                            entry.path, entry_st.st_mode
+                                        ),
+                                    )
+                                )
+                    except OSError as e:
+                        errors.append((entry.path, to_entry, str(e)))
+        except OSError as e:
+            errors.append((from_dir, to_dir, str(e)))
+
+    copier = _FileCopier()
+    copied_bytes, copy_errors = _copy_files_in_parallel(
+        files_to_copy, copier, max_workers, show_progress
+    )
+    errors += copy_errors
+
+    # Copy directory metadata last, since copying the files changes the directory mtimes
+    for from_dir, to_dir in reversed(dirs_to_copy_stat):
+        try:
+            shutil.copystat(from_dir, to_dir)
+        except OSError as e:
+            errors.append((from_dir, to_dir, str(e)))
+
+    report = CopyReport(
+        file_count=len(files_to_copy) - len(copy_errors),
+        total_bytes=copied_bytes,
+        elapsed_seconds=util_time.end_timer(start),
+        methods=copier.methods,
+    )
+    if show_progress:
+        print(report.describe())
+    if errors:
+        raise shutil.Error(errors)
+    return report
+
+
+@dataclass
+class SyncReport:
+    """
+    What sync_directory() did. The paths are relative to the target directory.
+    """
+
+    copied_new: list[str] = field(default_factory=list)
+    copied_changed: list[str] = field(default_factory=list)
+    deleted: list[str] = field(default_factory=list)
+    unchanged_count: int = 0
+    copied_bytes: int = 0
+    elapsed_seconds: float = 0.0
+
+    def describe(self) -> str:
+        return f"Synced: {len(self.copied_new)} new, {len(self.copied_changed)} changed, {len(self.deleted)} deleted, {self.unchanged_count} unchanged - copied {self.copied_bytes / (1024 * 1024):.1f} MB [time taken: {util_time.describe_elapsed_seconds(self.elapsed_seconds)}]"
+
+
+@dataclass
+class _TreeListing:
+    """
+    The entries under a root directory, as paths relative to the root. Symbolic links are listed as links, and not followed.
+    """
+
+    files: dict[str, os.stat_result] = field(default_factory=dict)
+    dirs: set[str] = field(default_factory=set)
+    special_files: dict[str, int] = field(default_factory=dict)  # path -> mode
+    symlinks: dict[str, str] = field(default_factory=dict)  # path -> link target
+    unlisted_dirs: set[str] = field(default_factory=set)
+    errors: list[tuple[str, str]] = field(default_factory=list)  # (path, message)
+
+    def contains(self, relative_path: str) -> bool:
+        return (
+            relative_path in self.files
+            or relative_path in self.dirs
+            or relative_path in self.special_files
+            or relative_path in self.symlinks
+        )
+
+    def is_under_unlisted_dir(self, relative_path: str) -> bool:
+        return any(
+            relative_path.startswith(d + os.sep) if d else True
+            for d in self.unlisted_dirs
+        )
+
+
+def _list_tree(root: str, max_workers: int) -> _TreeListing:
+    """
+    List the regular files (with their stat), the directories, the special files and the symbolic links under root.
+
+    - symbolic links are never followed - so a link in the target can not lead a sync to delete files outside of it.
+    - an entry or directory that cannot be read is recorded as an error, and does not stop the listing.
+    """
+
+    def _scan_dir(path: str, _depth: int) -> tuple[_TreeListing, list[str]]:
+        listing = _TreeListing()
+        subdirs: list[str] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    relative_path = os.path.relpath(entry.path, root)
+                    try:
+                        if entry.is_symlink():
+                            listing.symlinks[relative_path] = os.readlink(entry.path)
+                        elif entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            listing.dirs.add(relative_path)
+                        else:
+                            entry_st = entry.stat(follow_symlinks=False)
+                            if stat.S_ISREG(entry_st.st_mode):
+                                listing.files[relative_path] = entry_st
+                            else:
+                                listing.special_files[relative_path] = entry_st.st_mode
+                    except OSError as e:
+                        listing.errors.append((entry.path, str(e)))
+        except OSError as e:
+            relative_dir = os.path.relpath(path, root)
+            listing.unlisted_dirs.add("" if relative_dir == os.curdir else relative_dir)
+            listing.errors.append((path, str(e)))
+        return listing, subdirs
+
+    tree = _TreeListing()
+    for listing in _walk_in_parallel(root, _scan_dir, max_workers):
+        tree.files.update(listing.files)
+        tree.dirs.update(listing.dirs)
+        tree.special_files.update(listing.special_files)
+        tree.symlinks.update(listing.symlinks)
+        tree.unlisted_dirs.update(listing.unlisted_dirs)
+        tree.errors += listing.errors
+    return tree
+
+
+def _hash_file(path_to_file: str) -> bytes:
+    hasher = hashlib.blake2b()
+    with open(path_to_file, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+def _is_same_content(from_path: str, to_path: str) -> bool:
+    try:
+        return _hash_file(from_path) == _hash_file(to_path)
+    except OSError:
+        return False  # Intentionally NOT passing exception onwards - treat as changed, so the copy reports the error
+
+
+def sync_directory(
+    from_path: str,
+    to_path: str,
+    is_content_compared: bool = False,
+    is_extraneous_deleted: bool = True,
+    mtime_tolerance_seconds: float = 0.0,
+    max_workers: int = DEFAULT_MAX_COPY_WORKERS,
+    show_progress: bool = False,
+) -> SyncReport:
+    """
+    Make the target directory a copy of the source directory, copying only the files that are new or changed (like rsync) - so repeated syncs cost time in proportion to what changed.
+
+    - a file is changed if its size or modified time differ (copied files keep the modified time of the source, so they match on the next sync).
+    - with is_content_compared, files of the same size are compared by content hash instead of modified time (slower, but safe where modified times are not reliable).
+    - files are copied via the same engine as copy_directory().
+    - failed files do not stop the others - shutil.Error is raised at the end, listing them.
+    - special files (like named pipes) in the source are not copied - they are listed in the shutil.Error. Special files in the target are deleted where the source has a file or directory.
+    - symbolic links are never followed, in the source or the target - they are synced as links (like rsync -a). A link in the target that is not in the source is removed, never what it points to.
+    - entries that cannot be read are listed in the shutil.Error - and nothing is deleted under a source directory that could not be listed.
+
+    Example - refresh a build staging directory:
+    ```
+    report = util_dir.sync_directory(build_output_dir, staging_dir)
+    print(report.describe())
+    ```
+
+    Args:
+    from_path (str): The source directory.
+    to_path (str): The target directory. It is created if it does not exist.
+    is_content_compared (bool): Flag to compare files of the same size by content hash, instead of by modified time. Default is False.
+    is_extraneous_deleted (bool): Flag to delete files and directories in the target that are not in the source. Default is True.
+    mtime_tolerance_seconds (float): The difference in modified time to still treat as unchanged - for example 2 for FAT filesystems. Default is 0.
+    max_workers (int): The number of files to copy (or hash) at the same time. Default is the number of CPUs + 4 (up to 16).
+    show_progress (bool): Flag to show a progress bar (by bytes copied) and print a summary. Default is False.
+
+    Returns:
+    SyncReport: The files copied (new or changed), deleted and unchanged.
+    """
+    start = util_time.start_timer()
+    report = SyncReport()
+    errors: list[tuple[str, str, str]] = []
+    os.makedirs(to_path, exist_ok=True)
+
+    source = _list_tree(from_path, DEFAULT_MAX_WALK_WORKERS)
+    target = _list_tree(to_path, DEFAULT_MAX_WALK_WORKERS)
+    errors += [(path, "", message) for path, message in source.errors]
+    errors += [("", path, message) for path, message in target.errors]
+
+    def _delete_from_target(relative_path: str, is_dir: bool = False) -> bool:
+        path = os.path.join(to_path, relative_path)
+        try:
+            if is_dir:
+                util_robust_delete.delete_dirs([path])
+            else:
+                # For a symbolic link, this removes the link - never what it points to
+                util_file.delete_file(path)
+            return True
+        except OSError as e:
+            errors.append(("", path, str(e)))
+            return False
+
+    for relative_path, mode in sorted(source.special_files.items()):
+        from_file = os.path.join(from_path, relative_path)
+        errors.append(
+            (
+                from_file,
+                os.path.join(to_path, relative_path),
+                _describe_special_file(from_file, mode),
+            )
+        )
+    links_to_create = [
+        (relative_path, link_target, not target.contains(relative_path))
+        for relative_path, link_target in sorted(source.symlinks.items())
+        if target.symlinks.get(relative_path) != link_target
+    ]
+    report.unchanged_count += len(source.symlinks) - len(links_to_create)
+
+    # A special file in the target is never the same as a source file - and writing to it could block.
+    # A symbolic link in the target is a leaf - it is kept if the source has the same link, else removed (never followed).
+    target_leaves = sorted(
+        (target.special_files.keys() - source.special_files.keys())
+        | {
+            relative_path
+            for relative_path, link_target in target.symlinks.items()
+            if source.symlinks.get(relative_path) != link_target
+        }
+    )
+    for relative_path in target_leaves:
+        is_in_source = source.contains(relative_path)
+        if not is_in_source and (
+            not is_extraneous_deleted or source.is_under_unlisted_dir(relative_path)
+        ):
+            continue
+        if _delete_from_target(relative_path) and not is_in_source:
+            report.deleted.append(relative_path)
+
+    # Remove anything in the way: a file where the source has a directory or a link, or a directory where the source has a file or a link
+    for relative_path in sorted(
+        target.files.keys() & (source.dirs | source.symlinks.keys())
+    ):
+        if _delete_from_target(relative_path):
+            del target.files[relative_path]
+    for relative_path in sorted(
+        target.dirs & (source.files.keys() | source.symlinks.keys())
+    ):
+        if not _delete_from_target(relative_path, is_dir=True):
+            continue
+        target.dirs = {
+            d
+            for d in target.dirs
+            if d != relative_path and not d.startswith(relative_path + os.sep)
+        }
+        target.files = {
+            f: st
+            for f, st in target.files.items()
+            if not f.startswith(relative_path + os.sep)
+        }
+
+    created_dirs = sorted(source.dirs - target.dirs)
+    for relative_dir in created_dirs:
+        try:
+            os.makedirs(os.path.join(to_path, relative_dir), exist_ok=True)
+        except OSError as e:
+            errors.append(("", os.path.join(to_path, relative_dir), str(e)))
+
+    for relative_path, link_target, is_new in links_to_create:
+        try:
+            os.symlink(link_target, os.path.join(to_path, relative_path))
+        except OSError as e:
+            errors.append(
+                (
+                    os.path.join(from_path, relative_path),
+                    os.path.join(to_path, relative_path),
+                    str(e),
+                )
+            )
+            continue
+        (report.copied_new if is_new else report.copied_changed).append(relative_path)
+
+    files_to_copy: list[tuple[str, str, int]] = []
+    to_compare_content: list[str] = []
+    for relative_path, from_st in source.files.items():
+        to_st = target.files.get(relative_path)
+        if to_st is None:
+            report.copied_new.append(relative_path)
+        elif from_st.st_size != to_st.st_size:
+            report.copied_changed.append(relative_path)
+        elif is_content_compared:
+            to_compare_content.append(relative_path)
+            continue
+        elif abs(from_st.st_mtime - to_st.st_mtime) > mtime_tolerance_seconds:
+            report.copied_changed.append(relative_path)
+        else:
+            report.unchanged_count += 1
+            continue
+        files_to_copy.append(
+            (
+                os.path.join(from_path, relative_path),
+                os.path.join(to_path, relative_path),
+                from_st.st_size,
+            )
+        )
+
+    if to_compare_content:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            is_same_list = executor.map(
+                lambda p: _is_same_content(
+                    os.path.join(from_path, p), os.path.join(to_path, p)
+                ),
+                to_compare_content,
+            )
+            for relative_path, is_same in zip(to_compare_content, is_same_list):
+                from_file = os.path.join(from_path, relative_path)
+                to_file = os.path.join(to_path, relative_path)
+                if is_same:
+                    report.unchanged_count += 1
+                    # Align the modified time, so that a sync without hashing also sees the file as unchanged
+                    try:
+                        shutil.copystat(from_file, to_file)
+                    except OSError as e:
+                        errors.append((from_file, to_file, str(e)))
+                else:
+                    report.copied_changed.append(relative_path)
+                    files_to_copy.append(
+                        (from_file, to_file, source.files[relative_path].st_size)
+                    )
+
+    copier = _FileCopier()
+    report.copied_bytes, copy_errors = _copy_files_in_parallel(
+        files_to_copy, copier, max_workers, show_progress
+    )
+    errors += copy_errors
+
+    if is_extraneous_deleted:
+        # A file whose source is a special file is left alone - the special file is reported instead.
+        # Nothing is deleted under a source directory that could not be listed - its contents are not known.
+        for relative_path in sorted(
+            target.files.keys() - source.files.keys() - source.special_files.keys()
+        ):
+            if source.is_under_unlisted_dir(relative_path):
+                continue
+            if _delete_from_target(relative_path):
+                report.deleted.append(relative_path)
+        extraneous_dirs = {
+            d for d in target.dirs - source.dirs if not source.is_under_unlisted_dir(d)
+        }
+        # Only delete the top-most extraneous directories - their contents go with them
+        for relative_dir in sorted(extraneous_dirs):
+            if os.path.dirname(relative_dir) in extraneous_dirs:
+                continue
+            if _delete_from_target(relative_dir, is_dir=True):
+                report.deleted.append(relative_dir)
+
+    # Copy directory metadata last, since copying the files changes the directory mtimes
+    for relative_dir in reversed(created_dirs):
+        try:
+            shutil.copystat(
+                os.path.join(from_path, relative_dir),
+                os.path.join(to_path, relative_dir),
+            )
+        except OSError as e:
+            errors.append(("", os.path.join(to_path, relative_dir), str(e)))
+
+    report.elapsed_seconds = util_time.end_timer(start)
+    if show_progress:
+        print(report.describe())
+    if errors:
+        raise shutil.Error(errors)
+    return report
 
 
 def ensure_dir_exists(target_dir: str) -> None:
@@ -73,11 +689,172 @@ def find_files(dir_path: str) -> list[str]:
     return found_files
 
 
-def find_files_recursively(dir_path: str, extension: str = ".*") -> list[str]:
-    result = [
-        y for x in os.walk(dir_path) for y in glob(os.path.join(x[0], f"*{extension}"))
-    ]
-    return result
+def _walk_in_parallel(
+    dir_path: str,
+    scan_dir: typing.Callable[[str, int], tuple[R, list[str]]],
+    max_workers: int,
+) -> typing.Generator[R, None, None]:
+    """
+    Walk a directory tree, scanning each directory via scan_dir(path, depth) - which returns a result, plus the subdirectories to walk next.
+
+    - directories are scanned one after another, depth first - until _MIN_DIRS_FOR_PARALLEL_WALK directories are waiting, so a small tree never starts a thread pool.
+    - then with max_workers > 1, the rest are scanned on a thread pool (listing a directory releases the GIL), and results are yielded as each directory completes.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1 - but was {max_workers}")
+    stack = [(dir_path, 0)]
+    while stack and (max_workers == 1 or len(stack) < _MIN_DIRS_FOR_PARALLEL_WALK):
+        path, depth = stack.pop()
+        result, subdirs = scan_dir(path, depth)
+        yield result
+        stack.extend((subdir, depth + 1) for subdir in reversed(subdirs))
+    if not stack:
+        return
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {
+            executor.submit(scan_dir, path, depth): depth for path, depth in stack
+        }
+        while pending:
+            done, _not_done = concurrent.futures.wait(
+                pending.keys(), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                depth = pending.pop(future)
+                result, subdirs = future.result()
+                for subdir in subdirs:
+                    pending[executor.submit(scan_dir, subdir, depth + 1)] = depth + 1
+                yield result
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _is_new_dir(
+    path_to_dir: str, visited: set[tuple[int, int]], lock: threading.Lock
+) -> bool:
+    """
+    Check that a directory has not been visited already (by device and inode) - to avoid cycles when following symlinks.
+    """
+    try:
+        st = os.stat(path_to_dir)
+    except OSError:
+        return False
+    key = (st.st_dev, st.st_ino)
+    with lock:
+        if key in visited:
+            return False
+        visited.add(key)
+        return True
+
+
+def iterate_files_recursively(
+    dir_path: str,
+    extension: str = ".*",
+    max_depth: int | None = None,
+    follow_symlinks: bool = False,
+    excluded_dir_names: list[str] | None = None,
+    max_workers: int = DEFAULT_MAX_WALK_WORKERS,
+) -> typing.Generator[str, None, None]:
+    """
+    Find files under a directory (recursively) that match the extension, yielding each path as it is found.
+
+    - each directory is listed once (via os.scandir), and the names are matched in Python - like glob, hidden files (starting with '.') are not matched.
+    - subtrees are walked in parallel, so the paths are NOT in a fixed order.
+    - directories that cannot be read are skipped (like os.walk).
+
+    Example - find the Python files in a checkout, skipping .git and node_modules:
+    ```
+    for path in util_dir.iterate_files_recursively(repo_dir, ".py", excluded_dir_names=util_dir.COMMON_EXCLUDED_DIR_NAMES):
+        ...
+    ```
+
+    Args:
+    dir_path (str): The directory to search.
+    extension (str): The file extension to match, as a glob pattern for the end of the filename. Default is '.*' (any filename with an extension).
+    max_depth (int): Optional maximum depth of subdirectories to search. 0 means only dir_path itself. Default is None (no limit).
+    follow_symlinks (bool): Flag to walk into symbolic links to directories. Each directory is only visited once, so cycles are safe. Default is False.
+    excluded_dir_names (list): Names of directories not to walk into - for example ['.git', 'node_modules']. Default is None.
+    max_workers (int): The number of directories to list at the same time. Default is 4.
+
+    Yields:
+    str: The path of each matching file.
+    """
+    pattern = f"*{extension}"
+    excluded = set(excluded_dir_names or [])
+    visited: set[tuple[int, int]] = set()
+    visited_lock = threading.Lock()
+    if follow_symlinks:
+        _is_new_dir(dir_path, visited, visited_lock)
+
+    def _scan_dir(path: str, depth: int) -> tuple[list[str], list[str]]:
+        files: list[str] = []
+        subdirs: list[str] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=follow_symlinks):
+                            if entry.name in excluded:
+                                continue
+                            if max_depth is not None and depth >= max_depth:
+                                continue
+                            if follow_symlinks and not _is_new_dir(
+                                entry.path, visited, visited_lock
+                            ):
+                                continue
+                            subdirs.append(entry.path)
+                        elif (
+                            entry.is_file()
+                            and not entry.name.startswith(".")
+                            and fnmatch.fnmatch(entry.name, pattern)
+                        ):
+                            files.append(entry.path)
+                    except OSError:
+                        pass  # Intentionally NOT passing exception onwards - the entry was removed, or is not readable
+        except OSError:
+            pass  # Intentionally NOT passing exception onwards - skip unreadable directories, like os.walk
+        return files, subdirs
+
+    for files in _walk_in_parallel(dir_path, _scan_dir, max_workers):
+        yield from files
+
+
+def find_files_recursively(
+    dir_path: str,
+    extension: str = ".*",
+    max_depth: int | None = None,
+    follow_symlinks: bool = False,
+    excluded_dir_names: list[str] | None = None,
+    max_workers: int = DEFAULT_MAX_WALK_WORKERS,
+) -> list[str]:
+    """
+    Find files under a directory (recursively) that match the extension.
+
+    - see iterate_files_recursively() for details - this collects its results, sorted.
+    - only files are returned. Up to version 0.1.5 (when this used os.walk and glob), directories whose name matched the extension were returned too, and the order was not sorted.
+
+    Args:
+    dir_path (str): The directory to search.
+    extension (str): The file extension to match, as a glob pattern for the end of the filename. Default is '.*' (any filename with an extension).
+    max_depth (int): Optional maximum depth of subdirectories to search. 0 means only dir_path itself. Default is None (no limit).
+    follow_symlinks (bool): Flag to walk into symbolic links to directories. Default is False.
+    excluded_dir_names (list): Names of directories not to walk into - for example ['.git', 'node_modules']. Default is None.
+    max_workers (int): The number of directories to list at the same time. Default is 4.
+
+    Returns:
+    list: The paths of the matching files.
+    """
+    return sorted(
+        iterate_files_recursively(
+            dir_path,
+            extension,
+            max_depth=max_depth,
+            follow_symlinks=follow_symlinks,
+            excluded_dir_names=excluded_dir_names,
+            max_workers=max_workers,
+        )
+    )
 
 
 def get_dir_parts(path_to_file: str) -> list[str]:
@@ -108,17 +885,108 @@ def get_parent_dir(my_path: str) -> str:
     return str(Path(my_path).parent.absolute())
 
 
-def get_total_dir_size_in_bytes(start_path: str) -> int:
-    total_size = 0
-    for dirpath, _dirnames, filenames in os.walk(start_path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
-            # skip if it is symbolic link
-            if not os.path.islink(fp):
-                fp_allow_long_path = "\\\\?\\" + fp if util_os.is_windows() else fp
-                total_size += os.path.getsize(fp_allow_long_path)
+@dataclass
+class DirSize:
+    """
+    The size of the files in a directory tree.
+
+    - apparent_bytes: the total of the file sizes (as reported by ls or Explorer).
+    - allocated_bytes: the disk space actually used, in whole blocks - smaller for sparse or compressed files, larger for many small files. On Windows, this is the same as apparent_bytes.
+    """
 
-    return total_size
+    apparent_bytes: int = 0
+    allocated_bytes: int = 0
+    file_count: int = 0
+
+    def add(self, other: "DirSize") -> None:
+        self.apparent_bytes += other.apparent_bytes
+        self.allocated_bytes += other.allocated_bytes
+        self.file_count += other.file_count
+
+
+@dataclass
+class DirSizeReport:
+    """
+    The result of get_dir_size(): the total size, plus the (recursive) size of each immediate subdirectory.
+    """
+
+    total: DirSize = field(default_factory=DirSize)
+    subdirs: dict[str, DirSize] = field(default_factory=dict)
+
+
+def _allow_long_path(path: str) -> str:
+    if util_os.is_windows() and os.path.isabs(path) and not path.startswith("\\\\?\\"):
+        return "\\\\?\\" + path
+    return path
+
+
+def get_dir_size(
+    start_path: str, max_workers: int = DEFAULT_MAX_WALK_WORKERS
+) -> DirSizeReport:
+    """
+    Calculate the size of a directory tree in a single pass - with the apparent and allocated size, and the size of each immediate subdirectory.
+
+    - each directory is listed once via os.scandir, and each file is stat-ed at most once (on Windows, the stat comes with the directory listing).
+    - symbolic links are not followed or counted.
+    - subtrees are walked in parallel.
+
+    Example - find the largest subdirectories:
+    ```
+    report = util_dir.get_dir_size(repo_dir)
+    for path, size in sorted(report.subdirs.items(), key=lambda item: item[1].allocated_bytes, reverse=True)[:10]:
+        print(path, size.allocated_bytes)
+    ```
+
+    Args:
+    start_path (str): The path of the directory to calculate the size of.
+    max_workers (int): The number of directories to list at the same time. Default is 4.
+
+    Returns:
+    DirSizeReport: The total size, and the size of each immediate subdirectory.
+    """
+
+    def _scan_dir(path: str, depth: int) -> tuple[tuple[str, DirSize], list[str]]:
+        size = DirSize()
+        subdirs: list[str] = []
+        try:
+            with os.scandir(_allow_long_path(path)) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(os.path.join(path, entry.name))
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            size.apparent_bytes += st.st_size
+                            # st_blocks is in 512-byte units (POSIX only)
+                            blocks = getattr(st, "st_blocks", None)
+                            size.allocated_bytes += (
+                                blocks * 512 if blocks is not None else st.st_size
+                            )
+                            size.file_count += 1
+                    except OSError:
+                        pass  # Intentionally NOT passing exception onwards - the entry was removed, or is not readable
+        except OSError:
+            pass  # Intentionally NOT passing exception onwards - skip unreadable directories, like os.walk
+        return (path, size), subdirs
+
+    report = DirSizeReport()
+    start_path_parts = len(Path(start_path).parts)
+    for path, size in _walk_in_parallel(start_path, _scan_dir, max_workers):
+        report.total.add(size)
+        parts = Path(path).parts
+        if len(parts) > start_path_parts:
+            subdir = os.path.join(start_path, parts[start_path_parts])
+            report.subdirs.setdefault(subdir, DirSize()).add(size)
+    return report
+
+
+def get_total_dir_size_in_bytes(start_path: str) -> int:
+    """Calculate the total size of the files in a directory in bytes (excluding symbolic links).
+    Args:
+    start_path (str): The path of the directory to calculate size of.
+    Returns:
+    int: The total (apparent) size of the directory in bytes."""
+    return get_dir_size(start_path).total.apparent_bytes
 
 
 def get_total_dir_size_in_gigabytes(start_path: str) -> float:
@@ -130,25 +998,46 @@ def get_total_dir_size_in_gigabytes(start_path: str) -> float:
     return get_total_dir_size_in_bytes(start_path) / TOTAL_BYTES_IN_GIGABYTE
 
 
-def get_unique_dirpath(path_to_dir: str) -> str:
-    """
-    Get a unique directory path similar to the given path.
+def get_unique_dirpath(path_to_dir: str, is_claimed: bool = False) -> str:
     """
+    Get a unique directory path similar to the given path - like 'x', else 'x-02', 'x-03' and so on.
 
-    def _ends_with_hyphen_number(path: str) -> bool:
-        m = re.search(r"-\d+$", path)
-        return m is not None
+    - see util_file.get_unique_path() for details.
 
+    Args:
+    path_to_dir (str): The preferred path.
+    is_claimed (bool): Flag to create the directory, so that no other thread or process can take the same path. Default is False.
+    """
     # Avoid appending like x-01-02-03
-    if _ends_with_hyphen_number(path_to_dir):
-        path_to_dir = path_to_dir[:-3]
+    path_to_dir = re.sub(r"-\d+$", "", path_to_dir)
+
+    return util_file.get_unique_path(path_to_dir, is_dir=True, is_claimed=is_claimed)
+
 
-    suffix = 2
-    path_to_dir_new = path_to_dir
-    while os.path.exists(path_to_dir_new):
-        path_to_dir_new = f"{path_to_dir}-{suffix:02}"
-        suffix += 1
-    return path_to_dir_new
+def are_empty_trees(
+    paths_to_dirs: list[str],
+    is_empty_file_allowed: bool = False,
+    max_workers: int = DEFAULT_MAX_WALK_WORKERS,
+) -> dict[str, bool]:
+    """
+    Check if each of many directory trees is empty (see is_empty_tree()), checking several trees at the same time.
+
+    Args:
+    paths_to_dirs (list): The paths of the directories to check.
+    is_empty_file_allowed (bool): Flag to treat empty files as empty. Default is False.
+    max_workers (int): The number of directories to check at the same time. Default is 4.
+
+    Returns:
+    dict: For each directory path, True if its tree is empty.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1 - but was {max_workers}")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            lambda path: util_file.is_empty_tree(path, is_empty_file_allowed),
+            paths_to_dirs,
+        )
+        return dict(zip(paths_to_dirs, results))
 
 
 def is_empty_directory(path_to_file: str) -> bool:
@@ -172,16 +1061,7 @@ def is_empty_directory_only_subdirectories(path_to_file: str) -> bool:
     """
     if os.path.isfile(path_to_file):
         return False
-    contents = os.listdir(path_to_file)
-    for content in contents:
-        path_to_sub = os.path.join(path_to_file, content)
-        if os.path.isfile(path_to_sub):
-            return False
-        if not os.path.isfile(path_to_sub):
-            is_empty = is_empty_directory_only_subdirectories(path_to_sub)
-            if not is_empty:
-                return False
-    return True
+    return is_empty_tree(path_to_file)
 
 
 def move_directory(path_to_dir: str, path_to_dir_renamed: str) -> None:
@@ -0,0 +1,341 @@
+"""
+A persistent on-disk index (SQLite) of the files under a directory, for fast repeated size and listing queries on large trees.
+
+[Documentation](http://docs.mrseanryan.cornsnake.s3-website-eu-west-1.amazonaws.com/cornsnake/util_dir_index.html)
+"""
+
+from dataclasses import dataclass
+import fnmatch
+import os
+import sqlite3
+import threading
+import time
+import typing
+
+from . import util_log
+from . import util_time
+
+logger = util_log.getLogger(__name__)
+
+# A directory modified this close to (or after) the time it was scanned may have changed again within the same mtime tick - so it is re-scanned on the next refresh.
+RACY_MTIME_SECONDS = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    scanned_at_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    allocated INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+"""
+
+
+@dataclass
+class DirIndexRefreshReport:
+    """
+    What a refresh of a DirIndex did.
+    """
+
+    dirs_scanned: int = 0
+    dirs_unchanged: int = 0
+    dirs_removed: int = 0
+    dirs_failed: int = 0  # could not be listed - their rows are kept as they were, and they are scanned again on the next refresh
+    elapsed_seconds: float = 0.0
+
+
+class DirIndex:
+    """
+    A persistent index of path, size, mtime and inode of every file under a root directory, stored in a SQLite database.
+
+    - refresh() brings the index up to date. Only directories whose mtime (or inode) changed are listed again - an unchanged tree costs one stat per directory.
+    - queries (like get_total_size_in_bytes() or find_files_by_extension()) are answered from the index, without touching the tree.
+    - a file rewritten in place does not change the mtime of its directory, so its new size is only seen by refresh(is_full=True).
+    - symbolic links are not followed or indexed.
+    - the database file should be outside the root directory (else writing it changes the tree).
+
+    ```
+    with util_dir_index.DirIndex(repo_dir, path_to_db) as index:
+        index.refresh()
+        size = index.get_total_size_in_bytes()
+        json_files = index.find_files_by_extension(repo_dir, ".json")
+    ```
+    """
+
+    def __init__(self, root_dir: str, path_to_db: str) -> None:
+        """
+        Args:
+        root_dir (str): The directory to index.
+        path_to_db (str): The path to the SQLite database file. It is created if it does not exist.
+        """
+        self.root_dir = os.path.abspath(root_dir)
+        self.path_to_db = path_to_db
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path_to_db, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "DirIndex":
+        return self
+
+    def __exit__(self, *_args: typing.Any) -> None:
+        self.close()
+
+    def _to_relative(self, path: str) -> str:
+        relative = os.path.relpath(os.path.abspath(path), self.root_dir)
+        if relative == os.curdir:
+            return ""
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            raise ValueError(
+                f"Path is not under the indexed directory {self.root_dir}: '{path}'"
+            )
+        return relative
+
+    def _to_absolute(self, relative: str) -> str:
+        return os.path.join(self.root_dir, relative) if relative else self.root_dir
+
+    @staticmethod
+    def _get_descendants_range(relative_dir: str) -> tuple[str, str]:
+        """
+        Get the (low, high) range of paths under the given directory - for a prefix query that uses the primary key index (unlike LIKE, which would also need escaping).
+        """
+        if not relative_dir:
+            return ("", "\U0010ffff")
+        prefix = relative_dir + os.sep
+        return (prefix, prefix[:-1] + chr(ord(os.sep) + 1))
+
+    def _remove_dir_tree(self, relative_dir: str) -> None:
+        low, high = self._get_descendants_range(relative_dir)
+        cursor = self._connection.cursor()
+        cursor.execute("DELETE FROM dirs WHERE path = ?", (relative_dir,))
+        cursor.execute("DELETE FROM files WHERE dir = ?", (relative_dir,))
+        cursor.execute("DELETE FROM dirs WHERE path >= ? AND path < ?", (low, high))
+        cursor.execute("DELETE FROM files WHERE path >= ? AND path < ?", (low, high))
+
+    def _scan_dir(
+        self, relative_dir: str, st: os.stat_result, scanned_at_ns: int
+    ) -> list[str]:
+        """
+        List the directory, replacing its rows in the index. Returns the relative paths of its subdirectories.
+
+        Raises:
+        OSError: If the directory cannot be listed - the index is not changed.
+        """
+        files: list[tuple[str, str, str, int, int, int, int]] = []
+        subdirs: list[str] = []
+        with os.scandir(self._to_absolute(relative_dir)) as entries:
+            for entry in entries:
+                relative_path = (
+                    os.path.join(relative_dir, entry.name)
+                    if relative_dir
+                    else entry.name
+                )
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(relative_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        file_st = entry.stat(follow_symlinks=False)
+                        blocks = getattr(file_st, "st_blocks", None)
+                        files.append(
+                            (
+                                relative_path,
+                                relative_dir,
+                                entry.name,
+                                file_st.st_size,
+                                blocks * 512 if blocks is not None else file_st.st_size,
+                                file_st.st_mtime_ns,
+                                entry.inode(),
+                            )
+                        )
+                except OSError:
+                    pass  # Intentionally NOT passing exception onwards - the entry was removed, or is not readable
+
+        cursor = self._connection.cursor()
+        cursor.execute("DELETE FROM files WHERE dir = ?", (relative_dir,))
+        cursor.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", files)
+        known_subdirs = [
+            row[0]
+            for row in cursor.execute(
+                "SELECT path FROM dirs WHERE parent = ?", (relative_dir,)
+            )
+        ]
+        for removed in set(known_subdirs) - set(subdirs):
+            self._remove_dir_tree(removed)
+        cursor.execute(
+            "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)",
+            (
+                relative_dir,
+                os.path.dirname(relative_dir) if relative_dir else None,
+                st.st_mtime_ns,
+                st.st_ino,
+                scanned_at_ns,
+            ),
+        )
+        return subdirs
+
+    def refresh(self, is_full: bool = False) -> DirIndexRefreshReport:
+        """
+        Bring the index up to date with the directory tree.
+
+        Args:
+        is_full (bool): Flag to list every directory again, even if its mtime did not change - to also see files that were rewritten in place. Default is False.
+
+        Returns:
+        DirIndexRefreshReport: How many directories were scanned, unchanged or removed.
+        """
+        start = util_time.start_timer()
+        report = DirIndexRefreshReport()
+        with self._lock, self._connection:
+            known = {
+                row[0]: (row[1], row[2], row[3])
+                for row in self._connection.execute(
+                    "SELECT path, mtime_ns, inode, scanned_at_ns FROM dirs"
+                )
+            }
+            stack = [""]
+            while stack:
+                relative_dir = stack.pop()
+                try:
+                    st = os.stat(self._to_absolute(relative_dir))
+                except OSError:
+                    self._remove_dir_tree(relative_dir)
+                    report.dirs_removed += 1
+                    continue
+                previous = known.get(relative_dir)
+                is_unchanged = (
+                    not is_full
+                    and previous is not None
+                    and previous[0] == st.st_mtime_ns
+                    and previous[1] == st.st_ino
+                    and previous[2] - st.st_mtime_ns > RACY_MTIME_SECONDS * 1e9
+                )
+                if is_unchanged:
+                    report.dirs_unchanged += 1
+                    stack.extend(
+                        row[0]
+                        for row in self._connection.execute(
+                            "SELECT path FROM dirs WHERE parent = ?", (relative_dir,)
+                        )
+                    )
+                    continue
+                try:
+                    subdirs = self._scan_dir(relative_dir, st, time.time_ns())
+                except OSError as e:
+                    # For example a temporary EACCES or EIO - keep the rows (and the stored mtime, so the directory is scanned again next time), and carry on into the known subdirectories
+                    logger.warning(f"Cannot list directory '{relative_dir}': {e}")
+                    report.dirs_failed += 1
+                    subdirs = [
+                        row[0]
+                        for row in self._connection.execute(
+                            "SELECT path FROM dirs WHERE parent = ?", (relative_dir,)
+                        )
+                    ]
+                else:
+                    report.dirs_scanned += 1
+                stack.extend(subdirs)
+        report.elapsed_seconds = util_time.end_timer(start)
+        logger.debug(
+            f"Refreshed index of {self.root_dir}: {report.dirs_scanned} directories scanned, {report.dirs_unchanged} unchanged [time taken: {util_time.describe_elapsed_seconds(report.elapsed_seconds)}]"
+        )
+        return report
+
+    def get_total_size_in_bytes(
+        self, dir_path: str | None = None, is_allocated: bool = False
+    ) -> int:
+        """
+        Get the total size of the files in the directory tree, from the index.
+
+        Args:
+        dir_path (str): Optional subdirectory to get the size of. Default is None (the root directory).
+        is_allocated (bool): Flag to get the disk space used (whole blocks) instead of the total of the file sizes. Default is False.
+        """
+        relative_dir = self._to_relative(dir_path) if dir_path else ""
+        low, high = self._get_descendants_range(relative_dir)
+        column = "allocated" if is_allocated else "size"
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT COALESCE(SUM({column}), 0) FROM files WHERE dir = ? OR (path >= ? AND path < ?)",
+                (relative_dir, low, high),
+            ).fetchone()
+        return int(row[0])
+
+    def get_file_count(self, dir_path: str | None = None) -> int:
+        """
+        Get the number of files in the directory tree, from the index.
+
+        Args:
+        dir_path (str): Optional subdirectory to count the files of. Default is None (the root directory).
+        """
+        relative_dir = self._to_relative(dir_path) if dir_path else ""
+        low, high = self._get_descendants_range(relative_dir)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COUNT(*) FROM files WHERE dir = ? OR (path >= ? AND path < ?)",
+                (relative_dir, low, high),
+            ).fetchone()
+        return int(row[0])
+
+    def find_files_by_extension(self, dir_path: str, extension: str) -> list[str]:
+        """
+        Find the files directly in a directory that end with the extension, from the index - like util_dir.find_files_by_extension().
+
+        Args:
+        dir_path (str): The directory to search (under the root directory).
+        extension (str): The file extension to search for.
+
+        Returns:
+        list: The paths of the files with the extension.
+        """
+        relative_dir = self._to_relative(dir_path)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path, name FROM files WHERE dir = ? ORDER BY path",
+                (relative_dir,),
+            ).fetchall()
+        return [
+            self._to_absolute(path) for path, name in rows if name.endswith(extension)
+        ]
+
+    def find_files_recursively(
+        self, extension: str = ".*", dir_path: str | None = None
+    ) -> list[str]:
+        """
+        Find the files under a directory (recursively) whose name matches the extension, from the index - like util_dir.find_files_recursively().
+
+        Args:
+        extension (str): The file extension to match, as a glob pattern for the end of the filename. Default is '.*' (any filename with an extension).
+        dir_path (str): Optional subdirectory to search. Default is None (the root directory).
+
+        Returns:
+        list: The paths of the matching files, sorted.
+        """
+        relative_dir = self._to_relative(dir_path) if dir_path else ""
+        low, high = self._get_descendants_range(relative_dir)
+        pattern = f"*{extension}"
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path, name FROM files WHERE dir = ? OR (path >= ? AND path < ?) ORDER BY path",
+                (relative_dir, low, high),
+            ).fetchall()
+        return [
+            self._to_absolute(path)
+            for path, name in rows
+            if not name.startswith(".") and fnmatch.fnmatch(name, pattern)
+        ]
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
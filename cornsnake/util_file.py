@@ -6,7 +6,9 @@ File operations including copying, reading, and writing text to files.
 
 import datetime
 import os
+import re
 import shutil
+import threading
 
 from . import util_os
 from . import util_pdf
@@ -21,7 +23,7 @@ def backup_file_by_copying(
     Backup the given file by copying it to a new uniquely named file.
     """
     path_to_backup = os.path.join(backup_dir, backup_filename)
-    path_to_backup = get_unique_filepath(path_to_backup)
+    path_to_backup = get_unique_filepath(path_to_backup, is_claimed=True)
     copy_file(path_to_file, path_to_backup)
     return path_to_backup
 
@@ -90,17 +92,102 @@ def get_modified_date(path_to_file: str) -> datetime.datetime:
     return datetime.datetime.fromtimestamp(os.path.getmtime(path_to_file))
 
 
-def get_unique_filepath(path_to_file: str) -> str:
+def get_unique_filepath(path_to_file: str, is_claimed: bool = False) -> str:
     """
-    Get a unique new filepath, similar to the given path.
+    Get a unique new filepath, similar to the given path - like 'x.txt', else 'x-02.txt', 'x-03.txt' and so on.
+
+    - see get_unique_path() for details.
+
+    Args:
+    path_to_file (str): The preferred path.
+    is_claimed (bool): Flag to create the (empty) file, so that no other thread or process can take the same path. Default is False.
+    """
+    return get_unique_path(path_to_file, is_dir=False, is_claimed=is_claimed)
+
+
+# (directory, stem, extension) -> the next suffix to try, after the last path claimed
+_next_suffixes: dict[tuple[str, str, str], int] = {}
+# The cache is cleared when it reaches this many entries, so a long-running process does not grow it without bound
+_MAX_NEXT_SUFFIXES = 1000
+_next_suffixes_lock = threading.Lock()
+
+
+def _find_next_suffix(dir_path: str, stem: str, extension: str) -> int:
     """
-    filename_no_extension, extension = os.path.splitext(path_to_file)
+    Scan the directory once, to find the suffix after the highest one already used for this stem and extension.
+    """
+    flags = re.IGNORECASE if util_os.is_windows() else 0
+    pattern = re.compile(re.escape(stem) + r"-(\d+)" + re.escape(extension), flags)
+    max_suffix = 1
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                match = pattern.fullmatch(entry.name)
+                if match:
+                    max_suffix = max(max_suffix, int(match.group(1)))
+    except FileNotFoundError:
+        pass  # Intentionally NOT passing exception onwards - no directory, so no suffixes used yet
+    return max_suffix + 1
+
+
+def _try_claim_path(path: str, is_dir: bool, is_claimed: bool) -> bool:
+    """
+    Try to take the path: create it atomically if is_claimed (failing if it exists), else check it does not exist.
+    """
+    if not is_claimed:
+        return not os.path.exists(path)
+    try:
+        if is_dir:
+            os.mkdir(path)
+        else:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        return False
 
-    suffix = 2
-    while os.path.exists(path_to_file):
-        path_to_file = f"{filename_no_extension}-{suffix:02}{extension}"
+
+def get_unique_path(path: str, is_dir: bool = False, is_claimed: bool = False) -> str:
+    """
+    Get a unique new path, similar to the given path - the path itself if it is free, else with a numbered suffix like 'x-02.txt'.
+
+    - the suffix is after the highest one used, so gaps left by deleted files are not re-used.
+    - with is_claimed, the file (or directory) is created atomically (O_EXCL / mkdir), so concurrent threads or processes never get the same path. The next suffix is remembered after each claim - so allocating many paths in one directory does not scan it or probe every used suffix each time.
+    - without is_claimed, nothing is reserved: the directory is scanned on each call, so the same path is returned until the caller creates it (and another process could take the path first).
+
+    Args:
+    path (str): The preferred path.
+    is_dir (bool): Flag to indicate the path is a directory - so the suffix goes at the end, not before an extension. Default is False.
+    is_claimed (bool): Flag to create the (empty) file or directory. Default is False.
+
+    Returns:
+    str: The unique path.
+    """
+    if _try_claim_path(path, is_dir, is_claimed):
+        return path
+    dir_path, filename = os.path.split(os.path.abspath(path))
+    stem, extension = (filename, "") if is_dir else os.path.splitext(filename)
+    path_without_extension = path[: len(path) - len(extension)]
+    if not is_claimed:
+        suffix = _find_next_suffix(dir_path, stem, extension)
+        while True:
+            candidate = f"{path_without_extension}-{suffix:02}{extension}"
+            if _try_claim_path(candidate, is_dir, is_claimed):
+                return candidate
+            suffix += 1
+
+    key = (dir_path, stem, extension)
+    with _next_suffixes_lock:
+        suffix = _next_suffixes.get(key) or _find_next_suffix(dir_path, stem, extension)
+    while True:
+        candidate = f"{path_without_extension}-{suffix:02}{extension}"
+        # Claiming is atomic, so threads that try the same suffix at once just move on to the next one
+        if _try_claim_path(candidate, is_dir, is_claimed):
+            with _next_suffixes_lock:
+                if len(_next_suffixes) >= _MAX_NEXT_SUFFIXES:
+                    _next_suffixes.clear()
+                _next_suffixes[key] = max(_next_suffixes.get(key, 0), suffix + 1)
+            return candidate
         suffix += 1
-    return path_to_file
 
 
 def get_this_script_dir(this_file: str) -> str:
@@ -138,9 +225,39 @@ def _get_long_file_path(path_to_file: str) -> str:
     return "\\\\?\\" + path_to_file if util_os.is_windows() else path_to_file
 
 
+def is_empty_tree(path_to_dir: str, is_empty_file_allowed: bool = False) -> bool:
+    """
+    Check if a directory tree is empty - it contains only (empty) subdirectories, and optionally empty files.
+
+    - stops at the first file (or non-empty file) found, so a non-empty tree is usually detected quickly.
+    - iterative (no recursion), so very deep trees do not hit the recursion limit.
+    - each directory is listed once via os.scandir. Symbolic links count as content, and are not followed.
+
+    Args:
+    path_to_dir (str): The path of the directory to check.
+    is_empty_file_allowed (bool): Flag to treat empty files as empty. Default is False (any file means the tree is not empty).
+
+    Returns:
+    bool: True if the directory tree is empty, False otherwise.
+    """
+    stack = [path_to_dir]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    return False
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif not is_empty_file_allowed:
+                    return False
+                elif entry.stat(follow_symlinks=False).st_size > 0:
+                    return False
+    return True
+
+
 def is_empty_directory_only_subdirectories(path_to_file: str) -> bool:
     """
-    Check if a directory is empty (only subdirectories are empty).
+    Check if a directory is empty (only subdirectories and files that are empty).
 
     Args:
     path_to_file (str): The path to the directory to check.
@@ -150,16 +267,7 @@ def is_empty_directory_only_subdirectories(path_to_file: str) -> bool:
     """
     if os.path.isfile(path_to_file):
         return is_empty_file(path_to_file)
-    contents = os.listdir(path_to_file)
-    for content in contents:
-        path_to_sub = os.path.join(path_to_file, content)
-        if os.path.isfile(path_to_sub):
-            return is_empty_file(path_to_sub)
-        if not os.path.isfile(path_to_sub):
-            is_empty = is_empty_directory_only_subdirectories(path_to_sub)
-            if not is_empty:
-                return False
-    return True
+    return is_empty_tree(path_to_file, is_empty_file_allowed=True)
 
 
 def is_empty_file(path_to_file: str) -> bool:
@@ -4,7 +4,14 @@ Functions for interacting with a Git repository. It includes functions for execu
 [Documentation](http://docs.mrseanryan.cornsnake.s3-website-eu-west-1.amazonaws.com/cornsnake/util_git.html)
 """
 
+import concurrent.futures
+from dataclasses import dataclass, field
 import os
+from pathlib import Path
+import re
+import subprocess
+import threading
+import typing
 
 from . import config
 from . import util_date
@@ -13,7 +20,9 @@ from . import util_file
 from . import util_list
 from . import util_print
 from . import util_log
+from . import util_os
 from . import util_proc
+from . import util_time
 
 COMMIT_PARTS_SEPARTOR = "_||_"
 
@@ -37,11 +46,425 @@ def _parse_result(result: str) -> list[str]:
     return parts_cleaned
 
 
+def _normalize_config_key(key: str) -> str:
+    """
+    Normalize a git config key, the same way git does: section and variable names are case-insensitive, but any subsection is case-sensitive.
+
+    Example: 'Remote.Origin.URL' -> 'remote.Origin.url'
+    """
+    parts = key.split(".")
+    if len(parts) < 2:
+        return key.lower()
+    return ".".join([parts[0].lower()] + parts[1:-1] + [parts[-1].lower()])
+
+
+# Cache of refs read from files: git dir -> (mtimes of packed-refs and the refs directories, refs)
+_refs_from_files_cache: dict[str, tuple[dict[str, int], dict[str, str]]] = {}
+_refs_from_files_cache_lock = threading.Lock()
+
+# A file changed within this many seconds may change again with the same mtime (coarse filesystem timestamps)
+RACY_MTIME_SECONDS = 2
+
+
+def _find_git_dir_for_reading_files(repo_dir: str) -> str | None:
+    """
+    Find the git directory of the given repository, if its refs can be read directly from files.
+
+    Returns:
+    str: The git directory ('.git', or the repository itself if bare), or None if the layout is not supported - for example a linked worktree, a submodule, a sub-directory of a repository, or the reftable format.
+    """
+    dot_git = os.path.join(repo_dir, ".git")
+    if os.path.isdir(dot_git):
+        git_dir = dot_git
+    elif os.path.isfile(os.path.join(repo_dir, "HEAD")) and os.path.isdir(
+        os.path.join(repo_dir, "refs")
+    ):
+        git_dir = repo_dir  # bare repository, like a mirror clone
+    else:
+        return None
+    if os.path.exists(os.path.join(git_dir, "reftable")):
+        return None
+    if os.path.exists(os.path.join(git_dir, "commondir")):
+        return None
+    return git_dir
+
+
+def _parse_head(head: str) -> str:
+    """
+    Parse the content of a HEAD file, to get the current branch - or 'HEAD' if detached (the same as 'git rev-parse --abbrev-ref HEAD').
+    """
+    head = head.strip()
+    if head.startswith("ref: "):
+        return head.removeprefix("ref: ").removeprefix("refs/heads/")
+    return "HEAD"
+
+
+def _read_packed_refs(path_to_packed_refs: str) -> dict[str, str]:
+    """
+    Read a packed-refs file into a dictionary of ref -> object ID.
+    """
+    refs: dict[str, str] = {}
+    if not os.path.exists(path_to_packed_refs):
+        return refs
+    for line in util_file.read_lines_from_file(path_to_packed_refs):
+        # Skip the header ('# pack-refs with: ...') and peeled tags ('^<object ID>')
+        if not line or line.startswith("#") or line.startswith("^"):
+            continue
+        object_id, _sep, ref = line.partition(" ")
+        refs[ref] = object_id
+    return refs
+
+
+def _get_mtime_ns_or_zero(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def _are_mtimes_unchanged(mtimes: dict[str, int]) -> bool:
+    """
+    Are the files and directories that were read for a cache unchanged, so the cache is still valid.
+
+    - for refs: adding, updating (git renames a lock file) or deleting a loose ref changes the mtime of its directory.
+    - anything changed very recently is treated as changed, since a coarse mtime may not show a second change.
+    """
+    racy_ns = (util_time.start_timer() - RACY_MTIME_SECONDS) * 1_000_000_000
+    for path, mtime in mtimes.items():
+        current_mtime = _get_mtime_ns_or_zero(path)
+        if current_mtime != mtime or current_mtime >= racy_ns:
+            return False
+    return True
+
+
+def _read_refs_from_git_dir(git_dir: str) -> tuple[dict[str, int], dict[str, str]]:
+    """
+    Read the refs of the given git dir: packed-refs, overridden by any loose refs under 'refs/'.
+
+    Returns:
+    tuple: (mtimes of the files and directories read, refs mapped to object IDs)
+    """
+    path_to_packed_refs = os.path.join(git_dir, "packed-refs")
+    mtimes = {path_to_packed_refs: _get_mtime_ns_or_zero(path_to_packed_refs)}
+    refs = _read_packed_refs(path_to_packed_refs)
+    for dirpath, _dirnames, filenames in os.walk(os.path.join(git_dir, "refs")):
+        mtimes[dirpath] = _get_mtime_ns_or_zero(dirpath)
+        for filename in filenames:
+            if filename.endswith(".lock"):
+                continue
+            path_to_ref = os.path.join(dirpath, filename)
+            ref = os.path.relpath(path_to_ref, git_dir).replace(os.sep, "/")
+            try:
+                value = util_file.read_text_from_file(path_to_ref).strip()
+            except FileNotFoundError:
+                continue  # deleted while reading
+            if value.startswith("ref: "):
+                # Symbolic ref, like refs/remotes/origin/HEAD - not listed
+                refs.pop(ref, None)
+                continue
+            refs[ref] = value
+    return (mtimes, refs)
+
+
+def get_refs_from_files(repo_dir: str) -> dict[str, str] | None:
+    """
+    Get all refs of the repository by reading '.git/refs/**' and '.git/packed-refs' directly, without starting a git process.
+
+    - results are cached, and re-read only when packed-refs or a refs directory has changed (by mtime).
+    - symbolic refs (like refs/remotes/origin/HEAD) are not included.
+
+    Example: get_refs_from_files(repo_dir) -> {'refs/heads/main': '1234abcd...', 'refs/tags/v1': '5678ef01...'}
+
+    Args:
+    repo_dir (str): The repository directory path.
+    Returns:
+    dict: The refs mapped to their object IDs, or None if the repository layout is not supported (then use the git CLI instead).
+    """
+    git_dir = _find_git_dir_for_reading_files(repo_dir)
+    if git_dir is None:
+        return None
+    git_dir = os.path.abspath(git_dir)
+    with _refs_from_files_cache_lock:
+        cached = _refs_from_files_cache.get(git_dir)
+        if cached is not None and _are_mtimes_unchanged(cached[0]):
+            return dict(cached[1])
+    mtimes, refs = _read_refs_from_git_dir(git_dir)
+    with _refs_from_files_cache_lock:
+        _refs_from_files_cache[git_dir] = (mtimes, refs)
+    return dict(refs)
+
+
+def get_current_branch_from_files(repo_dir: str) -> str | None:
+    """
+    Get the current branch by reading '.git/HEAD' directly, without starting a git process.
+
+    Args:
+    repo_dir (str): The repository directory path.
+    Returns:
+    str: The name of the current branch, or 'HEAD' if detached. None if the repository layout is not supported (then use the git CLI instead).
+    """
+    git_dir = _find_git_dir_for_reading_files(repo_dir)
+    if git_dir is None:
+        return None
+    return _parse_head(util_file.read_text_from_file(os.path.join(git_dir, "HEAD")))
+
+
+_GIT_OBJECT_TYPES = {"blob", "tree", "commit", "tag"}
+
+
+class GitSession:
+    """
+    A long-lived session for reading from one Git repository, without starting a new git process for every read.
+
+    - object and ref lookups are served over the pipes of 'git cat-file --batch' and 'git cat-file --batch-check' processes that are kept open.
+    - config and ref listings are read once (one git process each) and then served from memory.
+    - call refresh() after changing the repository (for example checkout, fetch or git config) so that cached values are re-read.
+    - call close() when done, or use as a context manager:
+
+    ```
+    with util_git.GitSession(repo_dir) as session:
+        commit_id = util_git.get_last_commit_id(repo_dir, session=session)
+    ```
+    """
+
+    def __init__(self, repo_dir: str) -> None:
+        """
+        Args:
+        repo_dir (str): The path to the repository directory.
+        """
+        self.repo_dir = repo_dir
+        self._lock = threading.Lock()
+        self._batch_proc: subprocess.Popen[bytes] | None = None
+        self._batch_check_proc: subprocess.Popen[bytes] | None = None
+        self._config: dict[str, str] | None = None
+        self._refs: dict[str, str] | None = None
+        self._git_dir: str | None = None
+
+    def __enter__(self) -> "GitSession":
+        return self
+
+    def __exit__(self, *_args: typing.Any) -> None:
+        self.close()
+
+    def _start_cat_file(self, batch_option: str) -> subprocess.Popen[bytes]:
+        """
+        Start a 'git cat-file' coprocess with the given batch option.
+        """
+        logger.debug(f"Starting 'git cat-file {batch_option}' at {self.repo_dir}")
+        return subprocess.Popen(
+            [config.PATH_TO_GIT, "cat-file", batch_option],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.repo_dir,
+        )
+
+    def _read_header(
+        self, proc: subprocess.Popen[bytes], object_name: str
+    ) -> tuple[str, str, int] | None:
+        """
+        Send the object name to the given cat-file process, and read back the header line.
+
+        Returns:
+        tuple: (object ID, type, size in bytes), or None if the object is missing or ambiguous.
+        """
+        if "\n" in object_name:
+            raise ValueError(f"Object name cannot contain a new line: '{object_name}'")
+        assert proc.stdin is not None and proc.stdout is not None
+        try:
+            proc.stdin.write(object_name.encode() + b"\n")
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass  # Intentionally NOT passing exception onwards - the empty header below is reported instead
+        header = proc.stdout.readline()
+        if not header:
+            # The process has exited - for example, not a git repository
+            std_err = proc.stderr.read().decode() if proc.stderr is not None else ""
+            proc.wait()
+            raise RuntimeError(
+                f"{std_err.strip()}. Code: {proc.returncode}", proc.returncode
+            )
+        header = header.rstrip(b"\n")
+        # Check the suffix first - the object name can itself contain spaces, like 'HEAD:my file.txt missing'
+        if header.endswith(b" missing") or header.endswith(b" ambiguous"):
+            return None
+        parts = header.decode().split(" ")
+        if (
+            len(parts) != 3
+            or parts[1] not in _GIT_OBJECT_TYPES
+            or not parts[2].isdigit()
+        ):
+            raise RuntimeError(
+                f"Unexpected header from 'git cat-file' for '{object_name}': '{header.decode(errors='replace')}'",
+                None,
+            )
+        return (parts[0], parts[1], int(parts[2]))
+
+    def get_object_info(self, object_name: str) -> tuple[str, str, int] | None:
+        """
+        Get the ID, type and size of the given object, via 'git cat-file --batch-check'.
+
+        Args:
+        object_name (str): The object name - a commit ID, a ref like 'HEAD' or 'refs/tags/v1', or an expression like 'HEAD:README.md'.
+
+        Returns:
+        tuple: (object ID, type, size in bytes), or None if the object does not exist.
+        """
+        with self._lock:
+            if self._batch_check_proc is None:
+                self._batch_check_proc = self._start_cat_file("--batch-check")
+            return self._read_header(self._batch_check_proc, object_name)
+
+    def read_object(self, object_name: str) -> bytes | None:
+        """
+        Read the content of the given object, via 'git cat-file --batch'.
+
+        Args:
+        object_name (str): The object name - a commit ID, a ref like 'HEAD' or an expression like 'HEAD:README.md'.
+
+        Returns:
+        bytes: The raw content of the object, or None if the object does not exist.
+        """
+        with self._lock:
+            if self._batch_proc is None:
+                self._batch_proc = self._start_cat_file("--batch")
+            info = self._read_header(self._batch_proc, object_name)
+            if info is None:
+                return None
+            assert self._batch_proc.stdout is not None
+            size = info[2]
+            content = self._batch_proc.stdout.read(size + 1)  # + 1 for the trailing LF
+        return content[:size]
+
+    def resolve_ref(self, ref: str) -> str | None:
+        """
+        Resolve the given ref (like 'HEAD', 'main' or 'refs/tags/v1') to an object ID, or None if it does not exist.
+        """
+        info = self.get_object_info(ref)
+        if info is None:
+            return None
+        return info[0]
+
+    def get_last_commit_id(self) -> str:
+        """
+        Get the commit ID of HEAD.
+        """
+        commit = self.resolve_ref("HEAD")
+        if commit is None:
+            raise RuntimeError(
+                f"The repository at {self.repo_dir} has no commits on HEAD", 128
+            )
+        return commit
+
+    def _get_git_dir(self) -> str:
+        if self._git_dir is None:
+            self._git_dir = execute_command(
+                "rev-parse", ["--absolute-git-dir"], self.repo_dir
+            ).strip()
+        return self._git_dir
+
+    def get_current_branch(self) -> str:
+        """
+        Get the name of the current branch, or 'HEAD' if detached (the same as 'git rev-parse --abbrev-ref HEAD').
+        """
+        path_to_head = os.path.join(self._get_git_dir(), "HEAD")
+        return _parse_head(util_file.read_text_from_file(path_to_head))
+
+    def get_refs(self, prefix: str = "refs/") -> dict[str, str]:
+        """
+        Get the refs that start with the given prefix, mapped to their object IDs.
+
+        - the refs are listed once per session (until refresh() is called).
+
+        Example: get_refs('refs/tags/') -> {'refs/tags/v1': '1234abcd...'}
+        """
+        with self._lock:
+            if self._refs is None:
+                result = execute_command(
+                    "for-each-ref", ["--format=%(objectname) %(refname)"], self.repo_dir
+                )
+                refs = {}
+                for line in result.split("\n"):
+                    if not line.strip():
+                        continue
+                    object_id, ref = line.split(" ", 1)
+                    refs[ref] = object_id
+                self._refs = refs
+            return {
+                ref: object_id
+                for ref, object_id in self._refs.items()
+                if ref.startswith(prefix)
+            }
+
+    def get_all_tags(self) -> list[str]:
+        """
+        Get the names of all tags, sorted by name (the same as 'git tag').
+        """
+        tag_refs = self.get_refs("refs/tags/")
+        return [ref.removeprefix("refs/tags/") for ref in sorted(tag_refs.keys())]
+
+    def get_config(self, key: str) -> str:
+        """
+        Get the Git configuration setting value for the specified key, or '' if not set.
+
+        - the whole config is read once per session (until refresh() is called).
+        """
+        with self._lock:
+            if self._config is None:
+                self._config = self._read_config()
+            return self._config.get(_normalize_config_key(key), "")
+
+    def _read_config(self) -> dict[str, str]:
+        return _read_config_via_git(self.repo_dir)
+
+    def refresh(self) -> None:
+        """
+        Clear cached refs and config, and restart the cat-file processes - call this after changing the repository.
+        """
+        with self._lock:
+            self._close_processes()
+            self._config = None
+            self._refs = None
+
+    def _close_processes(self) -> None:
+        for proc in [self._batch_proc, self._batch_check_proc]:
+            if proc is None:
+                continue
+            try:
+                assert proc.stdin is not None
+                proc.stdin.close()
+                proc.wait(timeout=5)
+            except Exception as e:
+                logger.debug(f"Killing git cat-file process: {e}")
+                proc.kill()
+                proc.wait()
+            for stream in [proc.stdout, proc.stderr]:
+                if stream is not None:
+                    stream.close()
+        self._batch_proc = None
+        self._batch_check_proc = None
+
+    def close(self) -> None:
+        """
+        Close the cat-file processes of this session.
+        """
+        with self._lock:
+            self._close_processes()
+
+
 def get_branches_with_commits_in_origin_not_local(
-    repo_dir: str, branches: list[str]
+    repo_dir: str, branches: list[str], checkout_branches: bool = True
 ) -> list[str]:
     """
     For all the given branches, find any missing commits: commits that are on origin but not this copy of the repository.
+
+    Args:
+    repo_dir (str): The repository directory path.
+    branches (list): List of branches to check.
+    checkout_branches (bool): Flag to checkout each branch before comparing it to origin. Set to False to compare the refs directly, without touching the working tree (much faster on a large working tree). Default is True.
+
+    Raises:
+    RuntimeError: If a branch exists neither locally nor on origin (in both modes).
     """
     if not has_git_remote_urls(repo_dir):
         util_print.print_warning(
@@ -50,36 +473,75 @@ def get_branches_with_commits_in_origin_not_local(
         return []
     branches_with_missing_commits = []
     fetch(repo_dir)
+    local_branches = _get_local_branches(repo_dir)
+    origin_branches = execute_command(
+        "for-each-ref",
+        ["--format=%(refname:lstrip=3)", "refs/remotes/origin/"],
+        repo_dir,
+    ).splitlines()
     for branch in branches:
-        checkout_branch(branch, repo_dir)
-        result = execute_command("rev-list", [f"HEAD..origin/{branch}"], repo_dir)
+        if branch not in local_branches and branch not in origin_branches:
+            raise RuntimeError(
+                f"Branch '{branch}' exists neither locally nor on origin - at {repo_dir}",
+                None,
+            )
+        if checkout_branches:
+            checkout_branch(branch, repo_dir)
+            local_ref = "HEAD"
+        elif branch not in local_branches:
+            # Checkout would create the local branch from origin - so no commits would be missing
+            continue
+        else:
+            local_ref = f"refs/heads/{branch}"
+        result = execute_command(
+            "rev-list", ["-n", "1", f"{local_ref}..origin/{branch}"], repo_dir
+        )
         if result.strip():
             branches_with_missing_commits.append(branch)
     return branches_with_missing_commits
 
 
-def get_current_branch(local_repo_location: str) -> str:
+def get_current_branch(
+    local_repo_location: str,
+    session: GitSession | None = None,
+    read_refs_directly: bool = False,
+) -> str:
     """
     Function to get the current branch of the Git repository.
 
     Args:
     local_repo_location (str): The local repository location.
+    session (GitSession): Optional session to read from, instead of starting a new git process.
+    read_refs_directly (bool): Flag to read '.git/HEAD' directly instead of starting a new git process (falls back to git for unsupported layouts like worktrees). Default is False.
 
     Returns:
     str: The name of the current branch.
     """
+    if session is not None:
+        return session.get_current_branch()
+    if read_refs_directly:
+        branch = get_current_branch_from_files(local_repo_location)
+        if branch is not None:
+            return branch
     return execute_command(
         "rev-parse", ["--abbrev-ref", "HEAD"], local_repo_location
     ).strip()
 
 
-def get_last_commit_id(path_to_repo_dir: str, file_only: str | None = None) -> str:
+def get_last_commit_id(
+    path_to_repo_dir: str,
+    file_only: str | None = None,
+    session: GitSession | None = None,
+) -> str:
     """Get the last commit ID based on the given path to the repository directory and an optional file parameter.
     Args:
     path_to_repo_dir (str): The path to the repository directory.
     file_only (str): Optional parameter to specify a specific file.
+    session (GitSession): Optional session to read from, instead of starting a new git process (not used if file_only is set).
     Returns:
     str: The last commit ID."""
+    if session is not None and file_only is None:
+        return session.get_last_commit_id()
     # git log -n 1 --pretty=format:"%H_|\_%ad_|\_%s" --date=short BUILD.plz
     git_args = [
         "log",
@@ -156,53 +618,393 @@ def get_git_remote_push_url(repo_dir: str) -> str:
         return ""
 
 
-def execute_command(command: str, git_args: list[str], working_dir: str) -> str:
+def execute_command(
+    command: str,
+    git_args: list[str],
+    working_dir: str,
+    timeout_seconds: float | None = None,
+) -> str:
     """Execute a Git command with specified arguments in the given working directory.
     Args:
     command (str): The Git command to execute.
     git_args (list): List of arguments for the Git command.
     working_dir (str): The working directory to execute the command in.
+    timeout_seconds (float): Optional time limit - on timeout git (and its helpers) are killed and util_proc.ProcessTimeoutError is raised. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
     Returns:
     str: The output of the command."""
     git_args_with_command = [command] + git_args
     return util_proc.run_process_and_get_output(
-        config.PATH_TO_GIT, git_args_with_command, working_dir
+        config.PATH_TO_GIT,
+        git_args_with_command,
+        working_dir,
+        timeout_seconds=timeout_seconds,
+    )
+
+
+async def execute_command_async(
+    command: str,
+    git_args: list[str],
+    working_dir: str,
+    timeout_seconds: float | None = None,
+) -> str:
+    """Execute a Git command with specified arguments in the given working directory - without blocking the asyncio event loop.
+
+    Example - fetch many repositories at the same time:
+    ```
+    await asyncio.gather(*[util_git.execute_command_async("fetch", [], repo_dir) for repo_dir in repo_dirs])
+    ```
+
+    Args:
+    command (str): The Git command to execute.
+    git_args (list): List of arguments for the Git command.
+    working_dir (str): The working directory to execute the command in.
+    timeout_seconds (float): Optional time limit - on timeout (or cancellation) git (and its helpers) are killed. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+    Returns:
+    str: The output of the command."""
+    git_args_with_command = [command] + git_args
+    return await util_proc.run_process_and_get_output_async(
+        config.PATH_TO_GIT,
+        git_args_with_command,
+        working_dir,
+        timeout_seconds=timeout_seconds,
     )
 
 
+def iterate_command(
+    command: str,
+    git_args: list[str],
+    working_dir: str,
+    is_nul_delimited: bool = False,
+) -> typing.Generator[str, None, None]:
+    """Execute a Git command, yielding each line (or NUL-delimited record) of its output as git emits it.
+    Args:
+    command (str): The Git command to execute.
+    git_args (list): List of arguments for the Git command. If is_nul_delimited is set, include the relevant option here (like '-z').
+    working_dir (str): The working directory to execute the command in.
+    is_nul_delimited (bool): Flag to split the output on NUL instead of new line. Default is False.
+    Yields:
+    str: Each record of the output."""
+    separator = b"\0" if is_nul_delimited else b"\n"
+    yield from util_proc.iterate_process_output(
+        config.PATH_TO_GIT, [command] + git_args, working_dir, separator=separator
+    )
+
+
+def iterate_commits(
+    repo_dir: str, git_log_args: list[str] | None = None
+) -> typing.Generator[tuple[str, str, str], None, None]:
+    """Iterate over the commits of 'git log', yielding each commit as git emits it.
+
+    Example: iterate_commits(repo_dir, ['--after=2023-01-31', 'main'])
+
+    Args:
+    repo_dir (str): The repository directory path.
+    git_log_args (list): Extra arguments for 'git log' - for example to filter by date, or to specify branches.
+    Yields:
+    tuple: (commit ID, date as yyyy-mm-dd, subject) for each commit."""
+    # git log -z --pretty=format:"%H_||_%ad_||_%s" --date=short
+    args = [
+        "-z",
+        f"--pretty=format:%H{COMMIT_PARTS_SEPARTOR}%ad{COMMIT_PARTS_SEPARTOR}%s",
+        "--date=short",
+    ] + (git_log_args or [])
+    for record in iterate_command("log", args, repo_dir, is_nul_delimited=True):
+        record = record.strip()
+        if not record:
+            continue
+        commit_id, date, subject = record.split(COMMIT_PARTS_SEPARTOR, 2)
+        yield (commit_id, date, subject)
+
+
+# Retry git commands that talk to a remote, when they fail with a transient network or server error.
+# Permanent failures (authentication, unknown repository, certificate problems, a mistyped host) are deliberately NOT matched - git prints 'Could not read from remote repository' for those too.
+NETWORK_RETRY_POLICY = util_proc.RetryPolicy(
+    max_attempts=3,
+    initial_delay_seconds=2.0,
+    max_delay_seconds=30.0,
+    max_elapsed_seconds=120.0,
+    retryable_stderr_patterns=[
+        r"Connection (timed out|reset|refused)",
+        r"Operation timed out",
+        r"The remote end hung up unexpectedly",
+        r"early EOF",
+        r"unexpected disconnect while reading sideband packet",
+        r"returned error: 5\d\d",
+        r"HTTP 5\d\d",
+        r"Temporary failure in name resolution",
+    ],
+)
+
+
+@dataclass
+class ChunkedCommandReport:
+    """
+    The per-item outcome of execute_command_in_chunks().
+
+    - for 'push', the outcome of each item is read from 'git push --porcelain' - so in a push where only some refs were rejected, the other items are reported as succeeded.
+    - for other commands, git does not report per item - so when a chunk fails, every item in that chunk is reported as failed (even if git applied some of them).
+    """
+
+    succeeded_items: list[str] = field(default_factory=list)
+    failed_items: dict[str, str] = field(default_factory=dict)  # item -> error message
+
+    @property
+    def is_ok(self) -> bool:
+        return len(self.failed_items) == 0
+
+
+def _chunk_by_command_line_length(
+    base_args: list[str], items: list[str]
+) -> typing.Generator[list[str], None, None]:
+    """Chunk the items so that each command line (base args + chunk) fits within the OS command line length limit.
+    Args:
+    base_args (list): The program and arguments that are passed with every chunk.
+    items (list): The items to chunk.
+    Yields:
+    list: Chunks of the items."""
+
+    def _get_arg_length(arg: str) -> int:
+        # + quotes and a space on Windows, or a NUL and a pointer on Mac/Unix
+        return len(arg.encode()) + (3 if util_os.is_windows() else 9)
+
+    max_length = util_os.get_max_command_line_length()
+    base_length = sum(_get_arg_length(arg) for arg in base_args)
+    chunk: list[str] = []
+    chunk_length = base_length
+    for item in items:
+        item_length = _get_arg_length(item)
+        if chunk and chunk_length + item_length > max_length:
+            yield chunk
+            chunk = []
+            chunk_length = base_length
+        chunk.append(item)
+        chunk_length += item_length
+    if chunk:
+        yield chunk
+
+
+def _find_push_status(
+    statuses: dict[str, tuple[str, str]], item: str
+) -> tuple[str, str] | None:
+    """
+    Find the status of the item (like 'my-tag' or 'refs/tags/my-tag') among the statuses of the pushed refs.
+    """
+    if item in statuses:
+        return statuses[item]
+    for ref, status in statuses.items():
+        if ref.endswith("/" + item):
+            return status
+    return None
+
+
+def _push_with_porcelain(
+    git_args: list[str], items: list[str], working_dir: str
+) -> tuple[dict[str, str], RuntimeError | None]:
+    """Run one 'git push --porcelain' for the items, reading the status of each pushed ref.
+    Returns:
+    tuple: The items that failed, with their error message - and the error of the push, if it failed."""
+    result = util_proc.run_process_and_get_result(
+        config.PATH_TO_GIT,
+        ["push", "--porcelain"] + git_args + items,
+        working_dir,
+        output_errors=False,
+    )
+    if result.is_ok:
+        return {}, None
+    err_msg = (
+        f"{result.get_stderr_text(errors='replace').strip()}. Code: {result.exit_code}"
+    )
+    error = RuntimeError(err_msg, result.exit_code)
+
+    # Each ref is reported like: '!<TAB>:refs/tags/my-tag<TAB>[remote rejected] (hook declined)' - where '!' means the ref was rejected or failed
+    statuses: dict[str, tuple[str, str]] = {}
+    for line in result.get_stdout_text(errors="replace").splitlines():
+        parts = line.split("\t")
+        if len(parts) == 3 and ":" in parts[1]:
+            statuses[parts[1].split(":", 1)[1]] = (parts[0], parts[2])
+
+    failed_items: dict[str, str] = {}
+    for item in items:
+        status = _find_push_status(statuses, item)
+        if status is None:
+            # No status for this ref - for example git stopped before pushing anything
+            failed_items[item] = err_msg
+        elif status[0] == "!":
+            failed_items[item] = status[1]
+    return failed_items, error
+
+
 # execute git command with too many parameters - so we chunk
 def execute_command_in_chunks(
     command: str,
     git_args: list[str],
     git_extra_args_to_chunk: list[str],
     working_dir: str,
-) -> None:
+    max_workers: int = 1,
+    chunk_size: int | None = 20,
+    max_attempts: int = 1,
+    raise_if_failed: bool = True,
+    retry_policy: util_proc.RetryPolicy | None = None,
+) -> ChunkedCommandReport:
     """Execute a Git command with arguments provided in chunks to avoid exceeding the parameter limit.
     Args:
     command (str): The Git command to execute.
     git_args (list): List of arguments for the Git command.
     git_extra_args_to_chunk (list): List of additional arguments to chunk and execute.
-    working_dir (str): The working directory to execute the command in."""
-    CHUNK_SIZE = 20
-    chunks = util_list.chunk(git_extra_args_to_chunk, CHUNK_SIZE)
-    for chunk in chunks:
-        execute_command(command, git_args + chunk, working_dir)
+    working_dir (str): The working directory to execute the command in.
+    max_workers (int): The number of chunks to execute at the same time. Default is 1 (one chunk after another).
+    chunk_size (int): The number of items per chunk. Set to None to instead fit as many items per chunk as the OS command line length limit allows. Default is 20.
+    max_attempts (int): The number of times to try each chunk (immediately, on any error), before treating it as failed. Ignored if retry_policy is given. Default is 1 (no retry).
+    retry_policy (RetryPolicy): Optional policy for retrying each chunk with backoff - for example NETWORK_RETRY_POLICY for a 'push'.
+    raise_if_failed (bool): Flag to raise the error of the first chunk that fails (after which no more chunks are started). Set to False to execute all chunks and report failures per item instead. Default is True.
+    Returns:
+    ChunkedCommandReport: The items that succeeded, and the items that failed with their error message. For 'push' this is per ref (and a retry only pushes the refs that failed), otherwise per chunk - see ChunkedCommandReport."""
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1 - but was {max_workers}")
+    if max_attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1 - but was {max_attempts}")
+    if chunk_size is None:
+        chunks = list(
+            _chunk_by_command_line_length(
+                [config.PATH_TO_GIT, command] + git_args, git_extra_args_to_chunk
+            )
+        )
+    else:
+        chunks = list(util_list.chunk(git_extra_args_to_chunk, chunk_size))
 
+    if retry_policy is None:
+        retry_policy = util_proc.RetryPolicy(
+            max_attempts=max_attempts, initial_delay_seconds=0.0, jitter_ratio=0.0
+        )
 
-def fetch(working_dir: str) -> None:
+    def _execute_chunk(chunk: list[str]) -> tuple[dict[str, str], RuntimeError | None]:
+        """
+        Execute the chunk (with retries), returning the items that failed with their error message - and the error, if the chunk failed.
+        """
+        description = f"git {command} (chunk of {len(chunk)} items)"
+        if command != "push":
+            try:
+                util_proc.retry_call(
+                    lambda: execute_command(command, git_args + chunk, working_dir),
+                    retry_policy,
+                    description,
+                )
+                return {}, None
+            except RuntimeError as re:
+                return {item: str(re) for item in chunk}, re
+
+        remaining = chunk
+        failed_items: dict[str, str] = {}
+        error: RuntimeError | None = None
+
+        def _push_remaining() -> None:
+            nonlocal remaining, failed_items, error
+            failed_items, error = _push_with_porcelain(git_args, remaining, working_dir)
+            # A retry only pushes the refs that failed
+            remaining = [item for item in remaining if item in failed_items]
+            if error is not None:
+                raise error
+
+        try:
+            util_proc.retry_call(_push_remaining, retry_policy, description)
+        except RuntimeError:
+            pass  # Intentionally NOT passing exception onwards - the error is returned, with the failed items
+        return failed_items, error
+
+    def _add_to_report(chunk: list[str], failed_items: dict[str, str]) -> None:
+        report.succeeded_items += [item for item in chunk if item not in failed_items]
+        report.failed_items.update(failed_items)
+
+    report = ChunkedCommandReport()
+    if max_workers == 1:
+        # One chunk after another - so with raise_if_failed, nothing runs after the first failed chunk
+        for chunk in chunks:
+            failed_items, error = _execute_chunk(chunk)
+            if error is not None and raise_if_failed:
+                raise error
+            _add_to_report(chunk, failed_items)
+        return report
+
+    # Submit lazily, keeping at most max_workers chunks in flight - so that after a failure (with raise_if_failed) no more chunks are started
+    remaining_chunks = iter(chunks)
+    first_error: RuntimeError | None = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: dict[
+            concurrent.futures.Future[tuple[dict[str, str], RuntimeError | None]],
+            list[str],
+        ] = {}
+        while True:
+            if first_error is None:
+                for chunk in remaining_chunks:
+                    pending[executor.submit(_execute_chunk, chunk)] = chunk
+                    if len(pending) >= max_workers:
+                        break
+            if not pending:
+                break
+            done, _not_done = concurrent.futures.wait(
+                pending.keys(), return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                chunk = pending.pop(future)
+                failed_items, error = future.result()
+                if error is not None and raise_if_failed and first_error is None:
+                    first_error = error
+                _add_to_report(chunk, failed_items)
+    if first_error is not None:
+        raise first_error
+    return report
+
+
+def fetch(
+    working_dir: str,
+    timeout_seconds: float | None = None,
+    retry_policy: util_proc.RetryPolicy | None = NETWORK_RETRY_POLICY,
+) -> None:
     """Fetch latest commits from a Git repository using the specified working directory.
 
     Args:
-    working_dir (str): The working directory of the repository."""
-    execute_command("fetch", [], working_dir)
+    working_dir (str): The working directory of the repository.
+    timeout_seconds (float): Optional time limit, so that a hung network connection does not block forever. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+    retry_policy (RetryPolicy): How to retry transient network errors. Set to None to not retry. Default is NETWORK_RETRY_POLICY."""
+    _execute_command_with_retry("fetch", [], working_dir, timeout_seconds, retry_policy)
 
 
-def fetch_notes(working_dir: str) -> None:
+def fetch_notes(
+    working_dir: str,
+    timeout_seconds: float | None = None,
+    retry_policy: util_proc.RetryPolicy | None = NETWORK_RETRY_POLICY,
+) -> None:
     """Fetch notes from a Git repository using the specified working directory.
     Args:
-    working_dir (str): The working directory of the repository."""
-    execute_command(
-        "fetch", ["origin", "refs/notes/*:refs/notes/*", "--force"], working_dir
+    working_dir (str): The working directory of the repository.
+    timeout_seconds (float): Optional time limit. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+    retry_policy (RetryPolicy): How to retry transient network errors. Set to None to not retry. Default is NETWORK_RETRY_POLICY."""
+    _execute_command_with_retry(
+        "fetch",
+        ["origin", "refs/notes/*:refs/notes/*", "--force"],
+        working_dir,
+        timeout_seconds,
+        retry_policy,
+    )
+
+
+def _execute_command_with_retry(
+    command: str,
+    git_args: list[str],
+    working_dir: str,
+    timeout_seconds: float | None,
+    retry_policy: util_proc.RetryPolicy | None,
+) -> str:
+    if retry_policy is None:
+        return execute_command(
+            command, git_args, working_dir, timeout_seconds=timeout_seconds
+        )
+    return util_proc.retry_call(
+        lambda: execute_command(
+            command, git_args, working_dir, timeout_seconds=timeout_seconds
+        ),
+        retry_policy,
+        f"git {command}",
     )
 
 
@@ -250,30 +1052,109 @@ def check_has_no_changes(path_to_local_repo: str) -> None:
     """Check if the local repository at the specified path has any changes.
     Args:
     path_to_local_repo (str): The path to the local repository directory."""
-    # should return empty, if no changes
-    result = execute_command("status", ["--porcelain"], path_to_local_repo)
+    # should return empty, if no changes - so no need to decode the output
+    result = util_proc.run_process_and_get_output_bytes(
+        config.PATH_TO_GIT, ["status", "--porcelain"], path_to_local_repo
+    )
     if len(result) > 0:
         message = f"Local repository at {path_to_local_repo} has changes. Please ensure the local repository is clean and has no outstanding changes."
         raise RuntimeError(message)
 
 
+@dataclass
+class CloneOptions:
+    """
+    Options for faster, smaller local clones via prepare_local_full_clone() and prepare_local_mirror_clone().
+
+    - reference_repo_dir: borrow objects from an existing local clone of the same repository, via '--reference' (alternates), instead of copying them.
+    - is_dissociate: with reference_repo_dir, copy the borrowed objects after cloning ('--dissociate'), so the clone does not depend on the reference.
+    - is_shared: borrow the objects of the source repository itself, via alternates ('--shared'), instead of hardlinking or copying them.
+    - use_hardlinks: for a source on the local filesystem, hardlink the object files instead of copying them (git does this by default). Set to False to force a copy ('--no-hardlinks').
+    - depth: create a shallow clone with only this many commits per branch ('--depth').
+    - filter_spec: create a partial clone, fetching the filtered-out objects only when needed - for example 'blob:none' ('--filter').
+    - sparse_paths: check out only these directories ('--sparse' then 'git sparse-checkout set'). Not valid for a mirror clone.
+    """
+
+    reference_repo_dir: str | None = None
+    is_dissociate: bool = False
+    is_shared: bool = False
+    use_hardlinks: bool = True
+    depth: int | None = None
+    filter_spec: str | None = None
+    sparse_paths: list[str] | None = None
+
+
+def _get_clone_args(
+    path_to_repo_dir: str, is_mirror: bool, options: CloneOptions
+) -> list[str]:
+    """Get the arguments for 'git clone', for the given options.
+    Args:
+    path_to_repo_dir (str): The path to the repository directory (or its URL).
+    is_mirror (bool): A flag indicating whether the clone is a mirror.
+    options (CloneOptions): The clone options.
+    Returns:
+    list: The arguments for 'git clone'."""
+    args = []
+    if is_mirror:
+        args.append("--mirror")
+    if options.reference_repo_dir is not None:
+        args += ["--reference", options.reference_repo_dir]
+        if options.is_dissociate:
+            args.append("--dissociate")
+    if options.is_shared:
+        args.append("--shared")
+    if not options.use_hardlinks:
+        args.append("--no-hardlinks")
+    if options.depth is not None:
+        args += ["--depth", str(options.depth)]
+    if options.filter_spec is not None:
+        args.append(f"--filter={options.filter_spec}")
+    if options.sparse_paths is not None:
+        args.append("--sparse")
+
+    source = path_to_repo_dir
+    is_local_source = os.path.isdir(path_to_repo_dir)
+    if is_local_source and (
+        options.depth is not None or options.filter_spec is not None
+    ):
+        # git ignores --depth and --filter for a local path - but not for a file:// URL
+        source = Path(os.path.abspath(path_to_repo_dir)).as_uri()
+        if options.filter_spec is not None:
+            # The local source repository may not allow filtering: allow it for the clone, and for any later fetches of missing objects
+            upload_pack = (
+                f'"{config.PATH_TO_GIT}" -c uploadpack.allowFilter=true upload-pack'
+            )
+            args += [
+                f"--upload-pack={upload_pack}",
+                "--config",
+                f"remote.origin.uploadpack={upload_pack}",
+            ]
+    return args + [source]
+
+
 def _prepare_local_clone(
-    path_to_repo_dir: str, target_dir: str, is_mirror: bool
+    path_to_repo_dir: str,
+    target_dir: str,
+    is_mirror: bool,
+    options: CloneOptions | None = None,
 ) -> str:
     """Prepare a local clone of the repository with the specified parameters.
     Args:
     path_to_repo_dir (str): The path to the repository directory.
     target_dir (str): The temporary directory for fixing Git issues.
     is_mirror (bool): A flag indicating whether the clone is a mirror.
+    options (CloneOptions): Optional options for a faster, smaller clone.
     Returns:
     str: The path to the prepared local clone directory."""
+    if options is None:
+        options = CloneOptions()
+    if is_mirror and options.sparse_paths is not None:
+        raise ValueError("sparse_paths cannot be used with a mirror clone")
     local_clone_dir = os.path.join(
         target_dir, "lm"
     )  # lm = local_mirror (keeping path short)
     util_dir.ensure_dir_exists(local_clone_dir)
-    args = [path_to_repo_dir]
-    if is_mirror:
-        args = ["--mirror"] + args
+    args = _get_clone_args(path_to_repo_dir, is_mirror, options)
     execute_command("clone", args, local_clone_dir)
 
     local_repo_name = util_file.get_last_part_of_path(path_to_repo_dir)
@@ -282,27 +1163,39 @@ def _prepare_local_clone(
     else:
         if local_repo_name.endswith(".git"):
             local_repo_name = local_repo_name[:-4]
-    return os.path.join(local_clone_dir, local_repo_name)
+    path_to_clone = os.path.join(local_clone_dir, local_repo_name)
+
+    if options.sparse_paths is not None:
+        execute_command(
+            "sparse-checkout", ["set"] + options.sparse_paths, path_to_clone
+        )
+    return path_to_clone
 
 
-def prepare_local_full_clone(path_to_repo_dir: str, target_dir: str) -> str:
+def prepare_local_full_clone(
+    path_to_repo_dir: str, target_dir: str, options: CloneOptions | None = None
+) -> str:
     """Prepare a full local clone of the repository using the specified paths.
     Args:
     path_to_repo_dir (str): The path to the repository directory.
     target_dir (str): The temporary directory for fixing Git issues.
+    options (CloneOptions): Optional options for a faster, smaller clone - like a reference repository, shallow depth, partial clone filter or sparse checkout.
     Returns:
     str: The path to the prepared full local clone directory."""
-    return _prepare_local_clone(path_to_repo_dir, target_dir, False)
+    return _prepare_local_clone(path_to_repo_dir, target_dir, False, options)
 
 
-def prepare_local_mirror_clone(path_to_repo_dir: str, target_dir: str) -> str:
+def prepare_local_mirror_clone(
+    path_to_repo_dir: str, target_dir: str, options: CloneOptions | None = None
+) -> str:
     """Prepare a mirror local clone of the repository using the specified paths.
     Args:
     path_to_repo_dir (str): The path to the repository directory.
     target_dir (str): The temporary directory for fixing Git issues.
+    options (CloneOptions): Optional options for a faster, smaller clone - like a reference repository, shallow depth or partial clone filter.
     Returns:
     str: The path to the prepared mirror local clone directory."""
-    return _prepare_local_clone(path_to_repo_dir, target_dir, True)
+    return _prepare_local_clone(path_to_repo_dir, target_dir, True, options)
 
 
 def gc_expire_reflog(repo_dir: str) -> None:
@@ -352,42 +1245,79 @@ def remove_tag(repo_dir: str, tag: str) -> None:
     execute_command("tag", ["-d", tag], repo_dir)
 
 
+def _get_local_branches(repo_dir: str) -> list[str]:
+    """Get the names of all local branches, via one git process.
+    Args:
+    repo_dir (str): The repository directory path.
+    Returns:
+    list: The names of the local branches."""
+    result = execute_command(
+        "for-each-ref", ["--format=%(refname:short)", "refs/heads/"], repo_dir
+    )
+    return util_list.remove_empty_strings(util_list.strip_strings(result.split("\n")))
+
+
+def _get_branch_ref_without_checkout(branch: str, local_branches: list[str]) -> str:
+    """Get the ref that 'git checkout <branch>' would check out: the local branch if it exists, else the branch on origin.
+    Args:
+    branch (str): The name of the branch.
+    local_branches (list): The names of the local branches.
+    Returns:
+    str: The ref to query for the branch."""
+    if branch in local_branches:
+        return f"refs/heads/{branch}"
+    return f"refs/remotes/origin/{branch}"
+
+
 def get_commits_after_date(
-    repo_dir: str, branches: list[str], start_date: str
+    repo_dir: str, branches: list[str], start_date: str, checkout_branches: bool = True
 ) -> list[str]:
     """Get all commits after the specified date in the given branches of the repository.
     Args:
     repo_dir (str): The repository directory path.
     branches (list): List of branches to check commits from.
     start_date (str): The start date for filtering commits.
+    checkout_branches (bool): Flag to checkout each branch before reading its log. Set to False to read the log of each branch ref directly, without touching the working tree (much faster on a large working tree). Default is True.
     Returns:
     list: A list of commits after the specified date."""
     commits = []
+    if not checkout_branches:
+        local_branches = _get_local_branches(repo_dir)
     for branch in branches:
-        checkout_branch(branch, repo_dir)
+        if checkout_branches:
+            checkout_branch(branch, repo_dir)
+            branch_args = []
+        else:
+            branch_args = [
+                _get_branch_ref_without_checkout(branch, local_branches),
+                "--",
+            ]
 
         # git log --pretty=format:"%H" --after="2023-01-31"
         day_before_cutoff = util_date.add_day_to_date(start_date, -1)
-        result = execute_command(
-            "log", ['--pretty=format:"%H"', f'--after="{day_before_cutoff}"'], repo_dir
-        )
-        commits += result.split("\n")
-    cleaned_commits = []
-    for commit in commits:
-        cleaned = commit.replace('"', "").strip()
-        cleaned_commits.append(cleaned)
-    return cleaned_commits
+        for commit in iterate_command(
+            "log",
+            ["--pretty=format:%H", f'--after="{day_before_cutoff}"'] + branch_args,
+            repo_dir,
+        ):
+            cleaned = commit.strip()
+            if cleaned:
+                commits.append(cleaned)
+    return commits
 
 
 def get_git_text_editor_or_none(
-    local_repo_location: str,
+    local_repo_location: str, read_config_directly: bool = False
 ) -> tuple[str | None, list[str] | None]:
     """Get the default Git text editor or return None if not found.
     Args:
     local_repo_location (str): The local repository location.
+    read_config_directly (bool): Flag to parse the config files directly instead of starting a git process. Default is False.
     Returns:
     tuple: A tuple containing the path to the text editor program and its arguments, or (None, None) if not found."""
-    path_to_text_editor = get_config("core.editor", local_repo_location)
+    path_to_text_editor = get_config(
+        "core.editor", local_repo_location, read_config_directly=read_config_directly
+    )
     if path_to_text_editor is None or len(path_to_text_editor) == 0:
         return (None, None)
     error_message = f"Cannot parse default git text editor ('core.editor' = '{path_to_text_editor}')"
@@ -412,41 +1342,90 @@ def get_git_text_editor_or_none(
     return (None, None)
 
 
-def get_all_tags(path_to_local_repo: str) -> list[str]:
+def get_all_tags(
+    path_to_local_repo: str,
+    session: GitSession | None = None,
+    read_refs_directly: bool = False,
+) -> list[str]:
     """Get all tags from the specified local repository.
     Args:
     path_to_local_repo (str): The path to the local repository directory.
+    session (GitSession): Optional session to read from, instead of starting a new git process.
+    read_refs_directly (bool): Flag to read the refs files directly instead of starting a new git process (falls back to git for unsupported layouts like worktrees). Default is False.
     Returns:
     list: A list of all tags in the repository."""
+    if session is not None:
+        return session.get_all_tags()
+    if read_refs_directly:
+        refs = get_refs_from_files(path_to_local_repo)
+        if refs is not None:
+            return sorted(
+                ref.removeprefix("refs/tags/")
+                for ref in refs.keys()
+                if ref.startswith("refs/tags/")
+            )
     tags = []
-    result = execute_command("tag", [], path_to_local_repo)
-    raw_tags = result.split("\n")
-    for raw_tag in raw_tags:
+    for raw_tag in iterate_command("tag", [], path_to_local_repo):
         raw_tag = raw_tag.strip()
         if raw_tag:
             tags.append(raw_tag)
     return tags
 
 
-def delete_all_tags(path_to_local_repo: str) -> None:
+def delete_all_tags(
+    path_to_local_repo: str,
+    max_workers: int = 1,
+    chunk_size: int | None = 20,
+    retry_policy: util_proc.RetryPolicy | None = NETWORK_RETRY_POLICY,
+    max_attempts: int = 1,
+    raise_if_failed: bool = True,
+) -> ChunkedCommandReport:
     """Delete all tags from the specified local repository.
     Args:
-    path_to_local_repo (str): The path to the local repository directory."""
+    path_to_local_repo (str): The path to the local repository directory.
+    max_workers (int): The number of 'git push --delete' commands to run at the same time. Default is 1.
+    chunk_size (int): The number of tags per push. Set to None to fit as many as the OS command line allows. Default is 20.
+    retry_policy (RetryPolicy): How to retry a push that fails with a transient network error. Set to None to not retry (or to use max_attempts). Default is NETWORK_RETRY_POLICY.
+    max_attempts (int): The number of times to try each push (immediately, on any error), when retry_policy is None. Default is 1.
+    raise_if_failed (bool): Flag to raise the error of the first push that fails. Set to False to try all tags and report failures per tag instead. Default is True.
+    Returns:
+    ChunkedCommandReport: The tags that were deleted, and the tags that failed with their error message."""
     tags = get_all_tags(path_to_local_repo)
-    execute_command_in_chunks(
-        "push", ["--delete", "origin", "--quiet"], tags, path_to_local_repo
+    return execute_command_in_chunks(
+        "push",
+        ["--delete", "origin", "--quiet"],
+        tags,
+        path_to_local_repo,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+        max_attempts=max_attempts,
+        raise_if_failed=raise_if_failed,
+        retry_policy=retry_policy,
     )
 
 
-def get_all_origin_branches(path_to_local_repo: str) -> list[str]:
+def get_all_origin_branches(
+    path_to_local_repo: str, read_refs_directly: bool = False
+) -> list[str]:
     """Get all origin branches from the specified local repository.
     Args:
     path_to_local_repo (str): The path to the local repository directory.
+    read_refs_directly (bool): Flag to read the refs files directly instead of starting a new git process (falls back to git for unsupported layouts like worktrees). Default is False.
     Returns:
     list: A list of all origin branches in the repository."""
+    raw_branches: typing.Iterable[str] | None = None
+    if read_refs_directly:
+        refs = get_refs_from_files(path_to_local_repo)
+        if refs is not None:
+            # The same as the output of 'git branch -r' (symbolic refs are already excluded)
+            raw_branches = sorted(
+                ref.removeprefix("refs/remotes/")
+                for ref in refs.keys()
+                if ref.startswith("refs/remotes/")
+            )
+    if raw_branches is None:
+        raw_branches = iterate_command("branch", ["-r"], path_to_local_repo)
     branches = []
-    result = execute_command("branch", ["-r"], path_to_local_repo)
-    raw_branches = result.split("\n")
     for raw_branch in raw_branches:
         if "origin" not in raw_branch:
             continue
@@ -460,12 +1439,25 @@ def get_all_origin_branches(path_to_local_repo: str) -> list[str]:
 
 
 def delete_branches_except(
-    branches_to_keep: list[str], path_to_local_repo: str
-) -> None:
+    branches_to_keep: list[str],
+    path_to_local_repo: str,
+    max_workers: int = 1,
+    chunk_size: int | None = 20,
+    retry_policy: util_proc.RetryPolicy | None = NETWORK_RETRY_POLICY,
+    max_attempts: int = 1,
+    raise_if_failed: bool = True,
+) -> ChunkedCommandReport:
     """Delete branches in the local repository except for the specified ones to keep.
     Args:
     branches_to_keep (list): List of branches to retain.
-    path_to_local_repo (str): The path to the local repository directory."""
+    path_to_local_repo (str): The path to the local repository directory.
+    max_workers (int): The number of 'git push -d' commands to run at the same time. Default is 1.
+    chunk_size (int): The number of branches per push. Set to None to fit as many as the OS command line allows. Default is 20.
+    retry_policy (RetryPolicy): How to retry a push that fails with a transient network error. Set to None to not retry (or to use max_attempts). Default is NETWORK_RETRY_POLICY.
+    max_attempts (int): The number of times to try each push (immediately, on any error), when retry_policy is None. Default is 1.
+    raise_if_failed (bool): Flag to raise the error of the first push that fails. Set to False to try all branches and report failures per branch instead. Default is True.
+    Returns:
+    ChunkedCommandReport: The branches that were deleted, and the branches that failed with their error message."""
     # original bash:
     #   git branch -r | grep -Eo 'origin/.*' | grep -v 'origin/main$' | sed 's/origin\///' | xargs git push origin -v --delete
     # OR this one seems more reliable:
@@ -473,18 +1465,344 @@ def delete_branches_except(
     branches = get_all_origin_branches(path_to_local_repo)
     branches_to_delete = util_list.excluding(branches, branches_to_keep)
 
-    execute_command_in_chunks(
-        "push", ["-d", "origin"], branches_to_delete, path_to_local_repo
+    return execute_command_in_chunks(
+        "push",
+        ["-d", "origin"],
+        branches_to_delete,
+        path_to_local_repo,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+        max_attempts=max_attempts,
+        raise_if_failed=raise_if_failed,
+        retry_policy=retry_policy,
+    )
+
+
+def _read_config_via_git(repo_dir: str) -> dict[str, str]:
+    """Read all Git configuration settings that apply to the repository, via one 'git config --list' process.
+    Returns:
+    dict: The normalized keys mapped to their (last) values."""
+    result = execute_command("config", ["--list", "-z"], repo_dir)
+    settings = {}
+    for entry in result.split("\0"):
+        if not entry:
+            continue
+        # Each entry is 'key\nvalue' - or just 'key' for a setting with no value
+        key, _sep, value = entry.partition("\n")
+        # As with 'git config --get', the last value wins
+        settings[_normalize_config_key(key)] = value
+    return settings
+
+
+class _UnsupportedConfigError(Exception):
+    """Raised when a config file uses a feature that the in-process config reader does not support (the git CLI is used instead)."""
+
+
+# Cache of config read from files: git dir -> (mtimes of the files read, settings)
+_config_from_files_cache: dict[str, tuple[dict[str, int], dict[str, str]]] = {}
+_config_from_files_cache_lock = threading.Lock()
+
+
+def _is_config_true(value: str | None) -> bool:
+    """Is the config value true, the same way git reads a boolean: a key with no value, or 'true', 'yes', 'on' or '1'."""
+    return value is not None and value.lower() in ["", "true", "yes", "on", "1"]
+
+
+def _get_config_file_paths(git_dir: str) -> list[str]:
+    """Get the paths of the config files that git reads, in order of increasing precedence: system, global, local.
+    - the system config location depends on how git was installed: it is taken from GIT_CONFIG_SYSTEM, else guessed from config.PATH_TO_GIT, else /etc/gitconfig."""
+    paths = []
+    if not os.environ.get("GIT_CONFIG_NOSYSTEM"):
+        path_to_system_config = os.environ.get("GIT_CONFIG_SYSTEM")
+        if path_to_system_config is None:
+            # <prefix>/bin/git or <prefix>/cmd/git.exe -> <prefix>/etc/gitconfig
+            git_prefix_dir = os.path.dirname(
+                os.path.dirname(os.path.realpath(config.PATH_TO_GIT))
+            )
+            candidates = [os.path.join(git_prefix_dir, "etc", "gitconfig")]
+            if not util_os.is_windows():
+                candidates.append("/etc/gitconfig")
+            path_to_system_config = candidates[-1]
+            for candidate in candidates:
+                if os.path.exists(candidate):
+                    path_to_system_config = candidate
+                    break
+        paths.append(path_to_system_config)
+    path_to_global_config = os.environ.get("GIT_CONFIG_GLOBAL")
+    if path_to_global_config is not None:
+        paths.append(path_to_global_config)
+    else:
+        xdg_config_home = os.environ.get(
+            "XDG_CONFIG_HOME", os.path.join(os.path.expanduser("~"), ".config")
+        )
+        paths.append(os.path.join(xdg_config_home, "git", "config"))
+        paths.append(os.path.join(os.path.expanduser("~"), ".gitconfig"))
+    paths.append(os.path.join(git_dir, "config"))
+    return paths
+
+
+def _parse_config_value(raw_value: str, path_to_file: str) -> str:
+    """Parse the raw value of a config setting, the same way git does: trim whitespace outside quotes, remove quotes and comments, and process escapes.
+    - whitespace inside the value is kept exactly (like git 2.46 and later - older versions turn each whitespace character into a space)."""
+    value = ""
+    pending_whitespace = ""
+    is_in_quote = False
+    i = 0
+    while i < len(raw_value):
+        c = raw_value[i]
+        i += 1
+        if c.isspace() and not is_in_quote:
+            if value:
+                pending_whitespace += c
+            continue
+        if not is_in_quote and c in "#;":
+            break
+        value += pending_whitespace
+        pending_whitespace = ""
+        if c == "\\":
+            if i >= len(raw_value):
+                raise _UnsupportedConfigError(f"Bad escape in {path_to_file}")
+            escaped = raw_value[i]
+            i += 1
+            escapes = {"\\": "\\", '"': '"', "n": "\n", "t": "\t", "b": "\b"}
+            if escaped not in escapes:
+                raise _UnsupportedConfigError(f"Bad escape in {path_to_file}")
+            value += escapes[escaped]
+        elif c == '"':
+            is_in_quote = not is_in_quote
+        else:
+            value += c
+    if is_in_quote:
+        raise _UnsupportedConfigError(f"Unterminated quote in {path_to_file}")
+    return value
+
+
+def _parse_config_section(header: str, path_to_file: str) -> str:
+    """Parse a section header (without the brackets) to a normalized section prefix.
+
+    Examples: 'Core' -> 'core', 'remote "origin"' -> 'remote.origin', 'Branch.Main' -> 'branch.main'
+    """
+    if '"' not in header:
+        # The deprecated [section.subsection] syntax: all lower case
+        return header.strip().lower()
+    name, _sep, subsection = header.partition('"')
+    if not subsection.endswith('"'):
+        raise _UnsupportedConfigError(f"Bad section header in {path_to_file}")
+    subsection = subsection[:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return f"{name.strip().lower()}.{subsection}"
+
+
+def _wildmatch_to_regex(pattern: str) -> str:
+    """Convert a git wildmatch pattern (as used by includeIf "gitdir:" and .gitignore) to a regular expression: '**' spans directories, '*', '?' and '[...]' do not."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            # Character class like [abc], [a-z] or [!a-z] - the first character can be a literal ']'
+            end = pattern.index("]", i + 2)
+            char_class = pattern[i + 1 : end]
+            if char_class[0] in "!^":
+                char_class = "^" + char_class[1:]
+            regex += "[" + char_class.replace("\\", "\\\\") + "]"
+            i = end + 1
+        elif pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+def _is_include_if_condition_met(
+    condition: str, git_dir: str, path_to_file: str
+) -> bool:
+    """Is the condition of an [includeIf "<condition>"] section met, for the given git dir."""
+    if condition.startswith("gitdir:") or condition.startswith("gitdir/i:"):
+        is_case_insensitive = condition.startswith("gitdir/i:")
+        pattern = condition.partition(":")[2]
+        if pattern.startswith("~/"):
+            pattern = os.path.expanduser("~") + pattern[1:]
+        elif pattern.startswith("./"):
+            pattern = os.path.dirname(path_to_file) + pattern[1:]
+        pattern = pattern.replace(os.sep, "/")
+        if not pattern.startswith("/") and not re.match(r"^[A-Za-z]:/", pattern):
+            pattern = "**/" + pattern
+        if pattern.endswith("/"):
+            pattern += "**"
+        actual = os.path.realpath(git_dir).replace(os.sep, "/")
+        flags = re.IGNORECASE if is_case_insensitive else 0
+        return re.fullmatch(_wildmatch_to_regex(pattern), actual, flags) is not None
+    if condition.startswith("onbranch:"):
+        pattern = condition.removeprefix("onbranch:")
+        if pattern.endswith("/"):
+            pattern += "**"
+        head = util_file.read_text_from_file(os.path.join(git_dir, "HEAD")).strip()
+        if not head.startswith("ref: refs/heads/"):
+            return False
+        branch = head.removeprefix("ref: refs/heads/")
+        return re.fullmatch(_wildmatch_to_regex(pattern), branch) is not None
+    raise _UnsupportedConfigError(
+        f"Unsupported includeIf condition '{condition}' in {path_to_file}"
     )
 
 
-def get_config(key: str, path_to_local_repo: str) -> str:
+def _read_config_file(
+    path_to_file: str,
+    git_dir: str,
+    settings: dict[str, str],
+    mtimes: dict[str, int],
+    depth: int = 0,
+) -> None:
+    """Read one config file (and any files it includes) into the settings, in order - so later values override earlier ones."""
+    MAX_INCLUDE_DEPTH = 10  # the same limit as git
+    if depth > MAX_INCLUDE_DEPTH:
+        raise _UnsupportedConfigError(f"Too many nested includes at {path_to_file}")
+    mtimes[path_to_file] = _get_mtime_ns_or_zero(path_to_file)
+    if not os.path.isfile(path_to_file):
+        return
+    with open(path_to_file, encoding="utf-8") as file:
+        lines = file.read().split("\n")
+
+    section = ""
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        i += 1
+        if not line or line[0] in "#;":
+            continue
+        if line.startswith("["):
+            header, sep, rest = line[1:].partition("]")
+            if not sep:
+                raise _UnsupportedConfigError(f"Bad section header in {path_to_file}")
+            section = _parse_config_section(header, path_to_file)
+            line = rest.strip()
+            if not line or line[0] in "#;":
+                continue
+        if not section:
+            raise _UnsupportedConfigError(
+                f"Setting outside a section in {path_to_file}"
+            )
+        name, sep, raw_value = line.partition("=")
+        # A trailing backslash continues the value on the next line
+        while (
+            sep
+            and raw_value.endswith("\\")
+            and not raw_value.endswith("\\\\")
+            and i < len(lines)
+        ):
+            raw_value = raw_value[:-1] + lines[i]
+            i += 1
+        key = f"{section}.{name.strip().lower()}"
+        value = _parse_config_value(raw_value, path_to_file) if sep else ""
+        settings[key] = value
+
+        path_to_include = None
+        if key == "include.path":
+            path_to_include = value
+        elif section.startswith("includeif.") and key.endswith(".path"):
+            condition = section.removeprefix("includeif.")
+            if _is_include_if_condition_met(condition, git_dir, path_to_file):
+                path_to_include = value
+        if path_to_include:
+            path_to_include = os.path.expanduser(path_to_include)
+            if not os.path.isabs(path_to_include):
+                path_to_include = os.path.join(
+                    os.path.dirname(path_to_file), path_to_include
+                )
+            _read_config_file(path_to_include, git_dir, settings, mtimes, depth + 1)
+
+
+def get_config_from_files(repo_dir: str) -> dict[str, str] | None:
+    """
+    Get all Git configuration settings that apply to the repository, by parsing the system, global and local config files (and their includes) directly, without starting a git process.
+
+    - later files take precedence, the same as git: local over global over system.
+    - results are cached, and re-read only when one of the config files has changed (by mtime).
+
+    Args:
+    repo_dir (str): The repository directory path.
+    Returns:
+    dict: The normalized keys (like 'core.autocrlf' or 'remote.origin.url') mapped to their (last) values, or None if not supported (then use the git CLI instead) - for example a linked worktree, config passed via environment variables, or an unsupported includeIf condition.
+    """
+    if os.environ.get("GIT_CONFIG_PARAMETERS") or os.environ.get("GIT_CONFIG_COUNT"):
+        return None
+    git_dir = _find_git_dir_for_reading_files(repo_dir)
+    if git_dir is None:
+        return None
+    git_dir = os.path.abspath(git_dir)
+    with _config_from_files_cache_lock:
+        cached = _config_from_files_cache.get(git_dir)
+        if cached is not None and _are_mtimes_unchanged(cached[0]):
+            return dict(cached[1])
+    settings: dict[str, str] = {}
+    mtimes: dict[str, int] = {}
+    try:
+        for path_to_file in _get_config_file_paths(git_dir):
+            _read_config_file(path_to_file, git_dir, settings, mtimes)
+        # With extensions.worktreeConfig, git also reads config.worktree - after (so over) the local config
+        if _is_config_true(settings.get("extensions.worktreeconfig")):
+            _read_config_file(
+                os.path.join(git_dir, "config.worktree"), git_dir, settings, mtimes
+            )
+    except (_UnsupportedConfigError, UnicodeDecodeError, OSError) as e:
+        logger.debug(f"Cannot read git config directly - falling back to git: {e}")
+        return None
+    with _config_from_files_cache_lock:
+        _config_from_files_cache[git_dir] = (mtimes, settings)
+    return dict(settings)
+
+
+def get_config_values(
+    keys: list[str], path_to_local_repo: str, read_config_directly: bool = False
+) -> dict[str, str]:
+    """Get the Git configuration setting values for many keys at once - from one parse of the config, instead of one git process per key.
+    Args:
+    keys (list): The configuration keys to retrieve.
+    path_to_local_repo (str): The path to the local repository directory.
+    read_config_directly (bool): Flag to parse the config files directly instead of starting a git process (falls back to git for unsupported layouts). Default is False.
+    Returns:
+    dict: Each key mapped to its value, or '' if not set."""
+    settings = None
+    if read_config_directly:
+        settings = get_config_from_files(path_to_local_repo)
+    if settings is None:
+        settings = _read_config_via_git(path_to_local_repo)
+    return {key: settings.get(_normalize_config_key(key), "") for key in keys}
+
+
+def get_config(
+    key: str,
+    path_to_local_repo: str,
+    session: GitSession | None = None,
+    read_config_directly: bool = False,
+) -> str:
     """Get the Git configuration setting value for the specified key in the local repository.
     Args:
     key (str): The configuration key to retrieve.
     path_to_local_repo (str): The path to the local repository directory.
+    session (GitSession): Optional session to read from, instead of starting a new git process.
+    read_config_directly (bool): Flag to parse the config files directly instead of starting a git process (falls back to git for unsupported layouts). Default is False.
     Returns:
     str: The value of the configuration setting for the key."""
+    if session is not None:
+        return session.get_config(key)
+    if read_config_directly:
+        settings = get_config_from_files(path_to_local_repo)
+        if settings is not None:
+            return settings.get(_normalize_config_key(key), "")
     result = ""
     try:
         result = execute_command("config", ["--get", key], path_to_local_repo)
@@ -497,13 +1815,15 @@ def get_config(key: str, path_to_local_repo: str) -> str:
                 )
             return ""
         raise
-    return result
+    # Remove the newline that git adds - the same as the value read via a session or from the files
+    return result.removesuffix("\n")
 
 
-def log_git_config(path_to_local_repo: str) -> None:
+def log_git_config(path_to_local_repo: str, read_config_directly: bool = False) -> None:
     """Log interesting Git configuration settings that can impact text file handling.
     Args:
-    path_to_local_repo (str): The path to the local repository directory."""
+    path_to_local_repo (str): The path to the local repository directory.
+    read_config_directly (bool): Flag to parse the config files directly instead of starting a git process. Default is False."""
     interesting_settings = [
         "i18n.filesencoding",
         "core.ignorecase",  # Probably best set to false.
@@ -512,8 +1832,13 @@ def log_git_config(path_to_local_repo: str) -> None:
     ]
 
     logger.info("git config - text related settings")
+    values = get_config_values(
+        interesting_settings,
+        path_to_local_repo,
+        read_config_directly=read_config_directly,
+    )
     for setting in interesting_settings:
-        value = get_config(setting, path_to_local_repo)
+        value = values[setting]
         if len(value) > 0:
             logger.info(f"  {setting}={value}")
         else:
@@ -549,3 +1874,405 @@ def is_git_ignored(directory: str, filename: str) -> bool:
             raise
     # 0 - One or more of the provided paths is ignored.
     return True
+
+
+@dataclass
+class RepoOperationResult:
+    """
+    The outcome of running an operation on one repository, via run_operation_in_repos().
+    """
+
+    repo_dir: str
+    result: typing.Any = None
+    error: Exception | None = None
+    is_timed_out: bool = False
+    elapsed_seconds: float = 0.0
+
+    @property
+    def is_ok(self) -> bool:
+        return self.error is None and not self.is_timed_out
+
+
+@dataclass
+class RepoBatchReport:
+    """
+    The per-repository results of run_operation_in_repos(), in the same order as the given repository directories.
+    """
+
+    results: list[RepoOperationResult] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    def get_succeeded(self) -> list[RepoOperationResult]:
+        return [r for r in self.results if r.is_ok]
+
+    def get_failed(self) -> list[RepoOperationResult]:
+        return [r for r in self.results if not r.is_ok]
+
+    def describe(self) -> str:
+        """
+        Describe the report in a few lines of text - a summary, plus one line per failed repository.
+        """
+        lines = [
+            f"{len(self.get_succeeded())} of {len(self.results)} repositories succeeded [time taken: {util_time.describe_elapsed_seconds(self.elapsed_seconds)}]"
+        ]
+        for failed in self.get_failed():
+            reason = "timed out" if failed.is_timed_out else str(failed.error)
+            lines.append(f"  FAILED: {failed.repo_dir} - {reason}")
+        return "\n".join(lines)
+
+
+def run_operation_in_repos(
+    repo_dirs: list[str],
+    operation: typing.Callable[[str], typing.Any],
+    max_workers: int = 8,
+    timeout_seconds: float | None = None,
+) -> RepoBatchReport:
+    """Run an operation on many repositories in parallel, collecting per-repository results and errors.
+
+    - the work is mostly waiting on git processes, so a bounded thread pool is used.
+    - an error in one repository does not stop the others.
+
+    Example: run_operation_in_repos(repo_dirs, util_git.fetch, max_workers=16)
+
+    Args:
+    repo_dirs (list): The repository directories to run the operation on.
+    operation (Callable): The operation to run, taking a repository directory - for example util_git.fetch, util_git.fetch_notes, util_git.gc_prune_safe or util_git.check_has_no_changes.
+    max_workers (int): The maximum number of repositories to process at the same time. Default is 8.
+    timeout_seconds (float): Optional time limit per repository, measured from when its operation starts. A repository that exceeds it is reported as timed out. Any git (or other util_proc) process the operation is still running at the time limit is killed (see util_proc.process_deadline()), so its worker is freed for the next repository. An operation that is not waiting on a process is left to finish in the background.
+    Returns:
+    RepoBatchReport: The per-repository results."""
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1 - but was {max_workers}")
+    start = util_time.start_timer()
+    results = {repo_dir: RepoOperationResult(repo_dir) for repo_dir in repo_dirs}
+    start_times: dict[str, float] = {}
+
+    def _run(repo_dir: str) -> typing.Any:
+        start_times[repo_dir] = util_time.start_timer()
+        if timeout_seconds is None:
+            return operation(repo_dir)
+        with util_proc.process_deadline(timeout_seconds):
+            return operation(repo_dir)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {
+            executor.submit(_run, repo_dir): repo_dir for repo_dir in results.keys()
+        }
+        while pending:
+            wait_seconds = None
+            if timeout_seconds is not None:
+                now = util_time.start_timer()
+                running_starts = [
+                    start_times[repo_dir]
+                    for repo_dir in pending.values()
+                    if repo_dir in start_times
+                ]
+                # Wake up when the earliest running operation is due to time out
+                wait_seconds = timeout_seconds
+                if running_starts:
+                    wait_seconds = max(0.0, min(running_starts) + timeout_seconds - now)
+            done, _not_done = concurrent.futures.wait(
+                pending.keys(),
+                timeout=wait_seconds,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                repo_dir = pending.pop(future)
+                result = results[repo_dir]
+                result.elapsed_seconds = util_time.end_timer(start_times[repo_dir])
+                try:
+                    result.result = future.result()
+                except util_proc.ProcessTimeoutError as e:
+                    logger.warning(
+                        f"Operation timed out for repository {repo_dir} [after {timeout_seconds}s]"
+                    )
+                    result.error = e
+                    result.is_timed_out = True
+                except Exception as e:
+                    logger.warning(f"Operation failed for repository {repo_dir}: {e}")
+                    result.error = e
+            if timeout_seconds is not None:
+                now = util_time.start_timer()
+                for future, repo_dir in list(pending.items()):
+                    if (
+                        repo_dir in start_times
+                        and now - start_times[repo_dir] >= timeout_seconds
+                    ):
+                        logger.warning(
+                            f"Operation timed out for repository {repo_dir} [after {timeout_seconds}s]"
+                        )
+                        pending.pop(future)
+                        results[repo_dir].is_timed_out = True
+                        results[repo_dir].elapsed_seconds = now - start_times[repo_dir]
+    finally:
+        # Do not wait for any timed out operations
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return RepoBatchReport(
+        results=[results[repo_dir] for repo_dir in repo_dirs],
+        elapsed_seconds=util_time.end_timer(start),
+    )
+
+
+class GitIgnoreChecker:
+    """
+    Check whether paths are ignored by Git, via one long-lived 'git check-ignore --stdin -z --non-matching -v' process, instead of one git process per path.
+
+    - call close() when done, or use as a context manager:
+
+    ```
+    with util_git.GitIgnoreChecker(repo_dir) as checker:
+        statuses = checker.get_ignored_statuses(paths)
+    ```
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Args:
+        directory (str): The directory that the paths are relative to (inside a git repository).
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._proc: subprocess.Popen[bytes] | None = None
+        # Output read from the process but not yet consumed - the start of the next field(s)
+        self._buffer = bytearray()
+
+    def __enter__(self) -> "GitIgnoreChecker":
+        return self
+
+    def __exit__(self, *_args: typing.Any) -> None:
+        self.close()
+
+    def _get_proc(self) -> subprocess.Popen[bytes]:
+        if self._proc is None:
+            logger.debug(f"Starting 'git check-ignore --stdin' at {self.directory}")
+            self._buffer = bytearray()
+            self._proc = subprocess.Popen(
+                [
+                    config.PATH_TO_GIT,
+                    "check-ignore",
+                    "--stdin",
+                    "-z",
+                    "--non-matching",
+                    "--verbose",
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.directory,
+                # Flush each result, so that we can read it before sending the next path
+                env={**os.environ, "GIT_FLUSH": "1"},
+            )
+        return self._proc
+
+    def _read_field(self, proc: subprocess.Popen[bytes]) -> str:
+        """
+        Read the next NUL-terminated field - reading the output in blocks (whatever is available), not byte by byte.
+        """
+        assert proc.stdout is not None
+        while True:
+            end = self._buffer.find(b"\0")
+            if end >= 0:
+                field = bytes(self._buffer[:end])
+                del self._buffer[: end + 1]
+                return field.decode()
+            block = os.read(proc.stdout.fileno(), 65536)
+            if not block:
+                std_err = proc.stderr.read().decode() if proc.stderr is not None else ""
+                proc.wait()
+                self._proc = None
+                raise RuntimeError(
+                    f"{std_err.strip()}. Code: {proc.returncode}", proc.returncode
+                )
+            self._buffer += block
+
+    def _read_is_ignored(self, proc: subprocess.Popen[bytes]) -> bool:
+        # Each result is: <source> NUL <line number> NUL <pattern> NUL <path> NUL - the first three are empty if not matched
+        source = self._read_field(proc)
+        _line_number = self._read_field(proc)
+        pattern = self._read_field(proc)
+        _path = self._read_field(proc)
+        # A path that matches a negated pattern like '!keep.log' is not ignored
+        return len(source) > 0 and not pattern.startswith("!")
+
+    def get_ignored_statuses(self, paths: list[str]) -> dict[str, bool]:
+        """
+        Check whether each of the paths is ignored by Git.
+
+        Args:
+        paths (list): The paths to check, relative to the directory.
+
+        Returns:
+        dict: Each path mapped to True if it is ignored, else False.
+        """
+        for path in paths:
+            if "\0" in path:
+                raise ValueError(f"Path cannot contain NUL: '{path}'")
+        statuses: dict[str, bool] = {}
+        with self._lock:
+            proc = self._get_proc()
+            assert proc.stdin is not None
+            stdin = proc.stdin
+
+            # Write from another thread, so that neither process blocks on a full pipe
+            def _write_paths() -> None:
+                try:
+                    for path in paths:
+                        stdin.write(path.encode() + b"\0")
+                    stdin.flush()
+                except (BrokenPipeError, OSError):
+                    pass  # Intentionally NOT passing exception onwards - reading the results reports the error
+
+            writer = threading.Thread(target=_write_paths, daemon=True)
+            writer.start()
+            try:
+                for path in paths:
+                    statuses[path] = self._read_is_ignored(proc)
+            finally:
+                writer.join()
+        return statuses
+
+    def is_ignored(self, path: str) -> bool:
+        """
+        Check whether the path is ignored by Git.
+        """
+        return self.get_ignored_statuses([path])[path]
+
+    def close(self) -> None:
+        """
+        Close the check-ignore process.
+        """
+        with self._lock:
+            if self._proc is None:
+                return
+            try:
+                assert self._proc.stdin is not None
+                self._proc.stdin.close()
+                self._proc.wait(timeout=5)
+            except Exception as e:
+                logger.debug(f"Killing git check-ignore process: {e}")
+                self._proc.kill()
+                self._proc.wait()
+            for stream in [self._proc.stdout, self._proc.stderr]:
+                if stream is not None:
+                    stream.close()
+            self._proc = None
+
+
+class GitIgnoreMatcher:
+    """
+    A pure-Python matcher for .gitignore files - for directory trees where git is not available, or that are not a git repository.
+
+    - reads the .gitignore file of each directory (and '.git/info/exclude' if present), with the same precedence as git: the last matching pattern wins, and patterns in deeper directories take precedence.
+    - the global core.excludesFile is not read.
+    """
+
+    def __init__(self, root_dir: str) -> None:
+        """
+        Args:
+        root_dir (str): The root directory of the tree (like the root of the repository).
+        """
+        self.root_dir = os.path.abspath(root_dir)
+        self._patterns_by_dir: dict[str, list[tuple[re.Pattern, bool, bool]]] = {}
+        self._lock = threading.Lock()
+
+    def _parse_patterns(
+        self, path_to_file: str, base_dir: str
+    ) -> list[tuple[re.Pattern, bool, bool]]:
+        """
+        Parse a .gitignore file into a list of (regex, is_negated, is_dir_only), where the regex matches paths relative to the root directory.
+        """
+        patterns: list[tuple[re.Pattern, bool, bool]] = []
+        if not os.path.isfile(path_to_file):
+            return patterns
+        for line in util_file.read_text_from_file(path_to_file).split("\n"):
+            line = line.rstrip("\r")
+            if not line or line.startswith("#"):
+                continue
+            # Trailing spaces are ignored, unless escaped
+            while line.endswith(" ") and not line.endswith("\\ "):
+                line = line[:-1]
+            is_negated = line.startswith("!")
+            if is_negated:
+                line = line[1:]
+            is_dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # A pattern with a slash (other than at the end) is relative to the .gitignore directory, else it matches at any level
+            if "/" in line:
+                line = line.lstrip("/")
+            else:
+                line = "**/" + line
+            prefix = base_dir + "/" if base_dir else ""
+            regex = re.compile(re.escape(prefix) + _wildmatch_to_regex(line))
+            patterns.append((regex, is_negated, is_dir_only))
+        return patterns
+
+    def _get_patterns(self, relative_dir: str) -> list[tuple[re.Pattern, bool, bool]]:
+        with self._lock:
+            if relative_dir not in self._patterns_by_dir:
+                path_to_dir = os.path.join(self.root_dir, relative_dir)
+                patterns = self._parse_patterns(
+                    os.path.join(path_to_dir, ".gitignore"), relative_dir
+                )
+                if not relative_dir:
+                    path_to_exclude = os.path.join(
+                        self.root_dir, ".git", "info", "exclude"
+                    )
+                    patterns = self._parse_patterns(path_to_exclude, "") + patterns
+                self._patterns_by_dir[relative_dir] = patterns
+            return self._patterns_by_dir[relative_dir]
+
+    def _is_matched(self, relative_path: str, is_dir: bool) -> bool:
+        parts = relative_path.split("/")
+        is_ignored = False
+        for depth in range(len(parts)):
+            for regex, is_negated, is_dir_only in self._get_patterns(
+                "/".join(parts[:depth])
+            ):
+                if is_dir_only and not is_dir:
+                    continue
+                if regex.fullmatch(relative_path):
+                    is_ignored = not is_negated
+        return is_ignored
+
+    def is_ignored(self, path: str) -> bool:
+        """
+        Check whether the path is ignored by the .gitignore files.
+
+        Args:
+        path (str): The path to check - absolute, or relative to the root directory.
+        """
+        path_to_file = os.path.join(self.root_dir, path)
+        relative_path = os.path.relpath(path_to_file, self.root_dir).replace(
+            os.sep, "/"
+        )
+        if relative_path == "." or relative_path.startswith("../"):
+            return False
+        parts = relative_path.split("/")
+        if parts[0] == ".git":
+            return False
+        # If a parent directory is ignored, then nothing inside it can be re-included
+        for depth in range(1, len(parts)):
+            if self._is_matched("/".join(parts[:depth]), is_dir=True):
+                return True
+        return self._is_matched(relative_path, os.path.isdir(path_to_file))
+
+
+def get_git_ignored_statuses(
+    directory: str, filenames: list[str], read_gitignore_directly: bool = False
+) -> dict[str, bool]:
+    """Check if each of many files is ignored by Git, in one go - instead of one git process per file (as is_git_ignored() does).
+    Args:
+    directory (str): The directory that the files are relative to.
+    filenames (list): The names of the files to check.
+    read_gitignore_directly (bool): Flag to match against the .gitignore files in Python (the directory is treated as the root), instead of using git. Useful for trees that are not git repositories. Default is False.
+    Returns:
+    dict: Each filename mapped to True if it is ignored, else False."""
+    if read_gitignore_directly:
+        matcher = GitIgnoreMatcher(directory)
+        return {filename: matcher.is_ignored(filename) for filename in filenames}
+    with GitIgnoreChecker(directory) as checker:
+        return checker.get_ignored_statuses(filenames)
@@ -84,6 +84,37 @@ if is_windows():
         return str(value) == "1"
 
 
+WINDOWS_MAX_COMMAND_LINE_LENGTH = 32767
+
+
+def get_max_command_line_length() -> int:
+    """
+    Get the maximum length of the command line (program plus arguments) that can be passed to a new process.
+
+    - Windows: the CreateProcess limit of 32767 characters.
+    - Mac/Unix: ARG_MAX, less the space taken by the current environment variables.
+
+    Returns:
+    int: The maximum command line length, in bytes (or characters on Windows).
+    """
+    if is_windows():
+        return WINDOWS_MAX_COMMAND_LINE_LENGTH
+    try:
+        arg_max = os.sysconf("SC_ARG_MAX")
+    except (ValueError, OSError):
+        arg_max = -1
+    if arg_max <= 0:
+        arg_max = (
+            131072  # POSIX minimum is 4096, but all modern systems allow at least 128K
+        )
+    pointer_size = 8
+    environment_size = sum(
+        len(key) + len(value) + 2 + pointer_size for key, value in os.environ.items()
+    )
+    safety_margin = 4096
+    return max(arg_max - environment_size - safety_margin, 4096)
+
+
 def log_os() -> None:
     """
     Log OS information including platform, system, name, and release.
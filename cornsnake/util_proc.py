@@ -4,12 +4,27 @@ Running processes and opening Windows Explorer at a specified directory.
 [Documentation](http://docs.mrseanryan.cornsnake.s3-website-eu-west-1.amazonaws.com/cornsnake/util_proc.html)
 """
 
+import abc
+import asyncio
+import concurrent.futures
+import contextlib
+from dataclasses import asdict, dataclass, field
+import json
+import logging
 import os
+import random
+import re
+import signal
 import subprocess
+import tempfile
+import threading
+import time
+import typing
 
 from . import config
 from . import util_log
 from . import util_os
+from . import util_time
 
 logger = util_log.getLogger(__name__)
 
@@ -38,22 +53,606 @@ def _proc_print_debug(message: str) -> None:
         print(message)
 
 
-def is_process_running(process_name: str) -> bool:
+@dataclass
+class ProcessResourceUsage:
+    """
+    The CPU time and peak memory used by a process that has completed (POSIX only - measured via os.wait4).
+    """
+
+    user_cpu_seconds: float
+    system_cpu_seconds: float
+    max_rss_bytes: int
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.user_cpu_seconds + self.system_cpu_seconds
+
+
+@dataclass
+class ProcessRecord:
+    """
+    Instrumentation record of one process that was run - passed to each sink added via add_process_sink().
+    """
+
+    program: str
+    arguments: list[str]
+    working_directory: str
+    elapsed_seconds: float
+    exit_code: int | None
+    stdout_bytes: int
+    stderr_bytes: int
+    resource_usage: ProcessResourceUsage | None = None
+
+    def get_command_name(self) -> str:
+        """
+        Get a short name for grouping similar commands: the program filename and its first argument - for example 'git fetch'.
+        """
+        name = os.path.basename(self.program)
+        if self.arguments:
+            name += " " + self.arguments[0]
+        return name
+
+
+class ProcessSink(abc.ABC):
+    """
+    Base class for a sink that receives a ProcessRecord for every process run via this module. Add a sink via add_process_sink().
+    """
+
+    @abc.abstractmethod
+    def record(self, process_record: ProcessRecord) -> None:
+        """
+        Receive the record of one process that was run. Can be called from several threads at the same time.
+        """
+
+
+class InMemoryProcessStats(ProcessSink):
+    """
+    A sink that aggregates process records in memory, to report the slowest and most frequent commands.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.records: list[ProcessRecord] = []
+
+    def record(self, process_record: ProcessRecord) -> None:
+        with self._lock:
+            self.records.append(process_record)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records = []
+
+    def get_stats_by_command(self) -> dict[str, tuple[int, float]]:
+        """
+        Get the count and total time per command name (like 'git fetch').
+
+        Returns:
+        dict: Each command name mapped to (count, total elapsed seconds).
+        """
+        stats: dict[str, tuple[int, float]] = {}
+        with self._lock:
+            for process_record in self.records:
+                name = process_record.get_command_name()
+                count, total_seconds = stats.get(name, (0, 0.0))
+                stats[name] = (
+                    count + 1,
+                    total_seconds + process_record.elapsed_seconds,
+                )
+        return stats
+
+    def get_summary_report(self, top_n: int = 10) -> str:
+        """
+        Get a text report of the slowest processes, and of the most frequent and most time-consuming commands.
+
+        Args:
+        top_n (int): The number of entries to show in each section. Default is 10.
+        """
+        with self._lock:
+            records = list(self.records)
+        stats = self.get_stats_by_command()
+        total_seconds = sum(r.elapsed_seconds for r in records)
+        lines = [
+            f"Processes: {len(records)} [total time: {total_seconds:.3f}s]",
+            f"Slowest {top_n} processes:",
+        ]
+        for r in sorted(records, key=lambda r: r.elapsed_seconds, reverse=True)[:top_n]:
+            lines.append(
+                f"  {r.elapsed_seconds:.3f}s - {r.program} {r.arguments} - at {r.working_directory} [exit code: {r.exit_code}]"
+            )
+        lines.append(f"Most frequent {top_n} commands:")
+        for name, (count, seconds) in sorted(
+            stats.items(), key=lambda item: item[1][0], reverse=True
+        )[:top_n]:
+            lines.append(f"  {count} x {name} [total time: {seconds:.3f}s]")
+        lines.append(f"Most time-consuming {top_n} commands:")
+        for name, (count, seconds) in sorted(
+            stats.items(), key=lambda item: item[1][1], reverse=True
+        )[:top_n]:
+            lines.append(
+                f"  {seconds:.3f}s - {name} [{count} x, average: {seconds / count:.3f}s]"
+            )
+        return "\n".join(lines)
+
+
+class JsonlProcessSink(ProcessSink):
+    """
+    A sink that appends each process record as one line of JSON to a file.
+    """
+
+    def __init__(self, path_to_file: str) -> None:
+        self.path_to_file = path_to_file
+        self._lock = threading.Lock()
+
+    def record(self, process_record: ProcessRecord) -> None:
+        line = json.dumps(asdict(process_record))
+        with self._lock:
+            with open(self.path_to_file, "a", encoding="utf-8") as file:
+                file.write(line + "\n")
+
+
+class LoggingProcessSink(ProcessSink):
+    """
+    A sink that logs each process record.
+    """
+
+    def __init__(
+        self, sink_logger: logging.Logger | None = None, level: int = logging.INFO
+    ) -> None:
+        self.logger = sink_logger if sink_logger is not None else logger
+        self.level = level
+
+    def record(self, process_record: ProcessRecord) -> None:
+        r = process_record
+        usage = ""
+        if r.resource_usage is not None:
+            usage = f", cpu: {r.resource_usage.user_cpu_seconds:.3f}s user + {r.resource_usage.system_cpu_seconds:.3f}s sys, max rss: {r.resource_usage.max_rss_bytes} bytes"
+        self.logger.log(
+            self.level,
+            f"PROCESS: '{r.program} {r.arguments}' - at {r.working_directory} - {r.elapsed_seconds:.3f}s [exit code: {r.exit_code}, stdout: {r.stdout_bytes} bytes, stderr: {r.stderr_bytes} bytes{usage}]",
+        )
+
+
+_process_sinks: list[ProcessSink] = []
+_process_sinks_lock = threading.Lock()
+
+
+def add_process_sink(sink: ProcessSink) -> None:
+    """
+    Add a sink to receive a ProcessRecord for every process run via this module (and so every git command run via util_git).
+
+    Example:
+    ```
+    stats = util_proc.InMemoryProcessStats()
+    util_proc.add_process_sink(stats)
+    ...
+    print(stats.get_summary_report())
+    ```
+    """
+    with _process_sinks_lock:
+        _process_sinks.append(sink)
+
+
+def remove_process_sink(sink: ProcessSink) -> None:
+    """
+    Remove a sink that was added via add_process_sink().
+    """
+    with _process_sinks_lock:
+        if sink in _process_sinks:
+            _process_sinks.remove(sink)
+
+
+def _record_process(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    start: float,
+    exit_code: int | None,
+    stdout_bytes: int,
+    stderr_bytes: int,
+    resource_usage: ProcessResourceUsage | None = None,
+) -> None:
+    """
+    Send a record of the process to any sinks. A failing sink is logged, and does not affect the caller.
+    """
+    if not _process_sinks:
+        return
+    process_record = ProcessRecord(
+        program=path_to_proc,
+        arguments=arguments,
+        working_directory=working_directory,
+        elapsed_seconds=util_time.end_timer(start),
+        exit_code=exit_code,
+        stdout_bytes=stdout_bytes,
+        stderr_bytes=stderr_bytes,
+        resource_usage=resource_usage,
+    )
+    with _process_sinks_lock:
+        sinks = list(_process_sinks)
+    for sink in sinks:
+        try:
+            sink.record(process_record)
+        except Exception as e:
+            logger.warning(f"Process sink {type(sink).__name__} failed: {e}")
+
+
+# Caching the snapshot is opt-in: a cached snapshot can miss a process that was just started (or report one that was just killed).
+DEFAULT_PROCESS_SNAPSHOT_MAX_AGE_SECONDS = 0.0
+
+_process_names_snapshot: tuple[float, frozenset[str]] | None = None
+_process_names_snapshot_lock = threading.Lock()
+
+
+def _normalize_process_name(process_name: str) -> str:
+    return process_name.lower() if util_os.is_windows() else process_name
+
+
+def _read_process_names_from_proc() -> set[str]:
+    """
+    Read the names of the running processes directly from /proc (Linux), without starting a process.
+
+    - each process contributes its kernel name (comm, truncated to 15 characters) and the filename of its program (from cmdline).
+    """
+    names: set[str] = set()
+    with os.scandir("/proc") as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(os.path.join(entry.path, "comm"), "rb") as f:
+                    names.add(f.read().decode(errors="replace").strip())
+                with open(os.path.join(entry.path, "cmdline"), "rb") as f:
+                    program = f.read().split(b"\0", 1)[0]
+                if program:
+                    names.add(os.path.basename(program.decode(errors="replace")))
+            except (FileNotFoundError, ProcessLookupError, PermissionError):
+                pass  # Intentionally NOT passing exception onwards - process exited, or is not readable
+    return names
+
+
+def _read_process_names_via_tasklist() -> set[str]:
+    output = subprocess.check_output(["tasklist", "/FO", "CSV", "/NH"]).decode(
+        errors="replace"
+    )
+    # Each line is like: "notepad.exe","1234","Console","1","10,000 K"
+    return {
+        line.split('","', 1)[0].strip('"').lower()
+        for line in output.splitlines()
+        if line.strip()
+    }
+
+
+def _read_process_names_via_ps() -> set[str]:
+    output = subprocess.check_output(["ps", "-A", "-o", "comm="]).decode(
+        errors="replace"
+    )
+    names: set[str] = set()
+    for line in output.splitlines():
+        if line.strip():
+            names.add(line.strip())
+            names.add(os.path.basename(line.strip()))
+    return names
+
+
+def get_running_process_names(
+    max_age_seconds: float = DEFAULT_PROCESS_SNAPSHOT_MAX_AGE_SECONDS,
+) -> frozenset[str]:
+    """
+    Gets the names of the running processes, optionally from a snapshot that is re-used for up to max_age_seconds.
+
+    - on Linux, /proc is read directly. Otherwise tasklist (Windows) or ps is run - once per snapshot, not once per name.
+    - on Windows, names are in lower case.
+
+    Args:
+    max_age_seconds (float): The maximum age of a cached snapshot to re-use. Default is 0 (always take a new snapshot) - pass a value like 1.0 to opt in to re-using a snapshot, for example when polling in a loop.
+
+    Returns:
+    frozenset: The names of the running processes.
+    """
+    global _process_names_snapshot
+    with _process_names_snapshot_lock:
+        now = util_time.start_timer()
+        if (
+            _process_names_snapshot is not None
+            and now - _process_names_snapshot[0] < max_age_seconds
+        ):
+            return _process_names_snapshot[1]
+        if util_os.is_windows():
+            names = _read_process_names_via_tasklist()
+        elif os.path.isdir("/proc/self"):
+            names = _read_process_names_from_proc()
+        else:
+            names = _read_process_names_via_ps()
+        _process_names_snapshot = (now, frozenset(names))
+        return _process_names_snapshot[1]
+
+
+def are_processes_running(
+    process_names: list[str],
+    max_age_seconds: float = DEFAULT_PROCESS_SNAPSHOT_MAX_AGE_SECONDS,
+) -> dict[str, bool]:
+    """
+    Checks which of the given processes (identified by program filename) are running - using one snapshot of the running processes.
+
+    Args:
+    process_names (list): The filenames of the processes. For example ['notepad.exe', 'git.exe'].
+    max_age_seconds (float): The maximum age of a cached snapshot to re-use. Default is 0 (always take a new snapshot) - pass a value like 1.0 to opt in to re-using a snapshot, for example when polling in a loop.
+
+    Returns:
+    dict: For each process name, whether it is running.
+    """
+    running = get_running_process_names(max_age_seconds)
+    return {name: _normalize_process_name(name) in running for name in process_names}
+
+
+def is_process_running(
+    process_name: str,
+    max_age_seconds: float = DEFAULT_PROCESS_SNAPSHOT_MAX_AGE_SECONDS,
+) -> bool:
     """
     Checks if the given process (identified by program filename) is running.
 
+    - to check many processes, are_processes_running() is cheaper.
+
     Args:
     process_name (str): The filename of the process. For example 'notepad.exe'.
+    max_age_seconds (float): The maximum age of a cached snapshot of the running processes to re-use. Default is 0 (always take a new snapshot) - pass a value like 1.0 to opt in to re-using a snapshot, for example when polling in a loop.
+    """
+    return are_processes_running([process_name], max_age_seconds)[process_name]
+
+
+class ProcessTimeoutError(RuntimeError):
+    """
+    Raised when a process does not complete within its timeout. The process (and its process group) has been killed.
+
+    - args are (message, None) - the same shape as the RuntimeError(message, exit code) raised for a failed process, but with no exit code.
+    - partial_stdout and partial_stderr hold any output captured before the timeout.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        path_to_proc: str,
+        arguments: list[str],
+        timeout_seconds: float,
+        partial_stdout: str,
+        partial_stderr: str,
+    ) -> None:
+        super().__init__(message, None)
+        self.path_to_proc = path_to_proc
+        self.arguments = arguments
+        self.timeout_seconds = timeout_seconds
+        self.partial_stdout = partial_stdout
+        self.partial_stderr = partial_stderr
+
+
+# Per-thread deadline (as from util_time.start_timer()) set by process_deadline()
+_thread_state = threading.local()
+
+
+@contextlib.contextmanager
+def process_deadline(timeout_seconds: float) -> typing.Generator[None, None, None]:
     """
+    Limit every process that this thread starts via util_proc (and so util_git) to finish within timeout_seconds from now - a process still running at the deadline is killed, with its process group, and raises ProcessTimeoutError.
+
+    - for putting a time limit on a whole operation that runs several processes, for example util_git.fetch.
+    - a process's own timeout_seconds still applies, if it is shorter.
+
+    ```
+    with util_proc.process_deadline(60):
+        util_git.fetch(repo_dir)
+    ```
+
+    Args:
+    timeout_seconds (float): The time limit, from now.
+    """
+    previous = getattr(_thread_state, "deadline", None)
+    deadline = util_time.start_timer() + timeout_seconds
+    _thread_state.deadline = deadline if previous is None else min(previous, deadline)
+    try:
+        yield
+    finally:
+        _thread_state.deadline = previous
+
+
+def _get_timeout_seconds(timeout_seconds: float | None) -> float | None:
+    """
+    Get the timeout to apply: the given timeout, else the default from config.PROCESS_TIMEOUT_SECONDS - limited to the time left before the deadline of this thread, if any (see process_deadline()).
+    """
+    if timeout_seconds is None:
+        timeout_seconds = config.PROCESS_TIMEOUT_SECONDS
+    deadline: float | None = getattr(_thread_state, "deadline", None)
+    if deadline is None:
+        return timeout_seconds
+    remaining = max(0.0, deadline - util_time.start_timer())
+    return remaining if timeout_seconds is None else min(timeout_seconds, remaining)
+
+
+def _get_popen_group_kwargs(timeout_seconds: float | None) -> dict[str, typing.Any]:
+    """
+    Get the Popen arguments to start the process in its own process group, so that on timeout the whole group can be killed (for example git and its helpers).
+
+    - only done when there is a timeout, so that otherwise Ctrl+C still reaches the process.
+    """
+    if timeout_seconds is None:
+        return {}
     if util_os.is_windows():
-        progs = str(subprocess.check_output("tasklist"))
-        return process_name in progs
+        return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+    return {"start_new_session": True}
+
+
+def _kill_process_group(
+    pid: int, is_own_group: bool, kill: typing.Callable[[], None]
+) -> None:
+    """
+    Kill the process and its process group (if it was started in its own group), ignoring a process that has already exited.
+    """
+    try:
+        if is_own_group:
+            if util_os.is_windows():
+                subprocess.run(
+                    ["taskkill", "/F", "/T", "/PID", str(pid)],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+            else:
+                os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError) as e:
+        logger.debug(f"Could not kill process group {pid}: {e}")
+    try:
+        kill()
+    except ProcessLookupError:
+        pass  # Intentionally NOT passing exception onwards - already exited
+
+
+def _raise_timeout(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    timeout_seconds: float,
+    partial_stdout: bytes,
+    partial_stderr: bytes,
+    output_errors: bool,
+) -> typing.NoReturn:
+    err_msg = f"Process timed out after {timeout_seconds}s: '{path_to_proc} {arguments}' - at {working_directory}"
+    if output_errors:
+        print(err_msg)
     else:
-        try:
-            progs = str(subprocess.check_output(["pgrep", process_name]))
-            return process_name in progs
-        except subprocess.CalledProcessError:
-            return False
+        logger.debug(err_msg)
+    raise ProcessTimeoutError(
+        err_msg,
+        path_to_proc,
+        arguments,
+        timeout_seconds,
+        partial_stdout.decode(errors="replace"),
+        partial_stderr.decode(errors="replace"),
+    )
+
+
+def _check_process_errors(
+    std_err_str: str,
+    returncode: int | None,
+    output_errors: bool,
+    raise_if_str_error: bool,
+) -> None:
+    """
+    Handle the stderr and exit code of a process that has completed: output any errors, and raise if the process failed.
+
+    Raises:
+    RuntimeError: If the process returned a non-zero exit code (or populated stderr, if raise_if_str_error is set) - with args (message, exit code).
+    """
+    if returncode != 0:
+        # an error happened!
+        err_msg = f"{std_err_str.strip()}. Code: {returncode}"
+        if output_errors:
+            print(err_msg)
+        else:
+            logger.debug(err_msg)
+        raise RuntimeError(err_msg, returncode)
+    elif len(std_err_str):
+        # return code is 0 (no error), but we may want to
+        # do something with the info on std_err
+        if output_errors:
+            print(std_err_str)
+        else:
+            logger.debug(std_err_str)
+        if raise_if_str_error:
+            err_msg = f"{std_err_str.strip()}. Code: {returncode}"
+            raise RuntimeError(err_msg, returncode)
+
+
+def _run_process(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    output_errors: bool,
+    timeout_seconds: float | None,
+    discard_stdout: bool = False,
+) -> tuple[bytes, bytes, int]:
+    """
+    Run the process to completion, returning its raw stdout, stderr and exit code - without decoding or checking for errors.
+
+    Raises:
+    ProcessTimeoutError: If the process does not complete within the timeout (with any partial output).
+    """
+    _proc_print_debug(
+        f"EXECUTING: '{path_to_proc} {arguments}' - at {working_directory}"
+    )
+
+    timeout_seconds = _get_timeout_seconds(timeout_seconds)
+    start = util_time.start_timer()
+    pipes = subprocess.Popen(
+        [path_to_proc] + arguments,
+        stdout=subprocess.DEVNULL if discard_stdout else subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=working_directory,
+        **_get_popen_group_kwargs(timeout_seconds),
+    )
+    try:
+        std_out, std_err = pipes.communicate(timeout=timeout_seconds)
+    except subprocess.TimeoutExpired:
+        _kill_process_group(pipes.pid, True, pipes.kill)
+        std_out, std_err = pipes.communicate()
+        std_out = std_out or b""
+        _record_process(
+            path_to_proc,
+            arguments,
+            working_directory,
+            start,
+            None,
+            len(std_out),
+            len(std_err),
+        )
+        assert timeout_seconds is not None
+        _raise_timeout(
+            path_to_proc,
+            arguments,
+            working_directory,
+            timeout_seconds,
+            std_out,
+            std_err,
+            output_errors,
+        )
+    except BaseException:
+        # For example KeyboardInterrupt - do not leave the process running
+        _kill_process_group(pipes.pid, timeout_seconds is not None, pipes.kill)
+        pipes.wait()
+        raise
+    std_out = std_out or b""  # None if discarded
+    _record_process(
+        path_to_proc,
+        arguments,
+        working_directory,
+        start,
+        pipes.returncode,
+        len(std_out),
+        len(std_err),
+    )
+    return std_out, std_err, pipes.returncode
+
+
+def _check_process_errors_bytes(
+    std_err: bytes,
+    returncode: int,
+    output_errors: bool,
+    raise_if_str_error: bool,
+    encoding: str | None,
+    errors: str,
+) -> None:
+    # Only decode stderr if there is something to report
+    if returncode == 0 and not std_err:
+        return
+    _check_process_errors(
+        _decode(std_err, encoding, errors),
+        returncode,
+        output_errors,
+        raise_if_str_error,
+    )
+
+
+def _decode(output: bytes, encoding: str | None, errors: str) -> str:
+    if encoding is None:
+        return output.decode(errors=errors)
+    return output.decode(encoding, errors)
 
 
 def run_process_and_get_output(
@@ -62,6 +661,10 @@ def run_process_and_get_output(
     working_directory: str,
     output_errors: bool = True,
     raise_if_str_error: bool = False,
+    timeout_seconds: float | None = None,
+    encoding: str | None = None,
+    errors: str = "strict",
+    discard_stdout: bool = False,
 ) -> str:
     """
     Executes a process with specified arguments and working directory, capturing the output.
@@ -72,59 +675,1065 @@ def run_process_and_get_output(
     working_directory (str): The working directory for the process.
     output_errors (bool): Flag to print out errors. Default is True (but only if config.IS_VERBOSITY).
     raise_if_str_error (bool): Flag to raise an exception if stderr was a non-empty string (useful for programs that return 0 exit code, even though they populated stderr). Default is False.
+    timeout_seconds (float): Optional time limit. On timeout, the process and its process group are killed. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+    encoding (str): The encoding to decode stdout and stderr with. Default is None (UTF-8).
+    errors (str): How to handle decoding errors - for example 'strict', 'replace' or 'surrogateescape'. Default is 'strict'.
+    discard_stdout (bool): Flag to send stdout to the null device instead of capturing it - an empty string is returned. Default is False.
+
+    Returns:
+    str: The standard output of the process.
+
+    Raises:
+    RuntimeError: If the process returns a non-zero exit code.
+    ProcessTimeoutError: If the process does not complete within the timeout (with any partial output).
+    """
+    std_out, std_err, returncode = _run_process(
+        path_to_proc,
+        arguments,
+        working_directory,
+        output_errors,
+        timeout_seconds,
+        discard_stdout=discard_stdout,
+    )
+    _check_process_errors_bytes(
+        std_err, returncode, output_errors, raise_if_str_error, encoding, errors
+    )
+
+    std_out_str = _decode(std_out, encoding, errors)
+    _proc_print_debug(f" >>> {std_out_str}")
+
+    return std_out_str
+
+
+def run_process_and_get_output_bytes(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    output_errors: bool = True,
+    raise_if_str_error: bool = False,
+    timeout_seconds: float | None = None,
+) -> bytes:
+    """
+    Executes a process with specified arguments and working directory, capturing the raw output - stdout is never decoded.
+
+    - useful for binary output, or when only the size or emptiness of the output matters.
+    - stderr is only decoded if there is an error to report.
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    output_errors (bool): Flag to print out errors. Default is True.
+    raise_if_str_error (bool): Flag to raise an exception if stderr was non-empty. Default is False.
+    timeout_seconds (float): Optional time limit. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+
+    Returns:
+    bytes: The standard output of the process.
+
+    Raises:
+    RuntimeError: If the process returns a non-zero exit code.
+    ProcessTimeoutError: If the process does not complete within the timeout.
+    """
+    std_out, std_err, returncode = _run_process(
+        path_to_proc, arguments, working_directory, output_errors, timeout_seconds
+    )
+    _check_process_errors_bytes(
+        std_err, returncode, output_errors, raise_if_str_error, None, "replace"
+    )
+    _proc_print_debug(f" >>> [{len(std_out)} bytes]")
+    return std_out
+
+
+class LazyProcessOutput:
+    """
+    The output of a process, held as bytes and only decoded when the text is first requested (then cached).
+
+    - len() and bool() use the raw bytes, so checking for empty output does not decode.
+    """
+
+    def __init__(self, raw: bytes, encoding: str | None = None, errors: str = "strict"):
+        self.raw = raw
+        self.encoding = encoding
+        self.errors = errors
+        self._text: str | None = None
+
+    def get_text(self) -> str:
+        if self._text is None:
+            self._text = _decode(self.raw, self.encoding, self.errors)
+        return self._text
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __bool__(self) -> bool:
+        return len(self.raw) > 0
+
+    def __str__(self) -> str:
+        return self.get_text()
+
+
+def run_process_and_get_lazy_output(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    output_errors: bool = True,
+    raise_if_str_error: bool = False,
+    timeout_seconds: float | None = None,
+    encoding: str | None = None,
+    errors: str = "strict",
+) -> LazyProcessOutput:
+    """
+    Executes a process with specified arguments and working directory, capturing the output - which is only decoded if the caller asks for the text.
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    output_errors (bool): Flag to print out errors. Default is True.
+    raise_if_str_error (bool): Flag to raise an exception if stderr was non-empty. Default is False.
+    timeout_seconds (float): Optional time limit. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+    encoding (str): The encoding to decode the output with, when requested. Default is None (UTF-8).
+    errors (str): How to handle decoding errors. Default is 'strict'.
+
+    Returns:
+    LazyProcessOutput: The standard output of the process.
+
+    Raises:
+    RuntimeError: If the process returns a non-zero exit code.
+    ProcessTimeoutError: If the process does not complete within the timeout.
+    """
+    std_out, std_err, returncode = _run_process(
+        path_to_proc, arguments, working_directory, output_errors, timeout_seconds
+    )
+    _check_process_errors_bytes(
+        std_err, returncode, output_errors, raise_if_str_error, encoding, errors
+    )
+    _proc_print_debug(f" >>> [{len(std_out)} bytes]")
+    return LazyProcessOutput(std_out, encoding, errors)
+
+
+@dataclass
+class ProcessResult:
+    """
+    The result of a process run via run_process_and_get_result(): its output, exit code, wall time and (on POSIX) resource usage.
+    """
+
+    program: str
+    arguments: list[str]
+    working_directory: str
+    stdout: bytes
+    stderr: bytes
+    exit_code: int
+    elapsed_seconds: float
+    resource_usage: ProcessResourceUsage | None = None
+
+    @property
+    def is_ok(self) -> bool:
+        return self.exit_code == 0
+
+    def get_stdout_text(
+        self, encoding: str | None = None, errors: str = "strict"
+    ) -> str:
+        return _decode(self.stdout, encoding, errors)
+
+    def get_stderr_text(
+        self, encoding: str | None = None, errors: str = "strict"
+    ) -> str:
+        return _decode(self.stderr, encoding, errors)
+
+    def describe(self) -> str:
+        """
+        Describe the result in one line - for example to find which tools are CPU-bound (cpu close to elapsed) or memory-bound (high max rss).
+        """
+        text = f"'{self.program} {self.arguments}' - {self.elapsed_seconds:.3f}s [exit code: {self.exit_code}"
+        if self.resource_usage is not None:
+            usage = self.resource_usage
+            text += f", cpu: {usage.user_cpu_seconds:.3f}s user + {usage.system_cpu_seconds:.3f}s sys, max rss: {usage.max_rss_bytes / (1024 * 1024):.1f} MB"
+        return text + "]"
+
+
+def _to_resource_usage(rusage: typing.Any) -> ProcessResourceUsage:
+    # ru_maxrss is in kilobytes on Linux, but in bytes on Mac
+    max_rss_bytes = rusage.ru_maxrss if util_os.is_mac() else rusage.ru_maxrss * 1024
+    return ProcessResourceUsage(
+        user_cpu_seconds=rusage.ru_utime,
+        system_cpu_seconds=rusage.ru_stime,
+        max_rss_bytes=max_rss_bytes,
+    )
+
+
+def _start_reading_all(pipe: typing.IO[bytes]) -> tuple[threading.Thread, list[bytes]]:
+    chunks: list[bytes] = []
+
+    def _read() -> None:
+        with pipe:
+            for chunk in iter(lambda: pipe.read(65536), b""):
+                chunks.append(chunk)
+
+    thread = threading.Thread(target=_read, daemon=True)
+    thread.start()
+    return thread, chunks
+
+
+def run_process_and_get_result(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    output_errors: bool = True,
+    raise_if_error: bool = False,
+    timeout_seconds: float | None = None,
+) -> ProcessResult:
+    """
+    Executes a process with specified arguments and working directory, returning a result with its output, exit code, wall time and resource usage.
+
+    - on POSIX, the child's CPU user/sys time and peak RSS are taken from os.wait4(). On Windows, resource_usage is None.
+    - a non-zero exit code is only raised if raise_if_error is set - otherwise check result.exit_code.
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    output_errors (bool): Flag to print out errors. Default is True.
+    raise_if_error (bool): Flag to raise RuntimeError if the process returns a non-zero exit code. Default is False.
+    timeout_seconds (float): Optional time limit. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+
+    Returns:
+    ProcessResult: The result of the process.
+
+    Raises:
+    RuntimeError: If raise_if_error is set, and the process returns a non-zero exit code.
+    ProcessTimeoutError: If the process does not complete within the timeout.
+    """
+    if util_os.is_windows() or not hasattr(os, "wait4"):
+        start = util_time.start_timer()
+        std_out, std_err, returncode = _run_process(
+            path_to_proc, arguments, working_directory, output_errors, timeout_seconds
+        )
+        elapsed_seconds = util_time.end_timer(start)
+        resource_usage = None
+    else:
+        _proc_print_debug(
+            f"EXECUTING: '{path_to_proc} {arguments}' - at {working_directory}"
+        )
+        timeout_seconds = _get_timeout_seconds(timeout_seconds)
+        start = util_time.start_timer()
+        pipes = subprocess.Popen(
+            [path_to_proc] + arguments,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=working_directory,
+            **_get_popen_group_kwargs(timeout_seconds),
+        )
+        assert pipes.stdout is not None and pipes.stderr is not None
+        std_out_thread, std_out_chunks = _start_reading_all(pipes.stdout)
+        std_err_thread, std_err_chunks = _start_reading_all(pipes.stderr)
+
+        is_timed_out = threading.Event()
+        timer = None
+        if timeout_seconds is not None:
+
+            def _on_timeout() -> None:
+                is_timed_out.set()
+                # Signal directly - NOT via Popen.kill(), whose poll() could reap the child that os.wait4() is waiting for (losing its resource usage)
+                try:
+                    os.killpg(pipes.pid, signal.SIGKILL)
+                except OSError as e:
+                    logger.debug(f"Could not kill process group {pipes.pid}: {e}")
+
+            timer = threading.Timer(timeout_seconds, _on_timeout)
+            timer.daemon = True
+            timer.start()
+        try:
+            # Reap the child ourselves, to get its resource usage
+            _pid, status, rusage = os.wait4(pipes.pid, 0)
+        except BaseException:
+            _kill_process_group(pipes.pid, timeout_seconds is not None, pipes.kill)
+            pipes.wait()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+        pipes.returncode = os.waitstatus_to_exitcode(status)
+        std_out_thread.join()
+        std_err_thread.join()
+        elapsed_seconds = util_time.end_timer(start)
+        std_out = b"".join(std_out_chunks)
+        std_err = b"".join(std_err_chunks)
+        returncode = pipes.returncode
+        resource_usage = _to_resource_usage(rusage)
+        _record_process(
+            path_to_proc,
+            arguments,
+            working_directory,
+            start,
+            None if is_timed_out.is_set() else returncode,
+            len(std_out),
+            len(std_err),
+            resource_usage,
+        )
+        if is_timed_out.is_set():
+            assert timeout_seconds is not None
+            _raise_timeout(
+                path_to_proc,
+                arguments,
+                working_directory,
+                timeout_seconds,
+                std_out,
+                std_err,
+                output_errors,
+            )
+
+    result = ProcessResult(
+        program=path_to_proc,
+        arguments=arguments,
+        working_directory=working_directory,
+        stdout=std_out,
+        stderr=std_err,
+        exit_code=returncode,
+        elapsed_seconds=elapsed_seconds,
+        resource_usage=resource_usage,
+    )
+    _proc_print_debug(f" >>> {result.describe()}")
+    if raise_if_error and returncode != 0:
+        _check_process_errors_bytes(
+            std_err, returncode, output_errors, False, None, "replace"
+        )
+    return result
+
+
+async def run_process_and_get_output_async(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    output_errors: bool = True,
+    raise_if_str_error: bool = False,
+    timeout_seconds: float | None = None,
+) -> str:
+    """
+    Executes a process with specified arguments and working directory, capturing the output - without blocking the asyncio event loop.
+
+    - the asyncio counterpart of run_process_and_get_output(), with the same errors. Many processes can be overlapped via asyncio.gather().
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    output_errors (bool): Flag to print out errors. Default is True.
+    raise_if_str_error (bool): Flag to raise an exception if stderr was a non-empty string (useful for programs that return 0 exit code, even though they populated stderr). Default is False.
+    timeout_seconds (float): Optional time limit. On timeout (or if the task is cancelled), the process and its process group are killed. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
 
     Returns:
     str: The standard output of the process.
 
     Raises:
     RuntimeError: If the process returns a non-zero exit code.
+    ProcessTimeoutError: If the process does not complete within the timeout (with any partial output).
     """
     _proc_print_debug(
-        f"EXECUTING: '{path_to_proc} {arguments}' - at {working_directory}"
+        f"EXECUTING (async): '{path_to_proc} {arguments}' - at {working_directory}"
+    )
+
+    timeout_seconds = _get_timeout_seconds(timeout_seconds)
+    start = util_time.start_timer()
+    proc = await asyncio.create_subprocess_exec(
+        path_to_proc,
+        *arguments,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=working_directory,
+        **_get_popen_group_kwargs(timeout_seconds),
     )
+    assert proc.stdout is not None and proc.stderr is not None
+    # Read in tasks, so that any partial output is available on timeout
+    std_out_task = asyncio.ensure_future(proc.stdout.read())
+    std_err_task = asyncio.ensure_future(proc.stderr.read())
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=timeout_seconds)
+    except asyncio.TimeoutError:
+        _kill_process_group(proc.pid, True, proc.kill)
+        await proc.wait()
+        std_out, std_err = await asyncio.gather(std_out_task, std_err_task)
+        _record_process(
+            path_to_proc,
+            arguments,
+            working_directory,
+            start,
+            None,
+            len(std_out),
+            len(std_err),
+        )
+        assert timeout_seconds is not None
+        _raise_timeout(
+            path_to_proc,
+            arguments,
+            working_directory,
+            timeout_seconds,
+            std_out,
+            std_err,
+            output_errors,
+        )
+    except BaseException:
+        # For example, the task was cancelled - do not leave the process running
+        _kill_process_group(proc.pid, timeout_seconds is not None, proc.kill)
+        std_out_task.cancel()
+        std_err_task.cancel()
+        await asyncio.shield(proc.wait())
+        raise
+    std_out, std_err = await asyncio.gather(std_out_task, std_err_task)
+    _record_process(
+        path_to_proc,
+        arguments,
+        working_directory,
+        start,
+        proc.returncode,
+        len(std_out),
+        len(std_err),
+    )
+
+    std_out_str = std_out.decode()
+    _check_process_errors(
+        std_err.decode(), proc.returncode, output_errors, raise_if_str_error
+    )
+
+    _proc_print_debug(f" >>> {std_out_str}")
+
+    return std_out_str
+
+
+DEFAULT_MAX_STDERR_BYTES = (
+    1024 * 1024
+)  # stderr is only used for messages, so keep at most this much of it
+DEFAULT_MAX_MEMORY_BYTES = 16 * 1024 * 1024
 
+
+class _BoundedStdErrReader:
+    """
+    Reads a stderr pipe in the background (so that the process cannot block on a full pipe), keeping only the last max_bytes.
+    """
+
+    def __init__(self, pipe: typing.IO[bytes], max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._pipe = pipe
+        self._chunks: list[bytes] = []
+        self._retained_bytes = 0
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self) -> None:
+        while True:
+            chunk = self._pipe.read(65536)
+            if not chunk:
+                break
+            self.total_bytes += len(chunk)
+            self._chunks.append(chunk)
+            self._retained_bytes += len(chunk)
+            while self._retained_bytes > self.max_bytes and self._chunks:
+                excess = self._retained_bytes - self.max_bytes
+                first = self._chunks[0]
+                if len(first) <= excess:
+                    self._chunks.pop(0)
+                    self._retained_bytes -= len(first)
+                else:
+                    self._chunks[0] = first[excess:]
+                    self._retained_bytes -= excess
+
+    def join(self) -> None:
+        self._thread.join()
+        self._pipe.close()
+
+    def get_text(self) -> str:
+        text = b"".join(self._chunks).decode(errors="replace")
+        if self.total_bytes > self._retained_bytes:
+            text = f"[... {self.total_bytes - self._retained_bytes} bytes of stderr not kept ...]{text}"
+        return text
+
+
+def iterate_process_output_chunks(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    output_errors: bool = True,
+    chunk_size: int = 65536,
+    max_stderr_bytes: int = DEFAULT_MAX_STDERR_BYTES,
+    timeout_seconds: float | None = None,
+) -> typing.Generator[bytes, None, None]:
+    """
+    Executes a process with specified arguments and working directory, yielding its raw output in chunks, as soon as the process writes it.
+
+    - memory use is bounded: the output is never held as a whole, and only the last max_stderr_bytes of stderr are kept.
+    - if the caller stops iterating early, the process is killed.
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    output_errors (bool): Flag to print out errors. Default is True.
+    chunk_size (int): The maximum size of each chunk, in bytes. Default is 64 KB.
+    max_stderr_bytes (int): The maximum amount of stderr to keep for the error message, in bytes. Default is 1 MB.
+    timeout_seconds (float): Optional time limit for the whole process. On timeout, the process and its process group are killed. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+
+    Yields:
+    bytes: Each chunk of the standard output.
+
+    Raises:
+    RuntimeError: If the process returns a non-zero exit code (raised after the last chunk).
+    ProcessTimeoutError: If the process does not complete within the timeout (partial_stdout is empty, since it was already yielded).
+    """
+    _proc_print_debug(
+        f"EXECUTING (streaming): '{path_to_proc} {arguments}' - at {working_directory}"
+    )
+
+    timeout_seconds = _get_timeout_seconds(timeout_seconds)
+    start = util_time.start_timer()
     pipes = subprocess.Popen(
         [path_to_proc] + arguments,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         cwd=working_directory,
+        bufsize=0,  # unbuffered, so that each read returns as soon as some output is available
+        **_get_popen_group_kwargs(timeout_seconds),
     )
-    std_out, std_err = pipes.communicate()
+    assert pipes.stdout is not None and pipes.stderr is not None
+    std_err_reader = _BoundedStdErrReader(pipes.stderr, max_stderr_bytes)
 
-    std_out_str = ""
-    if isinstance(std_out, str):
-        std_out_str = std_out
-    else:
-        std_out_str = std_out.decode()
+    is_timed_out = threading.Event()
+    timer = None
+    if timeout_seconds is not None:
 
-    std_err_str = ""
-    if isinstance(std_err, str):
-        std_err_str = std_err
-    else:
-        std_err_str = std_err.decode()
+        def _on_timeout() -> None:
+            is_timed_out.set()
+            _kill_process_group(pipes.pid, True, pipes.kill)
 
-    if pipes.returncode != 0:
-        # an error happened!
-        err_msg = f"{std_err_str.strip()}. Code: {pipes.returncode}"
-        if output_errors:
-            print(err_msg)
-        else:
-            logger.debug(err_msg)
-        raise RuntimeError(err_msg, pipes.returncode)
-    elif len(std_err_str):
-        # return code is 0 (no error), but we may want to
-        # do something with the info on std_err
-        if output_errors:
-            print(std_err_str)
-        else:
-            logger.debug(std_err_str)
-        if raise_if_str_error:
-            err_msg = f"{std_err_str.strip()}. Code: {pipes.returncode}"
-            raise RuntimeError(err_msg, pipes.returncode)
+        timer = threading.Timer(timeout_seconds, _on_timeout)
+        timer.daemon = True
+        timer.start()
 
-    _proc_print_debug(f" >>> {std_out_str}")
+    is_complete = False
+    std_out_bytes = 0
+    try:
+        while True:
+            chunk = pipes.stdout.read(chunk_size)
+            if not chunk:
+                break
+            std_out_bytes += len(chunk)
+            yield chunk
+        is_complete = True
+    finally:
+        if not is_complete:
+            # The caller stopped iterating early (or an error occurred)
+            _kill_process_group(pipes.pid, timeout_seconds is not None, pipes.kill)
+        pipes.stdout.close()
+        # The process can still be running after closing its stdout - so keep the timer until it has exited
+        pipes.wait()
+        std_err_reader.join()
+        if timer is not None:
+            timer.cancel()
+        _record_process(
+            path_to_proc,
+            arguments,
+            working_directory,
+            start,
+            None if is_timed_out.is_set() else pipes.returncode,
+            std_out_bytes,
+            std_err_reader.total_bytes,
+        )
 
-    return std_out_str
+    if is_timed_out.is_set():
+        assert timeout_seconds is not None
+        _raise_timeout(
+            path_to_proc,
+            arguments,
+            working_directory,
+            timeout_seconds,
+            b"",
+            std_err_reader.get_text().encode(),
+            output_errors,
+        )
+    _check_process_errors(
+        std_err_reader.get_text(), pipes.returncode, output_errors, False
+    )
+
+
+def iterate_process_output(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    separator: bytes = b"\n",
+    output_errors: bool = True,
+    max_stderr_bytes: int = DEFAULT_MAX_STDERR_BYTES,
+    timeout_seconds: float | None = None,
+) -> typing.Generator[str, None, None]:
+    """
+    Executes a process with specified arguments and working directory, yielding each record of its output as soon as the process writes it.
+
+    - unlike run_process_and_get_output(), the whole output is never held in memory.
+    - if the caller stops iterating early, the process is killed.
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    separator (bytes): The separator between records. Default is a new line. Use b"\0" for NUL-delimited output (like 'git log -z').
+    output_errors (bool): Flag to print out errors. Default is True.
+    max_stderr_bytes (int): The maximum amount of stderr to keep for the error message, in bytes. Default is 1 MB.
+    timeout_seconds (float): Optional time limit for the whole process. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+
+    Yields:
+    str: Each record of the standard output, without the separator.
+
+    Raises:
+    RuntimeError: If the process returns a non-zero exit code (raised after the last record).
+    """
+    pending = b""
+    for chunk in iterate_process_output_chunks(
+        path_to_proc,
+        arguments,
+        working_directory,
+        output_errors=output_errors,
+        max_stderr_bytes=max_stderr_bytes,
+        timeout_seconds=timeout_seconds,
+    ):
+        pending += chunk
+        records = pending.split(separator)
+        pending = records.pop()
+        for record in records:
+            yield record.decode()
+    if pending:
+        yield pending.decode()
+
+
+def run_process_and_handle_output(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    handle_output_chunk: typing.Callable[[bytes], typing.Any],
+    output_errors: bool = True,
+    max_stderr_bytes: int = DEFAULT_MAX_STDERR_BYTES,
+    timeout_seconds: float | None = None,
+) -> None:
+    """
+    Executes a process with specified arguments and working directory, passing each chunk of its output to the given callback, instead of holding the output in memory.
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    handle_output_chunk (Callable): Called with each chunk of the standard output (bytes) - for example to write to a file, or to hash.
+    output_errors (bool): Flag to print out errors. Default is True.
+    max_stderr_bytes (int): The maximum amount of stderr to keep for the error message, in bytes. Default is 1 MB.
+    timeout_seconds (float): Optional time limit for the whole process. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+
+    Raises:
+    RuntimeError: If the process returns a non-zero exit code.
+    ProcessTimeoutError: If the process does not complete within the timeout.
+    """
+    for chunk in iterate_process_output_chunks(
+        path_to_proc,
+        arguments,
+        working_directory,
+        output_errors=output_errors,
+        max_stderr_bytes=max_stderr_bytes,
+        timeout_seconds=timeout_seconds,
+    ):
+        handle_output_chunk(chunk)
+
+
+def run_process_and_get_spooled_output(
+    path_to_proc: str,
+    arguments: list[str],
+    working_directory: str,
+    output_errors: bool = True,
+    max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+    max_stderr_bytes: int = DEFAULT_MAX_STDERR_BYTES,
+    timeout_seconds: float | None = None,
+) -> typing.IO[bytes]:
+    """
+    Executes a process with specified arguments and working directory, capturing its output in memory - but spilling to a temporary file once the output is larger than max_memory_bytes.
+
+    - the caller should close the returned file, which deletes any temporary file:
+
+    ```
+    with util_proc.run_process_and_get_spooled_output(config.PATH_TO_GIT, ["rev-list", "--all"], repo_dir) as output:
+        for line in output:
+            ...
+    ```
+
+    Args:
+    path_to_proc (str): The path to the process to execute.
+    arguments (list): List of arguments for the process.
+    working_directory (str): The working directory for the process.
+    output_errors (bool): Flag to print out errors. Default is True.
+    max_memory_bytes (int): The maximum amount of output to hold in memory, before spilling to a temporary file. Default is 16 MB.
+    max_stderr_bytes (int): The maximum amount of stderr to keep for the error message, in bytes. Default is 1 MB.
+    timeout_seconds (float): Optional time limit for the whole process. Default is config.PROCESS_TIMEOUT_SECONDS (no timeout).
+
+    Returns:
+    IO: A binary file object containing the standard output, positioned at the start.
+
+    Raises:
+    RuntimeError: If the process returns a non-zero exit code.
+    ProcessTimeoutError: If the process does not complete within the timeout.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes, mode="w+b")
+    try:
+        run_process_and_handle_output(
+            path_to_proc,
+            arguments,
+            working_directory,
+            output.write,
+            output_errors=output_errors,
+            max_stderr_bytes=max_stderr_bytes,
+            timeout_seconds=timeout_seconds,
+        )
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return typing.cast(typing.IO[bytes], output)
+
+
+DEFAULT_MAX_PROCESS_JOB_WORKERS = min(32, os.cpu_count() or 1)
+
+
+@dataclass
+class ProcessJob:
+    """
+    One process to run as part of a batch, via iterate_process_jobs() or run_process_jobs().
+
+    - tag is not used by the runner - it is for the caller to identify the job in the results (for example a repository or project name).
+    """
+
+    path_to_proc: str
+    arguments: list[str]
+    working_directory: str
+    timeout_seconds: float | None = None
+    raise_if_str_error: bool = False
+    tag: typing.Any = None
+
+
+@dataclass
+class ProcessJobResult:
+    """
+    The outcome of one ProcessJob.
+    """
+
+    job: ProcessJob
+    output: str = ""
+    error: Exception | None = None
+    elapsed_seconds: float = 0.0
+
+    @property
+    def is_ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def is_timed_out(self) -> bool:
+        return isinstance(self.error, ProcessTimeoutError)
+
+
+@dataclass
+class ProcessBatchReport:
+    """
+    The results of run_process_jobs(), in completion order, with aggregate stats.
+    """
+
+    results: list[ProcessJobResult] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    def get_succeeded(self) -> list[ProcessJobResult]:
+        return [r for r in self.results if r.is_ok]
+
+    def get_failed(self) -> list[ProcessJobResult]:
+        return [r for r in self.results if not r.is_ok]
+
+    def get_timed_out(self) -> list[ProcessJobResult]:
+        return [r for r in self.results if r.is_timed_out]
+
+    def get_total_process_seconds(self) -> float:
+        """
+        The sum of the elapsed time of every job - compared to elapsed_seconds, this shows how much the parallelism helped.
+        """
+        return sum(r.elapsed_seconds for r in self.results)
+
+    def describe(self, top_n: int = 5) -> str:
+        """
+        Describe the report in a few lines of text - a summary, the slowest jobs, plus one line per failed job.
+        """
+        lines = [
+            f"{len(self.get_succeeded())} of {len(self.results)} jobs succeeded, {len(self.get_timed_out())} timed out [time taken: {util_time.describe_elapsed_seconds(self.elapsed_seconds)} - total process time: {util_time.describe_elapsed_seconds(self.get_total_process_seconds())}]"
+        ]
+        slowest = sorted(self.results, key=lambda r: r.elapsed_seconds, reverse=True)
+        for result in slowest[:top_n]:
+            lines.append(
+                f"  {result.elapsed_seconds:.3f}s: {result.job.path_to_proc} {result.job.arguments} - at {result.job.working_directory}"
+            )
+        for failed in self.get_failed():
+            lines.append(
+                f"  FAILED: {failed.job.path_to_proc} {failed.job.arguments} - at {failed.job.working_directory} - {failed.error}"
+            )
+        return "\n".join(lines)
+
+
+def _run_process_job(job: ProcessJob) -> ProcessJobResult:
+    start = util_time.start_timer()
+    result = ProcessJobResult(job)
+    try:
+        result.output = run_process_and_get_output(
+            job.path_to_proc,
+            job.arguments,
+            job.working_directory,
+            output_errors=False,
+            raise_if_str_error=job.raise_if_str_error,
+            timeout_seconds=job.timeout_seconds,
+        )
+    except Exception as e:
+        logger.warning(
+            f"Process job failed: '{job.path_to_proc} {job.arguments}' - at {job.working_directory}: {e}"
+        )
+        result.error = e
+    result.elapsed_seconds = util_time.end_timer(start)
+    return result
+
+
+def iterate_process_jobs(
+    jobs: typing.Iterable[ProcessJob],
+    max_workers: int = DEFAULT_MAX_PROCESS_JOB_WORKERS,
+) -> typing.Generator[ProcessJobResult, None, None]:
+    """
+    Runs many processes with bounded parallelism, yielding each result as soon as its process completes (so in completion order, not submission order).
+
+    - at most max_workers processes run at the same time, and jobs are taken from the iterable only as workers become free - so jobs can be a generator.
+    - a failed or timed out job does not stop the others - its error is on the result.
+    - each job's timeout_seconds (default config.PROCESS_TIMEOUT_SECONDS) kills that process if exceeded.
+    - if the caller stops iterating early, jobs not yet started are not run.
+
+    Args:
+    jobs (Iterable): The jobs to run.
+    max_workers (int): The maximum number of processes to run at the same time. Default is the number of CPUs (up to 32).
+
+    Yields:
+    ProcessJobResult: The result of each job, as it completes.
+    """
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1 - but was {max_workers}")
+    jobs_iter = iter(jobs)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    pending: set[concurrent.futures.Future[ProcessJobResult]] = set()
+    try:
+        while True:
+            for job in jobs_iter:
+                pending.add(executor.submit(_run_process_job, job))
+                if len(pending) >= max_workers:
+                    break
+            if not pending:
+                break
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def run_process_jobs(
+    jobs: typing.Iterable[ProcessJob],
+    max_workers: int = DEFAULT_MAX_PROCESS_JOB_WORKERS,
+) -> ProcessBatchReport:
+    """
+    Runs many processes with bounded parallelism, collecting the results and aggregate stats.
+
+    Example - lint many projects, 4 at a time:
+    ```
+    jobs = [util_proc.ProcessJob("ruff", ["check", "."], project_dir, timeout_seconds=60) for project_dir in project_dirs]
+    report = util_proc.run_process_jobs(jobs, max_workers=4)
+    print(report.describe())
+    ```
+
+    Args:
+    jobs (Iterable): The jobs to run.
+    max_workers (int): The maximum number of processes to run at the same time. Default is the number of CPUs (up to 32).
+
+    Returns:
+    ProcessBatchReport: The results, in completion order.
+    """
+    start = util_time.start_timer()
+    report = ProcessBatchReport()
+    for result in iterate_process_jobs(jobs, max_workers=max_workers):
+        report.results.append(result)
+    report.elapsed_seconds = util_time.end_timer(start)
+    return report
+
+
+@dataclass
+class RetryPolicy:
+    """
+    When and how often to retry an operation that failed with a transient error - for example a git fetch over a busy network.
+
+    - the delay before retry N is initial_delay_seconds * backoff_multiplier ** (N - 1), capped at max_delay_seconds, then reduced by a random jitter of up to jitter_ratio (so many clients do not retry in lock step).
+    - max_elapsed_seconds: no retry is started if it would begin after this time (measured from the first attempt).
+    - an error is retryable if its exit code is in retryable_exit_codes, or its message matches one of retryable_stderr_patterns (regular expressions). If neither is set, every failure (RuntimeError) is retryable.
+    - a timeout (ProcessTimeoutError) is retryable if is_timeout_retryable.
+    """
+
+    max_attempts: int = 3
+    initial_delay_seconds: float = 1.0
+    backoff_multiplier: float = 2.0
+    max_delay_seconds: float = 30.0
+    jitter_ratio: float = 0.5
+    max_elapsed_seconds: float | None = None
+    retryable_exit_codes: list[int] = field(default_factory=list)
+    retryable_stderr_patterns: list[str] = field(default_factory=list)
+    is_timeout_retryable: bool = True
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, ProcessTimeoutError):
+            return self.is_timeout_retryable
+        if not isinstance(error, RuntimeError):
+            return False
+        if not self.retryable_exit_codes and not self.retryable_stderr_patterns:
+            return True
+        exit_code = error.args[1] if len(error.args) == 2 else None
+        if exit_code in self.retryable_exit_codes:
+            return True
+        message = str(error.args[0]) if error.args else ""
+        return any(
+            re.search(pattern, message, re.IGNORECASE)
+            for pattern in self.retryable_stderr_patterns
+        )
+
+    def get_delay_seconds(self, attempt: int) -> float:
+        """
+        Get the delay before the given attempt (2 = the first retry).
+        """
+        delay = min(
+            self.max_delay_seconds,
+            self.initial_delay_seconds * self.backoff_multiplier ** (attempt - 2),
+        )
+        return delay * (1 - self.jitter_ratio * random.random())
+
+
+@dataclass
+class RetryStats:
+    """
+    Counts of retries, per operation description - see get_retry_stats().
+    """
+
+    retries: int = 0
+    recovered: int = 0  # succeeded after at least one retry
+    gave_up: int = 0  # failed after at least one retry, or ran out of time
+    total_delay_seconds: float = 0.0
+
+
+_retry_stats: dict[str, RetryStats] = {}
+_retry_stats_lock = threading.Lock()
+
+
+def get_retry_stats() -> dict[str, RetryStats]:
+    """
+    Get a copy of the retry counts of operations run via retry_call(), per operation description - for example 'git fetch'.
+    """
+    with _retry_stats_lock:
+        return {
+            description: RetryStats(**asdict(stats))
+            for description, stats in _retry_stats.items()
+        }
+
+
+def reset_retry_stats() -> None:
+    with _retry_stats_lock:
+        _retry_stats.clear()
+
+
+def _update_retry_stats(
+    description: str, update: typing.Callable[[RetryStats], None]
+) -> None:
+    with _retry_stats_lock:
+        update(_retry_stats.setdefault(description, RetryStats()))
+
+
+T = typing.TypeVar("T")
+
+
+def retry_call(
+    operation: typing.Callable[[], T],
+    policy: RetryPolicy,
+    description: str,
+) -> T:
+    """
+    Call the operation, retrying with backoff according to the policy while it fails with a retryable error.
+
+    - each retry is logged as a warning, and counted in get_retry_stats().
+
+    Example:
+    ```
+    policy = util_proc.RetryPolicy(max_attempts=5, retryable_stderr_patterns=["Connection reset"])
+    output = util_proc.retry_call(lambda: util_proc.run_process_and_get_output(program, args, cwd), policy, "my-tool sync")
+    ```
+
+    Args:
+    operation (Callable): The operation to call, with no arguments.
+    policy (RetryPolicy): When and how often to retry.
+    description (str): A short description of the operation, for logging and stats - for example 'git fetch'.
+
+    Returns:
+    The result of the operation.
+
+    Raises:
+    The error of the last attempt, if every attempt failed (or the error was not retryable).
+    """
+    if policy.max_attempts < 1:
+        raise ValueError(
+            f"max_attempts must be at least 1 - but was {policy.max_attempts}"
+        )
+    start = util_time.start_timer()
+    attempt = 1
+    while True:
+        try:
+            result = operation()
+        except Exception as e:
+            if attempt >= policy.max_attempts or not policy.is_retryable(e):
+                if attempt > 1:
+                    _update_retry_stats(description, _increment_gave_up)
+                raise
+            delay_seconds = policy.get_delay_seconds(attempt + 1)
+            if (
+                policy.max_elapsed_seconds is not None
+                and util_time.end_timer(start) + delay_seconds
+                > policy.max_elapsed_seconds
+            ):
+                logger.warning(
+                    f"Not retrying {description} - would exceed the maximum of {policy.max_elapsed_seconds}s [attempt {attempt} of {policy.max_attempts}] after error: {e}"
+                )
+                _update_retry_stats(description, _increment_gave_up)
+                raise
+            logger.warning(
+                f"Retrying {description} in {delay_seconds:.1f}s [attempt {attempt + 1} of {policy.max_attempts}] after error: {e}"
+            )
+            _update_retry_stats(
+                description, lambda stats: _add_retry(stats, delay_seconds)
+            )
+            time.sleep(delay_seconds)
+            attempt += 1
+            continue
+        if attempt > 1:
+            logger.info(f"{description} succeeded after {attempt} attempts")
+            _update_retry_stats(description, _increment_recovered)
+        return result
+
+
+def _add_retry(stats: RetryStats, delay_seconds: float) -> None:
+    stats.retries += 1
+    stats.total_delay_seconds += delay_seconds
+
+
+def _increment_recovered(stats: RetryStats) -> None:
+    stats.recovered += 1
+
+
+def _increment_gave_up(stats: RetryStats) -> None:
+    stats.gave_up += 1
 
 
 def open_windows_explorer_at(path_to_dir: str) -> None:
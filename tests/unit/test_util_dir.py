@@ -0,0 +1,266 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from cornsnake import util_dir, util_file
+
+
+class TestUtilDir(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = self.temp_dir.name
+        for relative_path in [
+            "a.py",
+            "b.txt",
+            ".hidden.py",
+            "sub/c.py",
+            "sub/deeper/d.py",
+            "node_modules/e.py",
+        ]:
+            path = os.path.join(self.root, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            util_file.write_text_to_file("x", path)
+
+    def _relative(self, paths):
+        return sorted(os.path.relpath(p, self.root).replace(os.sep, "/") for p in paths)
+
+    def test_find_files_recursively(self):
+        # Act
+        actual = util_dir.find_files_recursively(self.root, ".py")
+
+        # Assert
+        self.assertEqual(
+            ["a.py", "node_modules/e.py", "sub/c.py", "sub/deeper/d.py"],
+            self._relative(actual),
+        )
+
+    def test_iterate_files_recursively_with_options(self):
+        # Act
+        serial = util_dir.iterate_files_recursively(
+            self.root,
+            max_depth=1,
+            excluded_dir_names=util_dir.COMMON_EXCLUDED_DIR_NAMES,
+            max_workers=1,
+        )
+        parallel = util_dir.iterate_files_recursively(
+            self.root,
+            max_depth=1,
+            excluded_dir_names=util_dir.COMMON_EXCLUDED_DIR_NAMES,
+        )
+
+        # Assert
+        expected = ["a.py", "b.txt", "sub/c.py"]
+        self.assertEqual(expected, self._relative(serial))
+        self.assertEqual(expected, self._relative(parallel))
+
+    @unittest.skipIf(os.name == "nt", "creating symlinks needs extra rights on Windows")
+    def test_iterate_files_recursively_follows_symlinks_without_cycles(self):
+        # Arrange
+        os.symlink(self.root, os.path.join(self.root, "sub", "loop"))
+
+        # Act
+        actual = list(
+            util_dir.iterate_files_recursively(self.root, ".py", follow_symlinks=True)
+        )
+
+        # Assert
+        self.assertEqual(4, len(actual))
+
+    def test_get_dir_size(self):
+        # Arrange
+        util_file.write_text_to_file(
+            "y" * 5000, os.path.join(self.root, "sub", "big.txt")
+        )
+
+        # Act
+        report = util_dir.get_dir_size(self.root)
+        serial = util_dir.get_dir_size(self.root, max_workers=1)
+
+        # Assert
+        self.assertEqual(7, report.total.file_count)
+        self.assertEqual(6 + 5000, report.total.apparent_bytes)
+        self.assertEqual(report.total, serial.total)
+        self.assertEqual(6 + 5000, util_dir.get_total_dir_size_in_bytes(self.root))
+        sub = report.subdirs[os.path.join(self.root, "sub")]
+        self.assertEqual((3, 5002), (sub.file_count, sub.apparent_bytes))
+        self.assertEqual(
+            {os.path.join(self.root, "sub"), os.path.join(self.root, "node_modules")},
+            set(report.subdirs.keys()),
+        )
+        if os.name == "posix":
+            self.assertGreaterEqual(report.total.allocated_bytes, 5000)
+
+    def test_copy_directory(self):
+        # Arrange
+        util_file.write_text_to_file("y" * 100000, os.path.join(self.root, "big.bin"))
+
+        with tempfile.TemporaryDirectory() as other_dir:
+            to_path = os.path.join(other_dir, "target")
+
+            # Act
+            report = util_dir.copy_directory(self.root, to_path, max_workers=4)
+
+            # Assert
+            self.assertEqual(7, report.file_count)
+            self.assertEqual(100000 + 6, report.total_bytes)
+            self.assertEqual(7, sum(report.methods.values()))
+            self.assertEqual(
+                util_file.read_text_from_file(os.path.join(self.root, "big.bin")),
+                util_file.read_text_from_file(os.path.join(to_path, "big.bin")),
+            )
+            self.assertEqual(
+                os.path.getmtime(os.path.join(self.root, "sub", "deeper", "d.py")),
+                os.path.getmtime(os.path.join(to_path, "sub", "deeper", "d.py")),
+            )
+            with self.assertRaises(FileExistsError):
+                util_dir.copy_directory(self.root, to_path)
+
+    @unittest.skipIf(os.name == "nt", "named pipes are not files on Windows")
+    def test_copy_directory_reports_named_pipes(self):
+        # Arrange
+        os.mkfifo(os.path.join(self.root, "sub", "pipe"))
+
+        with tempfile.TemporaryDirectory() as other_dir:
+            to_path = os.path.join(other_dir, "target")
+
+            # Act
+            with self.assertRaises(shutil.Error) as context:
+                util_dir.copy_directory(self.root, to_path)
+            with self.assertRaises(shutil.Error) as sync_context:
+                util_dir.sync_directory(self.root, os.path.join(other_dir, "synced"))
+
+            # Assert
+            for errors in [context.exception.args[0], sync_context.exception.args[0]]:
+                self.assertEqual(1, len(errors))
+                self.assertIn("is a named pipe", errors[0][2])
+            self.assertTrue(os.path.isfile(os.path.join(to_path, "sub", "c.py")))
+            self.assertFalse(os.path.exists(os.path.join(to_path, "sub", "pipe")))
+
+    def test_file_copier_falls_back_to_sendfile(self):
+        # Arrange
+        copier = util_dir._FileCopier()
+        copier._is_reflink_possible = False
+        copier._is_copy_file_range_possible = False
+        from_file = os.path.join(self.root, "big.bin")
+        util_file.write_text_to_file("y" * 100000, from_file)
+        to_file = os.path.join(self.root, "copy.bin")
+
+        # Act
+        copier.copy(from_file, to_file)
+
+        # Assert
+        expected_method = "sendfile" if copier._is_sendfile_possible else "copyfile"
+        self.assertEqual({expected_method: 1}, copier.methods)
+        self.assertEqual(
+            util_file.read_text_from_file(from_file),
+            util_file.read_text_from_file(to_file),
+        )
+
+    def test_sync_directory_copies_only_changes(self):
+        with tempfile.TemporaryDirectory() as other_dir:
+            # Arrange
+            to_path = os.path.join(other_dir, "target")
+            first = util_dir.sync_directory(self.root, to_path)
+            util_file.write_text_to_file("changed", os.path.join(self.root, "a.py"))
+            util_file.write_text_to_file(
+                "new", os.path.join(self.root, "sub", "new.py")
+            )
+            util_dir.delete_dirs([os.path.join(self.root, "node_modules")])
+            util_file.write_text_to_file("extra", os.path.join(to_path, "extra.txt"))
+
+            # Act
+            second = util_dir.sync_directory(self.root, to_path)
+            third = util_dir.sync_directory(
+                self.root, to_path, is_content_compared=True
+            )
+
+            # Assert
+            self.assertEqual(6, len(first.copied_new))
+            self.assertEqual([os.path.join("sub", "new.py")], second.copied_new)
+            self.assertEqual(["a.py"], second.copied_changed)
+            self.assertEqual(
+                ["extra.txt", "node_modules", os.path.join("node_modules", "e.py")],
+                sorted(second.deleted),
+            )
+            self.assertEqual(4, second.unchanged_count)
+            self.assertEqual(
+                (0, 0, 6),
+                (
+                    len(third.copied_new),
+                    len(third.copied_changed),
+                    third.unchanged_count,
+                ),
+            )
+            self.assertEqual(
+                sorted(util_dir.find_files_recursively(self.root, "")),
+                sorted(
+                    p.replace(to_path, self.root)
+                    for p in util_dir.find_files_recursively(to_path, "")
+                ),
+            )
+
+    @unittest.skipIf(os.name == "nt", "creating symlinks needs extra rights on Windows")
+    def test_sync_directory_does_not_follow_symlinks(self):
+        with tempfile.TemporaryDirectory() as other_dir:
+            # Arrange
+            outside_file = os.path.join(other_dir, "outside", "p.txt")
+            os.makedirs(os.path.dirname(outside_file))
+            util_file.write_text_to_file("keep", outside_file)
+            to_path = os.path.join(other_dir, "target")
+            os.makedirs(to_path)
+            os.symlink(os.path.dirname(outside_file), os.path.join(to_path, "extra"))
+            os.symlink("missing.txt", os.path.join(self.root, "dangling"))
+
+            # Act
+            report = util_dir.sync_directory(self.root, to_path)
+            again = util_dir.sync_directory(self.root, to_path)
+
+            # Assert
+            self.assertEqual("keep", util_file.read_text_from_file(outside_file))
+            self.assertEqual(["extra"], report.deleted)
+            self.assertFalse(os.path.lexists(os.path.join(to_path, "extra")))
+            self.assertIn("dangling", report.copied_new)
+            self.assertEqual(
+                "missing.txt", os.readlink(os.path.join(to_path, "dangling"))
+            )
+            self.assertEqual(
+                ([], [], []), (again.copied_new, again.copied_changed, again.deleted)
+            )
+
+    def test_is_empty_tree(self):
+        # Arrange
+        empty_root = os.path.join(self.root, "empty")
+        deep_dir = empty_root
+        os.mkdir(deep_dir)
+        # deeper than the recursion limit - create one level at a time, since os.makedirs is recursive
+        for _ in range(1200):
+            deep_dir = os.path.join(deep_dir, "d")
+            os.mkdir(deep_dir)
+        # shutil.rmtree is recursive, so remove the deep tree from the leaf up
+        self.addCleanup(os.removedirs, deep_dir)
+        with_empty_file = os.path.join(self.root, "with_empty_file")
+        os.makedirs(os.path.join(with_empty_file, "x"))
+        util_file.write_text_to_file("", os.path.join(with_empty_file, "x", "a.txt"))
+        util_file.write_text_to_file("", os.path.join(with_empty_file, "b.txt"))
+
+        # Act
+        actual = util_dir.are_empty_trees([empty_root, with_empty_file, self.root])
+
+        # Assert
+        self.assertEqual(
+            {empty_root: True, with_empty_file: False, self.root: False}, actual
+        )
+        self.assertTrue(util_dir.is_empty_directory_only_subdirectories(empty_root))
+        self.assertTrue(
+            util_file.is_empty_directory_only_subdirectories(with_empty_file)
+        )
+        util_file.write_text_to_file("x", os.path.join(with_empty_file, "x", "c.txt"))
+        self.assertFalse(
+            util_file.is_empty_directory_only_subdirectories(with_empty_file)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from cornsnake import util_dir_index, util_file
+
+
+class TestUtilDirIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "root")
+        for relative_path, text in [
+            ("a.json", "12345"),
+            ("b.txt", "1"),
+            ("sub/c.json", "123"),
+            ("sub/deeper/d.json", "12"),
+        ]:
+            path = os.path.join(self.root, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            util_file.write_text_to_file(text, path)
+        self._make_old(self.root)
+        self.index = util_dir_index.DirIndex(
+            self.root, os.path.join(self.temp_dir.name, "index.sqlite")
+        )
+
+    def tearDown(self):
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def _make_old(self, root):
+        # So that the directories are not 'racily' modified, and can be skipped on refresh
+        old = time.time() - 60
+        for dir_path, _dir_names, _file_names in os.walk(root):
+            os.utime(dir_path, (old, old))
+
+    def test_refresh_and_query(self):
+        # Act
+        report = self.index.refresh()
+
+        # Assert
+        self.assertEqual(3, report.dirs_scanned)
+        self.assertEqual(11, self.index.get_total_size_in_bytes())
+        self.assertEqual(
+            5, self.index.get_total_size_in_bytes(os.path.join(self.root, "sub"))
+        )
+        self.assertEqual(4, self.index.get_file_count())
+        self.assertEqual(
+            [os.path.join(self.root, "a.json")],
+            self.index.find_files_by_extension(self.root, ".json"),
+        )
+        self.assertEqual(3, len(self.index.find_files_recursively(".json")))
+
+    def test_refresh_only_rescans_changed_dirs(self):
+        # Arrange
+        self.index.refresh()
+        util_file.write_text_to_file(
+            "1234567", os.path.join(self.root, "sub", "e.json")
+        )
+        util_file.delete_file(os.path.join(self.root, "sub", "deeper", "d.json"))
+        os.rmdir(os.path.join(self.root, "sub", "deeper"))
+        self._make_old(os.path.join(self.root, "sub"))
+
+        # Act
+        report = self.index.refresh()
+        report_unchanged = self.index.refresh()
+
+        # Assert
+        self.assertEqual((1, 1), (report.dirs_scanned, report.dirs_unchanged))
+        self.assertEqual(
+            (0, 2), (report_unchanged.dirs_scanned, report_unchanged.dirs_unchanged)
+        )
+        self.assertEqual(16, self.index.get_total_size_in_bytes())
+        self.assertEqual(4, self.index.get_file_count())
+
+    def test_refresh_keeps_rows_of_a_dir_that_cannot_be_listed(self):
+        # Arrange
+        self.index.refresh()
+        sub_dir = os.path.join(self.root, "sub")
+        util_file.write_text_to_file("1234567", os.path.join(sub_dir, "e.json"))
+        self._make_old(sub_dir)
+        original_scandir = os.scandir
+
+        def _failing_scandir(path):
+            if path == sub_dir:
+                raise PermissionError(13, "Permission denied", path)
+            return original_scandir(path)
+
+        # Act
+        with mock.patch("os.scandir", side_effect=_failing_scandir):
+            failed_report = self.index.refresh()
+        size_after_failure = self.index.get_total_size_in_bytes()
+        report = self.index.refresh()
+
+        # Assert
+        self.assertEqual(1, failed_report.dirs_failed)
+        self.assertEqual(11, size_after_failure)
+        self.assertEqual((1, 0), (report.dirs_scanned, report.dirs_failed))
+        self.assertEqual(18, self.index.get_total_size_in_bytes())
+        self.assertEqual(5, self.index.get_file_count())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 from parameterized import parameterized
+import concurrent.futures
+import os
+import tempfile
 import unittest
 
-from cornsnake import util_file
+from cornsnake import util_dir, util_file
 
 
 class TestUtilFile(unittest.TestCase):
@@ -46,6 +49,62 @@ class TestUtilFile(unittest.TestCase):
         # Assert
         self.assertEqual(expected, actual)
 
+    def test_backup_file_by_copying_allocates_next_suffix(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Arrange
+            source = os.path.join(temp_dir, "source.txt")
+            util_file.write_text_to_file("x", source)
+            backup_dir = os.path.join(temp_dir, "backups")
+            os.mkdir(backup_dir)
+            util_file.write_text_to_file("old", os.path.join(backup_dir, "b-07.txt"))
+
+            # Act
+            backups = [
+                util_file.backup_file_by_copying(source, backup_dir, "b.txt")
+                for _ in range(3)
+            ]
+
+            # Assert
+            self.assertEqual(
+                ["b.txt", "b-08.txt", "b-09.txt"],
+                [os.path.basename(b) for b in backups],
+            )
+            self.assertEqual("x", util_file.read_text_from_file(backups[-1]))
+
+    def test_get_unique_filepath_without_claiming_is_repeatable(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Arrange
+            path = os.path.join(temp_dir, "x.txt")
+            util_file.write_text_to_file("x", path)
+            util_file.write_text_to_file("x", os.path.join(temp_dir, "x-03.txt"))
+
+            # Act
+            paths = [util_file.get_unique_filepath(path) for _ in range(3)]
+
+            # Assert
+            self.assertEqual([os.path.join(temp_dir, "x-04.txt")] * 3, paths)
+            self.assertFalse(os.path.exists(paths[0]))
+
+    def test_get_unique_path_claims_under_concurrency(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Arrange
+            path = os.path.join(temp_dir, "run")
+
+            # Act
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                paths = list(
+                    executor.map(
+                        lambda _: util_dir.get_unique_dirpath(path, is_claimed=True),
+                        range(40),
+                    )
+                )
+
+            # Assert
+            self.assertEqual(40, len(set(paths)))
+            self.assertTrue(all(os.path.isdir(p) for p in paths))
+            self.assertIn(path, paths)
+            self.assertIn(path + "-40", paths)
+
 
 if __name__ == "__main__":
     unittest.main()
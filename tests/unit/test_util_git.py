@@ -0,0 +1,524 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from cornsnake import config, util_date, util_file, util_git, util_proc
+
+
+class TestUtilGit(unittest.TestCase):
+    def setUp(self):
+        self.original_path_to_git = config.PATH_TO_GIT
+        config.PATH_TO_GIT = shutil.which("git") or "git"
+        self.repo_dir = tempfile.mkdtemp()
+        util_git.execute_command("init", ["-b", "main"], self.repo_dir)
+        util_git.execute_command("config", ["user.name", "Test User"], self.repo_dir)
+        util_git.execute_command(
+            "config", ["user.email", "test@example.com"], self.repo_dir
+        )
+        self._commit_file("a.txt", "hello")
+
+    def tearDown(self):
+        config.PATH_TO_GIT = self.original_path_to_git
+        shutil.rmtree(self.repo_dir, ignore_errors=True)
+
+    def _commit_file(self, filename, text):
+        util_file.write_text_to_file(text, os.path.join(self.repo_dir, filename))
+        util_git.execute_command("add", [filename], self.repo_dir)
+        util_git.execute_command("commit", ["-m", f"add {filename}"], self.repo_dir)
+
+    def test_session_matches_git_cli(self):
+        # Arrange
+        util_git.execute_command("tag", ["v1"], self.repo_dir)
+        util_git.execute_command("tag", ["v0"], self.repo_dir)
+
+        with util_git.GitSession(self.repo_dir) as session:
+            # Act, Assert
+            self.assertEqual(
+                util_git.get_last_commit_id(self.repo_dir),
+                util_git.get_last_commit_id(self.repo_dir, session=session),
+            )
+            self.assertEqual(
+                util_git.get_current_branch(self.repo_dir),
+                util_git.get_current_branch(self.repo_dir, session=session),
+            )
+            self.assertEqual(
+                util_git.get_all_tags(self.repo_dir),
+                util_git.get_all_tags(self.repo_dir, session=session),
+            )
+            self.assertEqual(
+                "Test User",
+                util_git.get_config("User.Name", self.repo_dir, session=session),
+            )
+            self.assertEqual(
+                "", util_git.get_config("core.editor", self.repo_dir, session=session)
+            )
+
+    def test_session_reads_objects(self):
+        # Arrange
+        with util_git.GitSession(self.repo_dir) as session:
+            # Act
+            content = session.read_object("HEAD:a.txt")
+            info = session.get_object_info("HEAD")
+            missing = session.read_object("HEAD:no-such-file.txt")
+            missing_with_spaces = session.read_object("HEAD:no such file.txt")
+            missing_info_with_spaces = session.get_object_info("HEAD:no such file.txt")
+            content_after_missing = session.read_object("HEAD:a.txt")
+
+        # Assert
+        self.assertEqual(b"hello", content)
+        self.assertIsNotNone(info)
+        self.assertEqual("commit", info[1])
+        self.assertIsNone(missing)
+        self.assertIsNone(missing_with_spaces)
+        self.assertIsNone(missing_info_with_spaces)
+        self.assertEqual(b"hello", content_after_missing)
+
+    def test_session_refresh_sees_new_commits(self):
+        # Arrange
+        with util_git.GitSession(self.repo_dir) as session:
+            first_commit = session.get_last_commit_id()
+            self._commit_file("b.txt", "world")
+
+            # Act
+            session.refresh()
+            second_commit = session.get_last_commit_id()
+
+        # Assert
+        self.assertNotEqual(first_commit, second_commit)
+        self.assertEqual(util_git.get_last_commit_id(self.repo_dir), second_commit)
+
+    def test_get_commits_after_date_without_checkout_matches_checkout(self):
+        # Arrange
+        util_git.execute_command("checkout", ["-b", "feature"], self.repo_dir)
+        self._commit_file("b.txt", "world")
+        util_git.checkout_branch("main", self.repo_dir)
+        branches = ["main", "feature"]
+        start_date = util_date.get_now_for_system_timezone().strftime("%Y-%m-%d")
+
+        # Act
+        actual = util_git.get_commits_after_date(
+            self.repo_dir, branches, start_date, checkout_branches=False
+        )
+
+        # Assert
+        self.assertEqual("main", util_git.get_current_branch(self.repo_dir))
+        expected = util_git.get_commits_after_date(self.repo_dir, branches, start_date)
+        self.assertEqual(expected, actual)
+        self.assertEqual(3, len(actual))
+
+    def test_run_operation_in_repos_reports_per_repo(self):
+        # Arrange
+        util_file.write_text_to_file("changed", os.path.join(self.repo_dir, "a.txt"))
+        not_a_dir = os.path.join(self.repo_dir, "no-such-dir")
+
+        # Act
+        report = util_git.run_operation_in_repos(
+            [self.repo_dir, not_a_dir], util_git.check_has_no_changes, max_workers=2
+        )
+
+        # Assert
+        self.assertEqual(
+            [self.repo_dir, not_a_dir], [r.repo_dir for r in report.results]
+        )
+        self.assertEqual([], report.get_succeeded())
+        self.assertIsInstance(report.results[0].error, RuntimeError)
+
+    def test_run_operation_in_repos_times_out(self):
+        # Arrange
+        def _operation(repo_dir):
+            if repo_dir == "slow":
+                time.sleep(2)
+            return repo_dir.upper()
+
+        # Act
+        report = util_git.run_operation_in_repos(
+            ["slow", "fast"], _operation, max_workers=2, timeout_seconds=0.2
+        )
+
+        # Assert
+        self.assertTrue(report.results[0].is_timed_out)
+        self.assertEqual("FAST", report.results[1].result)
+        self.assertLess(report.elapsed_seconds, 1.5)
+
+    def test_run_operation_in_repos_kills_hung_processes(self):
+        # Arrange
+        def _operation(repo_dir):
+            if repo_dir.startswith("hung"):
+                util_proc.run_process_and_get_output(
+                    sys.executable, ["-c", "import time; time.sleep(30)"], self.repo_dir
+                )
+            return repo_dir.upper()
+
+        # Act
+        report = util_git.run_operation_in_repos(
+            ["hung-1", "hung-2", "queued"],
+            _operation,
+            max_workers=2,
+            timeout_seconds=0.5,
+        )
+
+        # Assert
+        self.assertTrue(report.results[0].is_timed_out)
+        self.assertTrue(report.results[1].is_timed_out)
+        self.assertEqual("QUEUED", report.results[2].result)
+        self.assertLess(report.elapsed_seconds, 5)
+
+    @unittest.skipIf(os.name == "nt", "the test hook is a shell script")
+    def test_delete_all_tags_reports_each_rejected_ref(self):
+        # Arrange
+        remote_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, remote_dir, True)
+        util_git.execute_command("init", ["--bare"], remote_dir)
+        util_git.execute_command("remote", ["add", "origin", remote_dir], self.repo_dir)
+        for tag in ["t1", "t2", "t3"]:
+            util_git.execute_command("tag", [tag], self.repo_dir)
+        util_git.execute_command("push", ["origin", "--tags"], self.repo_dir)
+        path_to_hook = os.path.join(remote_dir, "hooks", "update")
+        util_file.write_text_to_file(
+            "#!/bin/sh\ncase $1 in */t2) exit 1;; esac\n", path_to_hook
+        )
+        os.chmod(path_to_hook, 0o755)
+
+        # Act
+        report = util_git.delete_all_tags(
+            self.repo_dir, retry_policy=None, raise_if_failed=False
+        )
+
+        # Assert
+        self.assertEqual(["t1", "t3"], sorted(report.succeeded_items))
+        self.assertEqual(["t2"], list(report.failed_items.keys()))
+        self.assertIn("hook declined", report.failed_items["t2"])
+
+    def test_get_branches_with_commits_in_origin_not_local_missing_branch(self):
+        # Arrange
+        remote_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, remote_dir, True)
+        util_git.execute_command("init", ["--bare"], remote_dir)
+        util_git.execute_command("remote", ["add", "origin", remote_dir], self.repo_dir)
+        util_git.execute_command("branch", ["only-on-origin"], self.repo_dir)
+        util_git.execute_command(
+            "push", ["origin", "main", "only-on-origin"], self.repo_dir
+        )
+        util_git.execute_command("branch", ["-D", "only-on-origin"], self.repo_dir)
+
+        for checkout_branches in [True, False]:
+            # Act
+            actual = util_git.get_branches_with_commits_in_origin_not_local(
+                self.repo_dir,
+                ["main", "only-on-origin"],
+                checkout_branches=checkout_branches,
+            )
+
+            # Assert
+            self.assertEqual([], actual)
+            with self.assertRaises(RuntimeError):
+                util_git.get_branches_with_commits_in_origin_not_local(
+                    self.repo_dir, ["no-such-branch"], checkout_branches
+                )
+
+    def test_execute_command_in_chunks_reports_per_item(self):
+        # Arrange
+        tags = [f"t{i}" for i in range(5)]
+        for tag in tags:
+            util_git.execute_command("tag", [tag], self.repo_dir)
+
+        # Act
+        report = util_git.execute_command_in_chunks(
+            "tag",
+            ["-d"],
+            tags + ["no-such-tag"],
+            self.repo_dir,
+            chunk_size=1,
+            max_attempts=2,
+            raise_if_failed=False,
+        )
+
+        # Assert
+        self.assertEqual(sorted(tags), sorted(report.succeeded_items))
+        self.assertEqual(["no-such-tag"], list(report.failed_items.keys()))
+        self.assertEqual([], util_git.get_all_tags(self.repo_dir))
+
+    def test_execute_command_in_chunks_stops_at_first_failed_chunk(self):
+        # Arrange
+        tags = ["t1", "t2", "t3"]
+        for tag in tags:
+            util_git.execute_command("tag", [tag], self.repo_dir)
+
+        # Act, Assert
+        with self.assertRaises(RuntimeError):
+            util_git.execute_command_in_chunks(
+                "tag", ["-d"], ["no-such-tag"] + tags, self.repo_dir, chunk_size=1
+            )
+        self.assertEqual(tags, sorted(util_git.get_all_tags(self.repo_dir)))
+
+    def test_execute_command_in_chunks_adaptive_raises(self):
+        # Arrange
+        util_git.execute_command("tag", ["t1"], self.repo_dir)
+
+        # Act, Assert
+        with self.assertRaises(RuntimeError):
+            util_git.execute_command_in_chunks(
+                "tag", ["-d"], ["t1", "no-such-tag"], self.repo_dir, chunk_size=None
+            )
+
+    def test_iterate_commits(self):
+        # Arrange
+        self._commit_file("b.txt", "world")
+
+        # Act
+        commits = list(util_git.iterate_commits(self.repo_dir))
+
+        # Assert
+        self.assertEqual(2, len(commits))
+        commit_id, date, subject = commits[0]
+        self.assertEqual(util_git.get_last_commit_id(self.repo_dir), commit_id)
+        self.assertTrue(util_date.is_valid_date_yyyy_mm_dd(date))
+        self.assertEqual("add b.txt", subject)
+        self.assertEqual("add a.txt", commits[1][2])
+
+    def test_read_refs_directly_matches_git_cli(self):
+        # Arrange
+        util_git.execute_command("tag", ["packed-tag"], self.repo_dir)
+        util_git.execute_command("branch", ["feature/x"], self.repo_dir)
+        util_git.execute_command("pack-refs", ["--all"], self.repo_dir)
+        util_git.execute_command("tag", ["loose-tag"], self.repo_dir)
+        clone_dir = os.path.join(
+            self.repo_dir, "..", os.path.basename(self.repo_dir) + "-clone"
+        )
+        util_git.execute_command("clone", [self.repo_dir, clone_dir], self.repo_dir)
+
+        for repo_dir in [self.repo_dir, clone_dir]:
+            # Act, Assert
+            self.assertEqual(
+                util_git.get_all_tags(repo_dir),
+                util_git.get_all_tags(repo_dir, read_refs_directly=True),
+            )
+            self.assertEqual(
+                util_git.get_all_origin_branches(repo_dir),
+                util_git.get_all_origin_branches(repo_dir, read_refs_directly=True),
+            )
+            self.assertEqual(
+                util_git.get_current_branch(repo_dir),
+                util_git.get_current_branch(repo_dir, read_refs_directly=True),
+            )
+        self.assertEqual(
+            ["feature/x", "main"],
+            util_git.get_all_origin_branches(clone_dir, read_refs_directly=True),
+        )
+        shutil.rmtree(clone_dir, ignore_errors=True)
+
+    def test_get_refs_from_files_sees_changes(self):
+        # Arrange
+        refs_before = util_git.get_refs_from_files(self.repo_dir)
+
+        # Act
+        util_git.execute_command("tag", ["new-tag"], self.repo_dir)
+        refs_after = util_git.get_refs_from_files(self.repo_dir)
+
+        # Assert
+        self.assertNotIn("refs/tags/new-tag", refs_before)
+        self.assertIn("refs/tags/new-tag", refs_after)
+        self.assertIsNone(
+            util_git.get_refs_from_files(os.path.join(self.repo_dir, "no-such-dir"))
+        )
+
+    def test_read_config_directly_matches_git_cli(self):
+        # Arrange
+        path_to_global = os.path.join(
+            self.repo_dir, "..", os.path.basename(self.repo_dir) + ".gitconfig"
+        )
+        path_to_included = os.path.join(self.repo_dir, "included.gitconfig")
+        util_file.write_text_to_file(
+            '[core]\n\teditor = "/usr/bin/my editor" --wait\n[alias]\n\tst = status # comment\n',
+            path_to_global,
+        )
+        util_file.write_text_to_file(
+            '[Remote "Origin"]\n\tURL = https://example.com/x.git\n[core]\n\tautocrlf\n',
+            path_to_included,
+        )
+        util_git.execute_command(
+            "config", ["include.path", "../included.gitconfig"], self.repo_dir
+        )
+        util_git.execute_command(
+            "config", ["i18n.filesEncoding", "  a\tb  "], self.repo_dir
+        )
+        keys = [
+            "core.editor",
+            "alias.st",
+            "remote.Origin.url",
+            "core.autocrlf",
+            "i18n.filesencoding",
+            "user.name",
+            "no.such.key",
+        ]
+
+        with mock.patch.dict(
+            os.environ,
+            {"GIT_CONFIG_NOSYSTEM": "1", "GIT_CONFIG_GLOBAL": path_to_global},
+        ):
+            # Act
+            actual = util_git.get_config_values(
+                keys, self.repo_dir, read_config_directly=True
+            )
+
+            # Assert
+            self.assertIsNotNone(util_git.get_config_from_files(self.repo_dir))
+            expected = util_git.get_config_values(keys, self.repo_dir)
+            self.assertEqual(expected, actual)
+            self.assertEqual("/usr/bin/my editor --wait", actual["core.editor"])
+            self.assertEqual(
+                "https://example.com/x.git",
+                util_git.get_config(
+                    "remote.Origin.URL", self.repo_dir, read_config_directly=True
+                ),
+            )
+        os.remove(path_to_global)
+
+    def test_read_config_directly_with_worktree_config(self):
+        # Arrange
+        util_git.execute_command("config", ["x.setting", "local"], self.repo_dir)
+        util_git.execute_command(
+            "config", ["extensions.worktreeConfig", "true"], self.repo_dir
+        )
+        util_git.execute_command(
+            "config", ["--worktree", "x.setting", "worktree"], self.repo_dir
+        )
+
+        # Act
+        actual_direct = util_git.get_config(
+            "x.setting", self.repo_dir, read_config_directly=True
+        )
+        actual_via_git = util_git.get_config("x.setting", self.repo_dir)
+
+        # Assert
+        self.assertEqual("worktree", actual_direct)
+        self.assertEqual("worktree", actual_via_git)
+
+    def test_parse_config_value_keeps_inner_whitespace(self):
+        # Act
+        actual = util_git._parse_config_value(' a\t\tb  "c " # comment', "config")
+
+        # Assert
+        self.assertEqual("a\t\tb  c ", actual)
+
+    def test_get_git_ignored_statuses(self):
+        # Arrange
+        util_file.write_text_to_file(
+            "*.log\n!keep.log\nbuild/\n/root-only.txt\ndocs/**/*.tmp\n[ab].bin\n",
+            os.path.join(self.repo_dir, ".gitignore"),
+        )
+        os.makedirs(os.path.join(self.repo_dir, "sub", "build"))
+        os.makedirs(os.path.join(self.repo_dir, "docs", "x", "y"))
+        util_file.write_text_to_file(
+            "*.txt\n", os.path.join(self.repo_dir, "sub", ".gitignore")
+        )
+        filenames = [
+            "a.txt",
+            "x.log",
+            "keep.log",
+            "sub/y.log",
+            "sub/notes.txt",
+            "sub/build/out.o",
+            "root-only.txt",
+            "sub/root-only.md",
+            "docs/x/y/z.tmp",
+            "docs/z.tmp",
+            "a.bin",
+            "c.bin",
+        ]
+        expected = {
+            filename: util_git.is_git_ignored(self.repo_dir, filename)
+            for filename in filenames
+        }
+
+        # Act
+        actual_via_git = util_git.get_git_ignored_statuses(self.repo_dir, filenames)
+        actual_direct = util_git.get_git_ignored_statuses(
+            self.repo_dir, filenames, read_gitignore_directly=True
+        )
+
+        # Assert
+        self.assertEqual(expected, actual_via_git)
+        self.assertEqual(expected, actual_direct)
+        self.assertTrue(actual_via_git["sub/build/out.o"])
+        self.assertFalse(actual_via_git["keep.log"])
+
+    def test_prepare_local_full_clone_with_options(self):
+        # Arrange
+        os.makedirs(os.path.join(self.repo_dir, "docs"))
+        self._commit_file("docs/b.txt", "world")
+        os.makedirs(os.path.join(self.repo_dir, "other"))
+        self._commit_file("other/c.txt", "other")
+        target_dir = tempfile.mkdtemp()
+        options = util_git.CloneOptions(
+            depth=1, filter_spec="blob:none", sparse_paths=["docs"]
+        )
+
+        # Act
+        path_to_clone = util_git.prepare_local_full_clone(
+            self.repo_dir, target_dir, options
+        )
+
+        # Assert
+        self.assertEqual(
+            "1",
+            util_git.execute_command(
+                "rev-list", ["--count", "HEAD"], path_to_clone
+            ).strip(),
+        )
+        self.assertEqual(
+            "blob:none",
+            util_git.get_config(
+                "remote.origin.partialclonefilter", path_to_clone
+            ).strip(),
+        )
+        self.assertTrue(os.path.exists(os.path.join(path_to_clone, "docs", "b.txt")))
+        self.assertFalse(os.path.exists(os.path.join(path_to_clone, "other")))
+        shutil.rmtree(target_dir, ignore_errors=True)
+
+    def test_prepare_local_mirror_clone_with_reference(self):
+        # Arrange
+        target_dir = tempfile.mkdtemp()
+        options = util_git.CloneOptions(reference_repo_dir=self.repo_dir)
+
+        # Act
+        path_to_clone = util_git.prepare_local_mirror_clone(
+            self.repo_dir, target_dir, options
+        )
+
+        # Assert
+        path_to_alternates = os.path.join(
+            path_to_clone, "objects", "info", "alternates"
+        )
+        self.assertTrue(os.path.exists(path_to_alternates))
+        self.assertEqual(
+            util_git.get_last_commit_id(self.repo_dir),
+            util_git.get_last_commit_id(path_to_clone),
+        )
+        shutil.rmtree(target_dir, ignore_errors=True)
+
+    def test_execute_command_async(self):
+        # Arrange
+        async def _run_many():
+            return await asyncio.gather(
+                util_git.execute_command_async("rev-parse", ["HEAD"], self.repo_dir),
+                util_git.execute_command_async(
+                    "rev-parse", ["--abbrev-ref", "HEAD"], self.repo_dir
+                ),
+            )
+
+        # Act
+        commit_id, branch = asyncio.run(_run_many())
+
+        # Assert
+        self.assertEqual(util_git.get_last_commit_id(self.repo_dir), commit_id.strip())
+        self.assertEqual("main", branch.strip())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,417 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+from cornsnake import util_file, util_proc
+
+
+class TestUtilProc(unittest.TestCase):
+    def test_iterate_process_output(self):
+        # Arrange
+        script = "import sys; sys.stdout.write('a\\nbb\\n\\nccc')"
+
+        # Act
+        actual = list(
+            util_proc.iterate_process_output(sys.executable, ["-c", script], ".")
+        )
+
+        # Assert
+        self.assertEqual(["a", "bb", "", "ccc"], actual)
+
+    def test_iterate_process_output_nul_delimited(self):
+        # Arrange
+        script = "import sys; sys.stdout.write('a\\nb\\0c\\0')"
+
+        # Act
+        actual = list(
+            util_proc.iterate_process_output(
+                sys.executable, ["-c", script], ".", separator=b"\0"
+            )
+        )
+
+        # Assert
+        self.assertEqual(["a\nb", "c"], actual)
+
+    def test_iterate_process_output_stops_early(self):
+        # Arrange
+        script = "import itertools\nfor i in itertools.count(): print(i, flush=True)"
+        records = util_proc.iterate_process_output(sys.executable, ["-c", script], ".")
+
+        # Act
+        first = next(records)
+        records.close()
+
+        # Assert
+        self.assertEqual("0", first)
+
+    def test_iterate_process_output_raises_on_error(self):
+        # Arrange
+        script = "import sys; print('partial'); sys.exit(3)"
+
+        # Act, Assert
+        with self.assertRaises(RuntimeError) as context:
+            list(
+                util_proc.iterate_process_output(
+                    sys.executable, ["-c", script], ".", output_errors=False
+                )
+            )
+        self.assertEqual(3, context.exception.args[1])
+
+    def test_process_sinks_record_processes(self):
+        # Arrange
+        stats = util_proc.InMemoryProcessStats()
+        path_to_jsonl = os.path.join(tempfile.mkdtemp(), "processes.jsonl")
+        jsonl_sink = util_proc.JsonlProcessSink(path_to_jsonl)
+        util_proc.add_process_sink(stats)
+        util_proc.add_process_sink(jsonl_sink)
+
+        try:
+            # Act
+            util_proc.run_process_and_get_output(
+                sys.executable, ["-c", "print('abc')"], "."
+            )
+            list(
+                util_proc.iterate_process_output(
+                    sys.executable, ["-c", "print('de')"], "."
+                )
+            )
+        finally:
+            util_proc.remove_process_sink(stats)
+            util_proc.remove_process_sink(jsonl_sink)
+        util_proc.run_process_and_get_output(sys.executable, ["-c", "pass"], ".")
+
+        # Assert
+        self.assertEqual(2, len(stats.records))
+        self.assertEqual(0, stats.records[0].exit_code)
+        self.assertEqual(len("abc" + os.linesep), stats.records[0].stdout_bytes)
+        command_name = f"{os.path.basename(sys.executable)} -c"
+        self.assertEqual(2, stats.get_stats_by_command()[command_name][0])
+        self.assertIn(f"2 x {command_name}", stats.get_summary_report())
+        lines = util_file.read_lines_from_file(path_to_jsonl)
+        self.assertEqual(2, len(lines))
+        self.assertEqual(["-c", "print('abc')"], json.loads(lines[0])["arguments"])
+
+    def test_run_process_and_get_output_async(self):
+        # Arrange
+        async def _run_many():
+            return await asyncio.gather(
+                *[
+                    util_proc.run_process_and_get_output_async(
+                        sys.executable, ["-c", f"print({i})"], "."
+                    )
+                    for i in range(5)
+                ]
+            )
+
+        # Act
+        actual = asyncio.run(_run_many())
+
+        # Assert
+        self.assertEqual([str(i) for i in range(5)], [a.strip() for a in actual])
+
+    def test_run_process_and_get_output_async_raises_on_error(self):
+        # Arrange
+        script = "import sys; sys.stderr.write('bad'); sys.exit(2)"
+
+        # Act, Assert
+        with self.assertRaises(RuntimeError) as context:
+            asyncio.run(
+                util_proc.run_process_and_get_output_async(
+                    sys.executable, ["-c", script], ".", output_errors=False
+                )
+            )
+        self.assertEqual(("bad. Code: 2", 2), context.exception.args)
+
+    def test_iterate_process_output_keeps_only_tail_of_stderr(self):
+        # Arrange
+        script = "import sys; sys.stderr.write('x' * 100000 + 'END'); sys.exit(1)"
+
+        # Act, Assert
+        with self.assertRaises(RuntimeError) as context:
+            list(
+                util_proc.iterate_process_output(
+                    sys.executable,
+                    ["-c", script],
+                    ".",
+                    output_errors=False,
+                    max_stderr_bytes=10,
+                )
+            )
+        message = context.exception.args[0]
+        self.assertTrue(message.endswith("xxxxxxxEND. Code: 1"), message)
+        self.assertIn("99993 bytes of stderr not kept", message)
+
+    def test_run_process_and_get_spooled_output(self):
+        # Arrange
+        script = "import sys; sys.stdout.write('line\\n' * 10000)"
+
+        # Act
+        with util_proc.run_process_and_get_spooled_output(
+            sys.executable, ["-c", script], ".", max_memory_bytes=1000
+        ) as output:
+            lines = output.read().splitlines()
+
+        # Assert
+        self.assertEqual(10000, len(lines))
+        self.assertEqual(b"line", lines[-1])
+
+    def test_run_process_and_handle_output(self):
+        # Arrange
+        chunks = []
+
+        # Act
+        util_proc.run_process_and_handle_output(
+            sys.executable, ["-c", "print('abc')"], ".", chunks.append
+        )
+
+        # Assert
+        self.assertEqual(b"abc", b"".join(chunks).strip())
+
+    def test_run_process_and_get_output_timeout_kills_and_keeps_partial_output(self):
+        # Arrange
+        script = "import sys, time; print('started', flush=True); time.sleep(30)"
+        start = time.monotonic()
+
+        # Act, Assert
+        with self.assertRaises(util_proc.ProcessTimeoutError) as context:
+            util_proc.run_process_and_get_output(
+                sys.executable,
+                ["-c", script],
+                ".",
+                output_errors=False,
+                timeout_seconds=0.5,
+            )
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertEqual("started", context.exception.partial_stdout.strip())
+        self.assertIsNone(context.exception.args[1])
+
+    def test_run_process_and_get_output_async_timeout(self):
+        # Arrange
+        script = "import time; time.sleep(30)"
+
+        # Act, Assert
+        with self.assertRaises(util_proc.ProcessTimeoutError):
+            asyncio.run(
+                util_proc.run_process_and_get_output_async(
+                    sys.executable,
+                    ["-c", script],
+                    ".",
+                    output_errors=False,
+                    timeout_seconds=0.5,
+                )
+            )
+
+    def test_iterate_process_output_timeout(self):
+        # Arrange
+        script = "import time; print('a', flush=True); time.sleep(30)"
+        lines = []
+
+        # Act, Assert
+        with self.assertRaises(util_proc.ProcessTimeoutError):
+            for line in util_proc.iterate_process_output(
+                sys.executable,
+                ["-c", script],
+                ".",
+                output_errors=False,
+                timeout_seconds=0.5,
+            ):
+                lines.append(line)
+        self.assertEqual(["a"], lines)
+
+    def test_iterate_process_output_timeout_after_stdout_is_closed(self):
+        # Arrange
+        script = "import os, time; os.close(1); time.sleep(30)"
+        start = time.time()
+
+        # Act, Assert
+        with self.assertRaises(util_proc.ProcessTimeoutError):
+            list(
+                util_proc.iterate_process_output(
+                    sys.executable,
+                    ["-c", script],
+                    ".",
+                    output_errors=False,
+                    timeout_seconds=0.5,
+                )
+            )
+        self.assertLess(time.time() - start, 10)
+
+    def test_run_process_jobs_yields_in_completion_order(self):
+        # Arrange
+        slow = util_proc.ProcessJob(
+            sys.executable, ["-c", "import time; time.sleep(1); print('slow')"], "."
+        )
+        fast = util_proc.ProcessJob(sys.executable, ["-c", "print('fast')"], ".")
+        failing = util_proc.ProcessJob(
+            sys.executable, ["-c", "import sys; sys.exit(3)"], ".", tag="failing"
+        )
+        hung = util_proc.ProcessJob(
+            sys.executable, ["-c", "import time; time.sleep(30)"], ".", 0.5
+        )
+
+        # Act
+        report = util_proc.run_process_jobs([slow, fast, failing, hung], max_workers=4)
+
+        # Assert
+        self.assertEqual(4, len(report.results))
+        self.assertEqual("slow", report.results[-1].output.strip())
+        self.assertEqual(2, len(report.get_succeeded()))
+        self.assertEqual([hung], [r.job for r in report.get_timed_out()])
+        self.assertIn("failing", [r.job.tag for r in report.get_failed()])
+        self.assertIn("2 of 4 jobs succeeded, 1 timed out", report.describe())
+
+    def test_iterate_process_jobs_from_generator(self):
+        # Arrange
+        jobs = (
+            util_proc.ProcessJob(sys.executable, ["-c", f"print({i})"], ".")
+            for i in range(5)
+        )
+
+        # Act
+        outputs = sorted(
+            int(r.output) for r in util_proc.iterate_process_jobs(jobs, max_workers=2)
+        )
+
+        # Assert
+        self.assertEqual([0, 1, 2, 3, 4], outputs)
+
+    def test_is_process_running(self):
+        # Arrange
+        process = subprocess.Popen(
+            [sys.executable, "-c", "import time; time.sleep(30)"]
+        )
+        try:
+            name = os.path.basename(sys.executable)
+
+            # Act
+            actual = util_proc.are_processes_running(
+                [name, "no-such-process-xyz"], max_age_seconds=0
+            )
+            is_running = util_proc.is_process_running(name)
+        finally:
+            process.kill()
+            process.wait()
+
+        # Assert
+        self.assertEqual({name: True, "no-such-process-xyz": False}, actual)
+        self.assertTrue(is_running)
+
+    def test_run_process_and_get_output_bytes_and_lazy(self):
+        # Arrange
+        script = "import sys; sys.stdout.buffer.write(b'caf\\xe9')"
+
+        # Act
+        raw = util_proc.run_process_and_get_output_bytes(
+            sys.executable, ["-c", script], "."
+        )
+        lazy = util_proc.run_process_and_get_lazy_output(
+            sys.executable, ["-c", script], ".", encoding="latin-1"
+        )
+        replaced = util_proc.run_process_and_get_output(
+            sys.executable, ["-c", script], ".", errors="replace"
+        )
+        discarded = util_proc.run_process_and_get_output(
+            sys.executable, ["-c", script], ".", discard_stdout=True
+        )
+
+        # Assert
+        self.assertEqual(b"caf\xe9", raw)
+        self.assertEqual(4, len(lazy))
+        self.assertEqual("caf\u00e9", lazy.get_text())
+        self.assertEqual("caf\ufffd", replaced)
+        self.assertEqual("", discarded)
+
+    def test_run_process_and_get_result(self):
+        # Arrange
+        script = "import sys; x = sum(range(3000000)); print(x); sys.stderr.write('warn'); sys.exit(4)"
+
+        # Act
+        result = util_proc.run_process_and_get_result(
+            sys.executable, ["-c", script], "."
+        )
+
+        # Assert
+        self.assertFalse(result.is_ok)
+        self.assertEqual(4, result.exit_code)
+        self.assertEqual("4499998500000", result.get_stdout_text().strip())
+        self.assertEqual("warn", result.get_stderr_text())
+        self.assertGreater(result.elapsed_seconds, 0)
+        if os.name == "posix":
+            self.assertIsNotNone(result.resource_usage)
+            self.assertGreater(result.resource_usage.cpu_seconds, 0)
+            self.assertGreater(result.resource_usage.max_rss_bytes, 1024 * 1024)
+
+    def test_run_process_and_get_result_raise_if_error(self):
+        # Act, Assert
+        with self.assertRaises(RuntimeError) as context:
+            util_proc.run_process_and_get_result(
+                sys.executable,
+                ["-c", "import sys; sys.exit(5)"],
+                ".",
+                output_errors=False,
+                raise_if_error=True,
+            )
+        self.assertEqual(5, context.exception.args[1])
+
+    def test_run_process_and_get_result_timeout(self):
+        # Act, Assert
+        for _ in range(5):
+            with self.assertRaises(util_proc.ProcessTimeoutError):
+                util_proc.run_process_and_get_result(
+                    sys.executable,
+                    ["-c", "import time; time.sleep(30)"],
+                    ".",
+                    output_errors=False,
+                    timeout_seconds=0.2,
+                )
+
+    def test_retry_call_retries_transient_errors(self):
+        # Arrange
+        util_proc.reset_retry_stats()
+        policy = util_proc.RetryPolicy(
+            max_attempts=3,
+            initial_delay_seconds=0.01,
+            retryable_stderr_patterns=["Connection reset"],
+        )
+        attempts = []
+
+        def _operation():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RuntimeError("fatal: Connection reset by peer. Code: 128", 128)
+            return "ok"
+
+        # Act
+        actual = util_proc.retry_call(_operation, policy, "flaky")
+
+        # Assert
+        self.assertEqual("ok", actual)
+        self.assertEqual(3, len(attempts))
+        stats = util_proc.get_retry_stats()["flaky"]
+        self.assertEqual((2, 1, 0), (stats.retries, stats.recovered, stats.gave_up))
+
+    def test_retry_call_does_not_retry_other_errors(self):
+        # Arrange
+        policy = util_proc.RetryPolicy(
+            initial_delay_seconds=0.01, retryable_exit_codes=[75]
+        )
+        attempts = []
+
+        def _operation():
+            attempts.append(1)
+            raise RuntimeError("fatal: not a git repository. Code: 128", 128)
+
+        # Act, Assert
+        with self.assertRaises(RuntimeError):
+            util_proc.retry_call(_operation, policy, "not flaky")
+        self.assertEqual(1, len(attempts))
+        self.assertTrue(policy.is_retryable(RuntimeError("busy. Code: 75", 75)))
+
+
+if __name__ == "__main__":
+    unittest.main()